@@ -0,0 +1,155 @@
+"""
+Table driven sprite animation
+
+An AnimationTable lists the states a kind of sprite can be in, the frames
+each state shows and for how many seconds, and the rules that pick the
+state from the sprite's velocity and ladder flag. animate_sprites() steps
+every sprite of some sprite lists in one pass, and only assigns a texture
+when the state, the frame or the facing changed. An idle, jumping or
+falling sprite then costs no texture change, and no texture coordinate
+update in its sprite lists.
+
+The animation state is kept in entity_states, at the sprite's slot (see
+entities.py), and read through attributes of the sprite of the same
+names, so level and game snapshots pick it up. animate_sprites() works on
+the arrays directly:
+
+    animation_state     index of the current state, -1 before the first step
+    cur_texture         frame within the state
+    animation_time      seconds spent on that frame
+    facing_direction    the table's left or right
+"""
+from entities import entity_states
+
+# Frame times are sums of ticks, which are not exact in binary
+TIME_EPSILON = 1e-9
+
+# What a rule can test, from a sprite's velocity and ladder flag, as bits
+# of the condition flags animate_sprites() works out for every sprite
+WALKING = 1  # change_x != 0
+FALLING = 2  # change_y < 0
+RISING = 4  # change_y > 0
+CLIMBING = 8  # abs(change_y) > 1
+ON_LADDER = 16  # is_on_ladder
+CONDITIONS = {
+    "walking": WALKING,
+    "falling": FALLING,
+    "rising": RISING,
+    "climbing": CLIMBING,
+    "on_ladder": ON_LADDER,
+}
+
+
+class AnimationTable:
+    """
+    states maps a state name to (frames attribute, frame duration). The
+    attribute holds a texture pair for a still state (duration None), or
+    a list of texture pairs played in a loop.
+
+    rules is a list of (state name, {condition: wanted value}), the first
+    rule whose conditions all hold picks the state. They are turned into
+    one state per combination of condition flags up front.
+
+    left and right are the values of facing_direction, and the indexes
+    into the texture pairs, of the two facings.
+    """
+
+    def __init__(self, states, rules, left, right):
+        self.names = list(states)
+        self.frames_attributes = [states[name][0] for name in self.names]
+        self.durations = [states[name][1] for name in self.names]
+        self.left = left
+        self.right = right
+
+        compiled = []
+        for state, conditions in rules:
+            mask = 0
+            wanted = 0
+            for condition, value in conditions.items():
+                mask |= CONDITIONS[condition]
+                if value:
+                    wanted |= CONDITIONS[condition]
+            compiled.append((self.names.index(state), mask, wanted))
+        self.uses_ladder = any(mask & ON_LADDER for _, mask, _ in compiled)
+        self.state_for_flags = []
+        for flags in range(2 * ON_LADDER):
+            for state, mask, wanted in compiled:
+                if flags & mask == wanted:
+                    self.state_for_flags.append(state)
+                    break
+            else:
+                raise Exception(f"No animation state for condition flags {flags}.")
+
+    def texture(self, sprite, state, frame, facing):
+        frames = getattr(sprite, self.frames_attributes[state])
+        if self.durations[state] is None:
+            return frames[facing]
+        return frames[frame][facing]
+
+
+def animate_sprites(sprite_lists, delta_time):
+    """
+    Step every sprite of sprite_lists, which all have an `animation`
+    table and a slot in entity_states, in one pass.
+    """
+    animation_states = entity_states.animation_state
+    cur_textures = entity_states.cur_texture
+    animation_times = entity_states.animation_time
+    facing_directions = entity_states.facing_direction
+    on_ladder = entity_states.is_on_ladder
+    table = None
+    for sprite_list in sprite_lists:
+        for sprite in sprite_list:
+            if sprite.animation is not table:
+                # Sprites of one list nearly always share their table
+                table = sprite.animation
+                state_for_flags = table.state_for_flags
+                durations = table.durations
+                uses_ladder = table.uses_ladder
+                left = table.left
+                right = table.right
+
+            slot = sprite.slot
+            change_x = sprite.change_x
+            change_y = sprite.change_y
+            flags = WALKING if change_x else 0
+            if change_y < 0:
+                flags |= FALLING | CLIMBING if change_y < -1 else FALLING
+            elif change_y > 0:
+                flags |= RISING | CLIMBING if change_y > 1 else RISING
+            if uses_ladder and on_ladder[slot]:
+                flags |= ON_LADDER
+            state = state_for_flags[flags]
+
+            # Face the way the sprite moves
+            changed = False
+            if change_x:
+                facing = left if change_x < 0 else right
+                if facing_directions[slot] != facing:
+                    facing_directions[slot] = facing
+                    changed = True
+
+            if state != animation_states[slot]:
+                animation_states[slot] = state
+                cur_textures[slot] = 0
+                animation_times[slot] = 0.0
+                changed = True
+            else:
+                duration = durations[state]
+                if duration:
+                    time = animation_times[slot] + delta_time
+                    if time >= duration - TIME_EPSILON:
+                        steps = int((time + TIME_EPSILON) // duration)
+                        time -= steps * duration
+                        frame_count = len(getattr(sprite, table.frames_attributes[state]))
+                        cur_textures[slot] = (cur_textures[slot] + steps) % frame_count
+                        changed = True
+                    animation_times[slot] = time
+
+            if changed:
+                sprite.texture = table.texture(sprite, state, cur_textures[slot], facing_directions[slot])
+
+
+def animate(sprite, delta_time):
+    """Step the animation of a single sprite."""
+    animate_sprites([[sprite]], delta_time)
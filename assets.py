@@ -0,0 +1,130 @@
+"""
+Parallel asset warm-up
+
+An AssetLoader decodes images, sounds and level files on a thread pool
+while something else, like the main menu, is on screen. The work goes
+through the same process-wide stores the game reads from (the texture
+registry, arcade's texture cache, the sound bank, the level cache), so
+whatever is ready when the game starts is not loaded again.
+
+Work that needs the OpenGL context, like building sprite lists, is
+queued with add_main() instead and run on the main thread by step(),
+one job per call, once the pool is done. finish() does whatever is left
+at once, for when the game cannot wait any longer, and shutdown() stops
+the threads.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Worker threads, PIL and the audio decoders let go of the GIL while
+# they decode
+MAX_WORKERS = 8
+
+
+class AssetLoader:
+    """
+    add() and add_main() queue (name, function, args) jobs, start() hands
+    the pool jobs to the worker threads, step() runs the main thread jobs.
+    A job that raises is reported in failed and counted as done.
+    Call shutdown() when done with a loader.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(MAX_WORKERS, os.cpu_count() or 1)
+        self.executor = None
+        self.futures = []
+        self.jobs = []
+        self.main_jobs = []
+        # Job name -> what the job returned
+        self.results = {}
+        # (job name, error) of the jobs that raised
+        self.failed = []
+        self.total = 0
+        self.done = 0
+        self.lock = threading.Lock()
+        self.start_time = None
+        # Seconds from start() until the last job was done
+        self.elapsed = None
+
+    def add(self, name, function, *args):
+        """Queue a job for the thread pool."""
+        self.jobs.append((name, function, args))
+        self.total += 1
+
+    def add_main(self, name, function, *args):
+        """Queue a job for the main thread, run after the pool jobs."""
+        self.main_jobs.append((name, function, args))
+        self.total += 1
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="asset-load")
+        self.futures = [self.executor.submit(self._run, name, function, args) for name, function, args in self.jobs]
+        self.jobs = []
+
+    def finish(self):
+        """
+        Main thread only. Wait for the pool jobs, then run every main
+        thread job left, starting the loader first if need be.
+        """
+        if self.start_time is None:
+            self.start()
+        wait(self.futures)
+        while self.main_jobs:
+            name, function, args = self.main_jobs.pop(0)
+            self._run(name, function, args)
+
+    def shutdown(self):
+        """Drop the pool jobs not started yet and wait for the running ones."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, name, function, args):
+        try:
+            result = function(*args)
+        except Exception as error:
+            print(f"Warning, loading {name} failed: {error}")
+            with self.lock:
+                self.failed.append((name, str(error)))
+        else:
+            with self.lock:
+                self.results[name] = result
+        with self.lock:
+            self.done += 1
+            if self.done == self.total:
+                self.elapsed = time.perf_counter() - self.start_time
+
+    @property
+    def pool_finished(self):
+        """True once every job for the thread pool is done."""
+        return self.done >= self.total - len(self.main_jobs)
+
+    def step(self):
+        """
+        Call once per frame on the main thread. Runs the next main thread
+        job once the pool jobs are done. Returns True when everything is.
+        """
+        if self.finished:
+            return True
+        if self.main_jobs and self.pool_finished:
+            name, function, args = self.main_jobs.pop(0)
+            self._run(name, function, args)
+        return self.finished
+
+    def result(self, name):
+        """What a finished job returned, None if it failed or is not done."""
+        with self.lock:
+            return self.results.get(name)
+
+    @property
+    def progress(self):
+        """Fraction of the jobs done, from 0 to 1."""
+        if not self.total:
+            return 1.0
+        return self.done / self.total
+
+    @property
+    def finished(self):
+        return self.done >= self.total
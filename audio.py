@@ -0,0 +1,150 @@
+"""
+Sound bank and mixer
+
+The sound bank decodes each sound file once per process and hands the same
+arcade.Sound to every view that asks for it, so building a new GameView on
+every retry does not decode the MP3s again.
+
+The mixer plays those sounds: one music channel, and a capped pool of
+sound effect voices.
+"""
+import threading
+
+import arcade
+
+# Most sound effects that may play at the same time
+MAX_SFX_VOICES = 8
+
+
+class SoundBank:
+    """Process-wide store of decoded sounds, keyed by file name."""
+
+    def __init__(self):
+        self.sounds = {}
+        self.hits = 0
+        self.misses = 0
+        # The asset loader decodes sounds on worker threads
+        self.lock = threading.Lock()
+
+    def get(self, filename, streaming=False):
+        """
+        Return the decoded sound for a file, decoding it on first use.
+        A file that cannot be loaded gives None (arcade.play_sound ignores
+        it) and is not retried.
+        """
+        with self.lock:
+            if filename in self.sounds:
+                self.hits += 1
+                return self.sounds[filename]
+            self.misses += 1
+        try:
+            sound = arcade.load_sound(filename, streaming)
+        except FileNotFoundError as error:
+            print(f"Warning, {error}")
+            sound = None
+        with self.lock:
+            # Keep the first one if another thread decoded it meanwhile
+            return self.sounds.setdefault(filename, sound)
+
+    def preload(self, filenames):
+        """Decode every file that is not in the bank yet."""
+        for filename in filenames:
+            if filename not in self.sounds:
+                self.get(filename)
+
+    def stats(self):
+        return {
+            "sounds": len(self.sounds),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failed": [name for name, sound in self.sounds.items() if sound is None],
+        }
+
+
+class AudioMixer:
+    """
+    Plays music and sound effects.
+
+    - Music has a single channel: starting a track stops the previous one,
+      and asking for the track that is already playing does nothing.
+    - Sound effects share max_voices voices. When all are busy the oldest
+      voice is stopped to make room.
+    - The same effect triggered twice in one frame plays once. Call
+      new_frame() at the start of every update.
+    """
+
+    def __init__(self, max_voices=MAX_SFX_VOICES):
+        self.max_voices = max_voices
+        self.music = None
+        self.music_player = None
+        # (sound, player) pairs, oldest first
+        self.voices = []
+        self.frame_sounds = set()
+        self.played = 0
+        self.deduplicated = 0
+        self.stolen = 0
+
+    def new_frame(self):
+        """Start a new frame for sound effect de-duplication."""
+        self.frame_sounds.clear()
+
+    def play_music(self, sound, volume=1.0, looping=False):
+        """Play a music track on the music channel."""
+        if sound is None:
+            return
+        if sound is self.music and self.music_player and not sound.is_complete(self.music_player):
+            return
+        self.stop_music()
+        self.music = sound
+        self.music_player = arcade.play_sound(sound, volume=volume, looping=looping)
+
+    def stop_music(self):
+        if self.music_player:
+            arcade.stop_sound(self.music_player)
+        self.music = None
+        self.music_player = None
+
+    def play_sfx(self, sound, volume=1.0):
+        """Play a sound effect on a free voice, or on the oldest one."""
+        if sound is None:
+            return None
+        if sound in self.frame_sounds:
+            self.deduplicated += 1
+            return None
+        self.frame_sounds.add(sound)
+
+        # Forget voices that finished on their own
+        self.voices = [
+            (voice_sound, player) for voice_sound, player in self.voices
+            if not voice_sound.is_complete(player)
+        ]
+        while len(self.voices) >= self.max_voices:
+            _voice_sound, oldest = self.voices.pop(0)
+            arcade.stop_sound(oldest)
+            self.stolen += 1
+
+        player = arcade.play_sound(sound, volume=volume)
+        if player:
+            self.voices.append((sound, player))
+            self.played += 1
+        return player
+
+    def stop_all(self):
+        """Stop the music and every sound effect."""
+        self.stop_music()
+        for _voice_sound, player in self.voices:
+            arcade.stop_sound(player)
+        self.voices = []
+
+    def stats(self):
+        return {
+            "voices": len(self.voices),
+            "max_voices": self.max_voices,
+            "played": self.played,
+            "deduplicated": self.deduplicated,
+            "stolen": self.stolen,
+        }
+
+
+sound_bank = SoundBank()
+mixer = AudioMixer()
@@ -0,0 +1,154 @@
+"""
+Frame-time benchmark
+
+Loads every resources/WORLD*.tmx, plays the scripted input from
+headless.py for a fixed number of frames and records how long each phase
+of every frame took:
+
+    physics         GameView.update_physics (physics_engine.update)
+    scene_update    GameView.update_scene (scene.update)
+    animation       GameView.update_animations (tiles and animate_sprites)
+    enemy_patrol    GameView.update_enemy_patrol
+    collisions      enemy/coin and hazard/end-of-level checks
+    camera          GameView.center_camera_to_player
+    draw_scene      GameView.draw_scene
+    draw_gui        GameView.draw_gui
+    frame           the whole on_update plus on_draw
+
+Results are written as JSON with mean, p50, p95, p99 and max in
+milliseconds, so runs on different commits can be compared. Without a
+display (or with --headless) the camera and draw phases are skipped.
+The phases are timed by the same FrameProfiler as the in-game overlay.
+
+Usage:
+    python benchmark.py --frames 600 --output benchmark.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import subprocess
+
+import arcade
+
+import game_mymap
+from game_mymap import GameView
+from headless import TICK, scripted_input
+from profiler import FrameProfiler
+
+# Phases that only run with a window
+DRAW_PHASES = ["camera", "draw_scene", "draw_gui"]
+
+
+def benchmark_level(level, frames, window=None):
+    """Play `frames` frames of one level and return its phase summaries."""
+    game = GameView(headless=window is None)
+    game.level = level
+    if window:
+        window.show_view(game)
+    else:
+        game.setup()
+
+    # Every frame is kept, not just the last few seconds
+    profiler = FrameProfiler(history=None)
+    profiler.enable(game)
+    try:
+        for tick in range(frames):
+            pressed, released = scripted_input(tick)
+            for key in pressed:
+                game.on_key_press(key, 0)
+            for key in released:
+                game.on_key_release(key, 0)
+
+            profiler.begin_frame()
+            game.on_update(TICK)
+            if window:
+                game.on_draw()
+            profiler.end_frame()
+            if window:
+                window.flip()
+                window.dispatch_events()
+
+            # Keep playing the same level after a game over
+            if game.game_over_reached:
+                game.game_over_reached = False
+                game.level = level
+                if window:
+                    window.show_view(game)
+                else:
+                    game.setup()
+    finally:
+        profiler.disable()
+    results = {
+        phase: profiler.summary(phase)
+        for phase in profiler.samples
+        if window or phase not in DRAW_PHASES
+    }
+    if window:
+        draw_calls = sorted(profiler.draw_call_samples)
+        results["draw_calls"] = {"mean": sum(draw_calls) / len(draw_calls), "max": draw_calls[-1]}
+    return results
+
+
+def level_numbers():
+    """Numbers of every WORLD*.tmx level in resources/."""
+    numbers = []
+    for map_name in glob.glob("resources/WORLD*.tmx"):
+        match = re.search(r"WORLD(\d+)\.tmx$", map_name)
+        if match:
+            numbers.append(int(match.group(1)))
+    return sorted(numbers)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def create_window():
+    """A hidden game window, or None when there is no display."""
+    try:
+        return arcade.Window(
+            game_mymap.SCREEN_WIDTH, game_mymap.SCREEN_HEIGHT, game_mymap.SCREEN_TITLE, visible=False
+        )
+    except Exception as error:
+        print(f"Warning, no window available ({error}), running headless")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase frame-time benchmark.")
+    parser.add_argument("--frames", type=int, default=600, help="frames per level")
+    parser.add_argument("--levels", type=int, nargs="*", help="level numbers, default all")
+    parser.add_argument("--headless", action="store_true", help="skip the camera and drawing")
+    parser.add_argument("--output", help="JSON file to write, default stdout")
+    args = parser.parse_args()
+
+    window = None if args.headless else create_window()
+    results = {
+        "commit": current_commit(),
+        "frames": args.frames,
+        "headless": window is None,
+        "levels": {},
+    }
+    for level in args.levels or level_numbers():
+        results["levels"][f"WORLD{level}"] = benchmark_level(level, args.frames, window)
+    if window:
+        window.close()
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(report + "\n")
+        print(f"Wrote {os.path.abspath(args.output)}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Player collision micro-benchmark
+
+Times one frame of enemy movement plus the player's collision checks
+against coins, enemies, hazards and the exit on WORLD1, with 10, 100 and
+1000 patrolling enemies, in three ways:
+
+    brute_force     arcade checks on the layers, Enemies without a spatial
+                    hash (the game's layer_options before the grid). The
+                    game sent that list through arcade's GPU broad phase,
+                    which needs a window, so every enemy is checked here
+    arcade_hash     the same checks with arcade's spatial hash on Enemies,
+                    which is updated on every enemy move
+    grid            WorldQuery: one grid lookup for all four layers, enemies
+                    re-binned only when they change cells
+
+--max-vertices and --tolerance set how far hit boxes are simplified (see
+hitboxes.py), the game's own settings by default.
+
+Usage:
+    python benchmark_collisions.py --frames 600 --enemies 10 100 1000
+    python benchmark_collisions.py --max-vertices 4 --tolerance 2
+"""
+import argparse
+import json
+import random
+import time
+
+import arcade
+
+from game_mymap import (
+    HIT_BOX_MAX_VERTICES,
+    HIT_BOX_TOLERANCE,
+    LAYER_NAME_COINS,
+    LAYER_NAME_DONT_TOUCH,
+    LAYER_NAME_END,
+    LAYER_NAME_ENEMIES,
+    HeadcrabEnemy,
+    load_resources,
+)
+from headless import create_game
+from hitboxes import hit_boxes
+
+# Enemies patrol this far to each side of where they are placed
+PATROL_DISTANCE = 200
+
+
+def add_enemies(game, count, seed=0):
+    """Spread count patrolling headcrabs over the level."""
+    rng = random.Random(seed)
+    enemies = game.scene[LAYER_NAME_ENEMIES]
+    for _ in range(count):
+        enemy = HeadcrabEnemy()
+        enemy.center_x = rng.uniform(0, game.end_of_map)
+        enemy.center_y = rng.uniform(100, game.tile_map.height * game.tile_map.tile_height * 0.5)
+        enemy.change_x = rng.choice([-2, 2])
+        enemy.boundary_left = enemy.center_x - PATROL_DISTANCE
+        enemy.boundary_right = enemy.center_x + PATROL_DISTANCE
+        enemies.append(enemy)
+
+
+def arcade_checks(game):
+    player = game.player_sprite
+    scene = game.scene
+    hits = 0
+    for name in (LAYER_NAME_COINS, LAYER_NAME_ENEMIES, LAYER_NAME_DONT_TOUCH, LAYER_NAME_END):
+        # Spatial hash when the list has one, every sprite otherwise
+        hits += len(arcade.check_for_collision_with_list(player, scene[name]))
+    return hits
+
+
+def grid_checks(game):
+    contacts = game.world.query(game.player_sprite)
+    return sum(len(sprites) for sprites in contacts.values())
+
+
+def move_enemies(game):
+    """
+    The game's enemy step. Returns the enemies the grid has to re-bin.
+    """
+    if game.enemy_patrol:
+        game.enemy_patrol.step()
+        return game.enemy_patrol.crossed_sprites
+    enemies = game.scene[LAYER_NAME_ENEMIES]
+    enemies.update()
+    return enemies
+
+
+def benchmark(method, enemy_count, frames):
+    """
+    Milliseconds per frame of moving the enemies (which includes keeping
+    arcade's spatial hash up to date) and of checking the player (which
+    includes re-binning enemies in the grid).
+    """
+    game = create_game(1)
+    enemies = game.scene[LAYER_NAME_ENEMIES]
+    if enemies.spatial_hash is not None:
+        enemies.disable_spatial_hashing()
+    add_enemies(game, enemy_count)
+    if method == "arcade_hash":
+        enemies.enable_spatial_hashing()
+    game.setup_world()
+    if game.enemy_patrol:
+        game.enemy_patrol.pull()
+
+    # Put the player in the middle of the enemies
+    game.player_sprite.center_x = game.end_of_map / 2
+    game.player_sprite.center_y = 300
+
+    hits = 0
+    move_time = 0.0
+    check_time = 0.0
+    for _ in range(frames):
+        start_time = time.perf_counter()
+        moved = move_enemies(game)
+        check_start = time.perf_counter()
+        if method == "grid":
+            game.world.move(moved)
+            hits += grid_checks(game)
+        else:
+            hits += arcade_checks(game)
+        end_time = time.perf_counter()
+        move_time += check_start - start_time
+        check_time += end_time - check_start
+    return {
+        "move_ms": move_time / frames * 1000,
+        "check_ms": check_time / frames * 1000,
+        "ms_per_frame": (move_time + check_time) / frames * 1000,
+        "hits": hits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Player collision micro-benchmark.")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--enemies", type=int, nargs="*", default=[10, 100, 1000])
+    parser.add_argument("--max-vertices", type=int, default=HIT_BOX_MAX_VERTICES, help="0 for no cap")
+    parser.add_argument("--tolerance", type=float, default=HIT_BOX_TOLERANCE)
+    args = parser.parse_args()
+    # The game's own settings first, then the ones asked for
+    load_resources()
+    hit_boxes.set_simplification(args.max_vertices or None, args.tolerance)
+
+    results = {}
+    for enemy_count in args.enemies:
+        row = {
+            method: benchmark(method, enemy_count, args.frames)
+            for method in ("brute_force", "arcade_hash", "grid")
+        }
+        grid_time = row["grid"]["ms_per_frame"]
+        grid_check_time = row["grid"]["check_ms"]
+        for method in ("brute_force", "arcade_hash"):
+            row[method]["grid_speedup"] = (
+                row[method]["ms_per_frame"] / grid_time if grid_time else 0.0
+            )
+            row[method]["grid_check_speedup"] = (
+                row[method]["check_ms"] / grid_check_time if grid_check_time else 0.0
+            )
+        results[enemy_count] = row
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
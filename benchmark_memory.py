@@ -0,0 +1,94 @@
+"""
+Entity memory benchmark
+
+Builds 10k enemies, plus a player, and reports:
+
+    bytes_per_enemy     memory allocated per enemy, from tracemalloc, with
+                        the textures they share loaded up front
+    dict_keys           attributes left in an enemy's instance dict
+    animate_ms          one animate_sprites() pass over every enemy, with
+                        half of them walking
+
+Run it before and after a change to the entity classes to see how much
+each enemy costs.
+
+Usage:
+    python benchmark_memory.py --enemies 10000 --frames 60
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+import pyglet
+
+pyglet.options["headless"] = True
+
+import arcade  # noqa: E402
+
+from animation import animate_sprites  # noqa: E402
+from game_mymap import HeadcrabEnemy, Player, RobotEnemy, ZombieEnemy  # noqa: E402
+
+ENEMY_CLASSES = [RobotEnemy, ZombieEnemy, HeadcrabEnemy]
+
+
+def build(count, seed=0):
+    """count enemies of every kind in turn, half of them walking."""
+    rng = random.Random(seed)
+    enemies = []
+    for index in range(count):
+        enemy = ENEMY_CLASSES[index % len(ENEMY_CLASSES)]()
+        enemy.center_x = rng.uniform(0, 10000)
+        enemy.center_y = rng.uniform(0, 1000)
+        enemy.change_x = rng.choice([-2, 0, 0, 2])
+        enemies.append(enemy)
+    return enemies
+
+
+def measure_memory(count):
+    # Textures, hit boxes and the entity state store are shared, make them
+    # exist before counting
+    build(len(ENEMY_CLASSES))
+    Player()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    enemies = build(count)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return enemies, (after - before) / count
+
+
+def measure_animation(enemies, frames):
+    sprite_list = arcade.SpriteList(use_spatial_hash=False, lazy=True)
+    sprite_list.extend(enemies)
+    # The first pass picks every enemy's first frame
+    animate_sprites([sprite_list], 1 / 60)
+    start_time = time.perf_counter()
+    for _ in range(frames):
+        animate_sprites([sprite_list], 1 / 60)
+    return (time.perf_counter() - start_time) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the memory and animation cost of enemies.")
+    parser.add_argument("--enemies", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    enemies, bytes_per_enemy = measure_memory(args.enemies)
+    results = {
+        "enemies": args.enemies,
+        "bytes_per_enemy": round(bytes_per_enemy),
+        "total_mb": round(bytes_per_enemy * args.enemies / 2 ** 20, 2),
+        "dict_keys": len(vars(enemies[0])),
+        "animate_ms": round(measure_animation(enemies, args.frames), 3),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
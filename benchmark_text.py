@@ -0,0 +1,137 @@
+"""
+Text drawing benchmark
+
+Per-frame cost of the game's text: the score HUD (with the score going up
+every SCORE_EVERY frames), the main menu and the game over screen. Each is
+drawn the old way, with arcade.draw_text every frame, and the new way,
+with the persistent text objects of hud.TextLayer.
+
+Without a display the text is drawn offscreen through EGL.
+
+Usage:
+    python benchmark_text.py --frames 600
+"""
+import argparse
+import json
+import os
+import time
+
+import pyglet
+
+if not os.environ.get("DISPLAY"):
+    pyglet.options["headless"] = True
+
+import arcade
+
+from game_mymap import SCREEN_HEIGHT, SCREEN_TITLE, SCREEN_WIDTH, GameOverView, MainMenu
+from hud import TextLayer, load_fonts
+
+# Frames between two score changes in the HUD case
+SCORE_EVERY = 60
+
+
+def draw_score_text(score):
+    arcade.draw_text(
+        f"Score: {score}",
+        380,
+        10,
+        arcade.csscolor.WHITE,
+        25,
+        font_name="Kenney Blocks"
+    )
+
+
+def draw_menu_text():
+    arcade.draw_text(
+        "FREEMAN SOULS: LAFF HIFE",
+        SCREEN_WIDTH / 2,
+        SCREEN_HEIGHT - 100,
+        arcade.color.BLUEBERRY,
+        font_size=40,
+        anchor_x="center",
+        font_name="Soul_Font"
+    )
+    arcade.draw_text(
+        "CLICK ANY BUTTON",
+        SCREEN_WIDTH / 2,
+        SCREEN_HEIGHT / 2,
+        arcade.color.WHITE,
+        font_size=30,
+        anchor_x="center",
+        font_name="Soul_Font"
+    )
+
+
+def draw_game_over_text():
+    arcade.draw_text(
+        "YOU DIED",
+        SCREEN_WIDTH / 2,
+        SCREEN_HEIGHT / 2,
+        arcade.color.RED,
+        70,
+        anchor_x="center",
+        font_name="Soul_Font"
+    )
+
+
+def score_hud():
+    """The GameView score HUD, as a draw(frame) function."""
+    hud = TextLayer()
+    hud.add("score", "Score: 0", 380, 10, arcade.csscolor.WHITE, 25, font_name="Kenney Blocks")
+    shown_score = [0]
+
+    def draw(frame):
+        score = frame // SCORE_EVERY
+        if score != shown_score[0]:
+            hud.set("score", f"Score: {score}")
+            shown_score[0] = score
+        hud.draw()
+
+    return draw
+
+
+def time_frames(window, draw, frames):
+    """Mean milliseconds per frame of draw(frame), waiting for the GPU."""
+    # One untimed frame so fonts and glyphs are loaded
+    draw(0)
+    window.ctx.finish()
+    start_time = time.perf_counter()
+    for frame in range(frames):
+        draw(frame)
+        window.ctx.finish()
+    return (time.perf_counter() - start_time) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text drawing benchmark.")
+    parser.add_argument("--frames", type=int, default=600)
+    args = parser.parse_args()
+
+    window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, visible=False)
+    load_fonts()
+    menu_text = MainMenu().text
+    game_over_text = GameOverView().text
+    cases = {
+        "score_hud": (
+            lambda frame: draw_score_text(frame // SCORE_EVERY),
+            score_hud(),
+        ),
+        "main_menu": (lambda frame: draw_menu_text(), lambda frame: menu_text.draw()),
+        "game_over": (lambda frame: draw_game_over_text(), lambda frame: game_over_text.draw()),
+    }
+
+    results = {}
+    for name, (before, after) in cases.items():
+        before_ms = time_frames(window, before, args.frames)
+        after_ms = time_frames(window, after, args.frames)
+        results[name] = {
+            "draw_text_ms": before_ms,
+            "text_layer_ms": after_ms,
+            "speedup": before_ms / after_ms if after_ms else 0.0,
+        }
+    window.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
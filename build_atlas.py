@@ -0,0 +1,146 @@
+"""
+Offline texture atlas packer
+
+Packs every animation frame of a character, in both facings, into one
+sheet plus a small JSON index. The game picks the atlases up through the
+texture registry, so it no longer opens and mirrors each PNG at runtime.
+
+The index records the size and SHA-1 of every source PNG. The game only
+compares sizes, and loads a frame whose source no longer matches from
+the PNG instead, with a warning, until the atlas is built again.
+stale_sources() compares the digests, tests/test_atlas.py runs it on
+every atlas.
+
+Usage:
+    python build_atlas.py            # rebuild every atlas
+    python build_atlas.py player     # rebuild one character
+"""
+import hashlib
+import json
+import os
+import sys
+
+import PIL.Image
+
+ATLAS_DIR = "resources/atlas"
+
+# Widest sheet we will produce, and the gap left between frames
+MAX_SHEET_WIDTH = 4096
+PADDING = 1
+
+# Source frames for every character that gets an atlas
+CHARACTERS = {
+    "headcrab": [
+        f"resources/enemies/headcrab_{frame}.png"
+        for frame in ["idle", "jump", "fall", "climb0", "climb1"]
+        + [f"walk{i}" for i in range(8)]
+    ],
+    "player": [
+        f"resources/player/{frame}.png"
+        for frame in ["idle1", "jump1", "fall", "ladder0", "ladder1"]
+        + [f"walk{i}" for i in range(3)]
+    ],
+}
+
+
+def file_digest(filename):
+    """SHA-1 of a file's bytes."""
+    with open(filename, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+def pack_rows(sizes, max_width=MAX_SHEET_WIDTH, padding=PADDING):
+    """
+    Shelf-pack a list of (width, height) sizes, tallest first.
+    Returns one (x, y) position per size and the sheet size.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i][1], reverse=True)
+    positions = [None] * len(sizes)
+    x = y = 0
+    row_height = 0
+    sheet_width = 0
+    for i in order:
+        width, height = sizes[i]
+        if x and x + width > max_width:
+            x = 0
+            y += row_height + padding
+            row_height = 0
+        positions[i] = (x, y)
+        x += width + padding
+        row_height = max(row_height, height)
+        sheet_width = max(sheet_width, x - padding)
+    return positions, (sheet_width, y + row_height)
+
+
+def build_atlas(name, sources, atlas_dir=ATLAS_DIR):
+    """Pack the frames of one character and write <name>.png and <name>.json."""
+    images = []
+    slots = {}
+    # Identical frames (and symmetric mirrors) are stored only once
+    by_digest = {}
+
+    def add_image(image):
+        digest = hashlib.sha1(image.tobytes()).hexdigest() + str(image.size)
+        if digest not in by_digest:
+            by_digest[digest] = len(images)
+            images.append(image)
+        return by_digest[digest]
+
+    for source in sources:
+        image = PIL.Image.open(source).convert("RGBA")
+        slots[source] = (
+            add_image(image),
+            add_image(image.transpose(PIL.Image.Transpose.FLIP_LEFT_RIGHT)),
+        )
+
+    positions, sheet_size = pack_rows([image.size for image in images])
+    sheet = PIL.Image.new("RGBA", sheet_size, (0, 0, 0, 0))
+    for image, position in zip(images, positions):
+        sheet.paste(image, position)
+
+    def rect(index):
+        x, y = positions[index]
+        width, height = images[index].size
+        return [x, y, width, height]
+
+    frames = {}
+    for source, (normal, flipped) in slots.items():
+        frames[source] = {"normal": rect(normal), "flipped": rect(flipped)}
+
+    os.makedirs(atlas_dir, exist_ok=True)
+    sheet.save(os.path.join(atlas_dir, f"{name}.png"), optimize=True)
+    index = {
+        "image": f"{name}.png",
+        "size": list(sheet_size),
+        "frames": frames,
+        "sources": {source: file_digest(source) for source in sources},
+        "sizes": {source: os.path.getsize(source) for source in sources},
+    }
+    with open(os.path.join(atlas_dir, f"{name}.json"), "w") as index_file:
+        json.dump(index, index_file, indent=1)
+    return index
+
+
+def stale_sources(index_path):
+    """Source files of an atlas index whose digest no longer matches."""
+    with open(index_path) as index_file:
+        index = json.load(index_file)
+    return [
+        source
+        for source, digest in index["sources"].items()
+        if not os.path.exists(source) or file_digest(source) != digest
+    ]
+
+
+def main():
+    names = sys.argv[1:] or list(CHARACTERS)
+    for name in names:
+        if name not in CHARACTERS:
+            raise Exception(f"Unknown character {name}.")
+        index = build_atlas(name, CHARACTERS[name])
+        width, height = index["size"]
+        print(f"{name}: {len(index['frames'])} frames -> {width}x{height}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Chunked drawing of static tile layers
+
+Scene.draw() submits every sprite of every layer, so drawing cost grows
+with the size of the map even though the camera shows a small part of it.
+Here each static layer is split into square chunks of CHUNK_TILES x
+CHUNK_TILES tiles. Every chunk is its own SpriteList, built once, whose
+GPU buffers never change, and only the chunks that overlap the camera's
+view are drawn.
+"""
+import arcade
+
+# Side of one chunk, in tiles
+CHUNK_TILES = 16
+
+
+class Chunk:
+    """The sprites of one layer inside one chunk, and their bounds."""
+
+    def __init__(self, sprites):
+        self.sprite_list = arcade.SpriteList(capacity=len(sprites))
+        self.left = min(sprite.center_x - sprite.width / 2 for sprite in sprites)
+        self.right = max(sprite.center_x + sprite.width / 2 for sprite in sprites)
+        self.bottom = min(sprite.center_y - sprite.height / 2 for sprite in sprites)
+        self.top = max(sprite.center_y + sprite.height / 2 for sprite in sprites)
+        for sprite in sprites:
+            self.sprite_list.append(sprite)
+
+    def overlaps(self, left, bottom, right, top):
+        return self.left < right and left < self.right and self.bottom < top and bottom < self.top
+
+
+class ChunkedLayer:
+    """
+    One static SpriteList split into chunks. The sprites stay in the
+    original list too, so removing one (e.g. with remove_from_sprite_lists)
+    also removes it from its chunk.
+    """
+
+    def __init__(self, sprite_list, chunk_size):
+        self.sprite_list = sprite_list
+        cells = {}
+        for sprite in sprite_list:
+            key = (int(sprite.center_x // chunk_size), int(sprite.center_y // chunk_size))
+            cells.setdefault(key, []).append(sprite)
+        self.chunks = [Chunk(sprites) for sprites in cells.values()]
+
+    def draw(self, left, bottom, right, top):
+        """Draw the chunks overlapping a view. Returns how many were drawn."""
+        if not self.sprite_list.visible:
+            return 0
+        drawn = 0
+        color = self.sprite_list.color_normalized
+        for chunk in self.chunks:
+            if chunk.overlaps(left, bottom, right, top):
+                chunk.sprite_list.color_normalized = color
+                chunk.sprite_list.draw()
+                drawn += 1
+        return drawn
+
+
+class SceneRenderer:
+    """
+    Draws a Scene like Scene.draw(), with the static layers drawn chunk by
+    chunk. Layers not in static_layers (player, enemies, coins that get
+    collected and restored, ...) are drawn as before.
+    """
+
+    def __init__(self, scene, static_layers, tile_size, chunk_tiles=CHUNK_TILES):
+        self.scene = scene
+        self.layers = {}
+        for name in static_layers:
+            if name in scene.name_mapping:
+                sprite_list = scene[name]
+                self.layers[sprite_list] = ChunkedLayer(sprite_list, tile_size * chunk_tiles)
+        self.chunks_total = sum(len(layer.chunks) for layer in self.layers.values())
+        self.chunks_drawn = 0
+
+    def draw(self, camera):
+        """Draw the scene as seen by camera."""
+        left, bottom = camera.position
+        right = left + camera.viewport_width * camera.scale
+        top = bottom + camera.viewport_height * camera.scale
+        drawn = 0
+        for sprite_list in self.scene.sprite_lists:
+            layer = self.layers.get(sprite_list)
+            if layer is None:
+                sprite_list.draw()
+            else:
+                drawn += layer.draw(left, bottom, right, top)
+        self.chunks_drawn = drawn
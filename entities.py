@@ -0,0 +1,132 @@
+"""
+Entity state
+
+The gameplay fields of the player and the enemies live in one
+EntityStates store, struct-of-arrays: one typed array per field, indexed
+by the slot every entity takes when it is made. The sprites themselves
+only keep their slot and read and write the fields through StateField
+attributes of the same names, so snapshots, the level cache and the game's
+own code see plain attributes. animate_sprites() goes to the arrays
+directly.
+
+The sprite's instance dict then only holds arcade.Sprite's own 29
+attributes. Within that size CPython shares one key table between all
+the instances of a class and stores their values without a dict per
+sprite, which is where the memory goes: 10k enemies measure about 910
+bytes each this way (benchmark_memory.py), and about 2200 with just the
+slot added to the dict. That is why the slot is in __slots__: on a
+subclass of arcade.Sprite it does not do away with the dict, it only
+keeps the slot out of it.
+
+An entity gives its slot back when it goes back to the sprite pools, and
+takes one again when it comes out. One dropped without going back, like a
+sprite made outside the pools, gives it back when it is garbage collected.
+"""
+import threading
+import weakref
+from array import array
+
+# Field name -> array typecode. Flags and facings fit a byte, frame and
+# state indexes a short.
+FIELDS = {
+    "cur_texture": "h",
+    "facing_direction": "b",
+    "animation_state": "h",
+    "animation_time": "d",
+    "is_on_ladder": "b",
+    "climbing": "b",
+}
+
+
+class SlotOwner(weakref.ref):
+    """A weak reference to an entity that remembers the entity's slot."""
+
+    __slots__ = ("slot",)
+
+    def __new__(cls, entity, callback, slot):
+        owner = super().__new__(cls, entity, callback)
+        owner.slot = slot
+        return owner
+
+    def __init__(self, entity, callback, slot):
+        super().__init__(entity, callback)
+
+
+class EntityStates:
+    """One array per field of FIELDS, an entity's values at its slot."""
+
+    def __init__(self):
+        for name, typecode in FIELDS.items():
+            setattr(self, name, array(typecode))
+        self.free = []
+        # Per slot, a weak reference to the entity holding it, or None
+        self.owners = []
+        # One bound method for every reference to call back
+        self.collected = self._collected
+        # Reentrant, the garbage collector may release a slot while the
+        # lock is held
+        self.lock = threading.RLock()
+
+    def allocate(self, owner=None):
+        """
+        A slot for a new entity, with every field zero. The slot is given
+        back when owner is garbage collected, if release() has not been.
+        """
+        with self.lock:
+            if self.free:
+                slot = self.free.pop()
+                for name in FIELDS:
+                    getattr(self, name)[slot] = 0
+            else:
+                slot = len(self.cur_texture)
+                for name in FIELDS:
+                    getattr(self, name).append(0)
+                self.owners.append(None)
+            if owner is not None:
+                self.owners[slot] = SlotOwner(owner, self.collected, slot)
+        return slot
+
+    def _collected(self, owner):
+        """Release the slot of an entity dropped without release()."""
+        with self.lock:
+            if self.owners[owner.slot] is owner:
+                self.release(owner.slot)
+
+    def release(self, slot):
+        """Give back the slot of an entity that is not used any more."""
+        with self.lock:
+            self.owners[slot] = None
+            self.free.append(slot)
+
+    def __len__(self):
+        """Slots in use."""
+        with self.lock:
+            return len(self.cur_texture) - len(self.free)
+
+    def nbytes(self):
+        """Bytes held by the arrays."""
+        return sum(len(getattr(self, name)) * getattr(self, name).itemsize for name in FIELDS)
+
+
+entity_states = EntityStates()
+
+
+class StateField:
+    """
+    An attribute of an entity class kept in entity_states. Flags read back
+    as bools.
+    """
+
+    def __init__(self, name, flag=False):
+        self.column = getattr(entity_states, name)
+        self.flag = flag
+
+    def __get__(self, entity, owner=None):
+        if entity is None:
+            return self
+        if self.flag:
+            return bool(self.column[entity.slot])
+        return self.column[entity.slot]
+
+    def __set__(self, entity, value):
+        self.column[entity.slot] = value
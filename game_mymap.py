@@ -2,8 +2,34 @@
 Platformer Game
 """
 import arcade
+import glob
 import math
 import os
+import threading
+import time
+from array import array
+
+from animation import AnimationTable, animate, animate_sprites
+from audio import mixer, sound_bank
+from chunks import SceneRenderer
+from entities import StateField, entity_states
+from hitboxes import hit_boxes
+from hud import TextLayer, load_fonts, warm_up_glyphs
+from patrol import HAVE_NUMPY, EnemyPatrol, load_numpy
+from profiler import FrameProfiler, ProfilerOverlay
+from spatial import GRID_CELL_SIZE, WorldQuery
+from snapshot import (
+    ENEMY_ATTRIBUTES,
+    PLATFORM_ATTRIBUTES,
+    PLAYER_ATTRIBUTES,
+    GameState,
+    RewindBuffer,
+    apply,
+    capture,
+)
+from tilegrid import EXIT, HAZARD, LADDER, SOLID, GridPhysicsEngine, TileGrid
+from timestep import FixedTimestep, Interpolation
+from textures import preload, registry
 
 # Constants
 SCREEN_WIDTH = 1000
@@ -40,45 +66,224 @@ LAYER_NAME_ENEMIES = "Enemies"
 TEXTURE_LEFT = 0
 TEXTURE_RIGHT = 1
 
+# Sound files, decoded once per process by the sound bank
+SOUND_COLLECT_COIN = "resources/bruh-sound-effect-2.mp3"
+SOUND_JUMP = "resources/Punch.wav"
+SOUND_GAME_OVER = "resources/you-died-sound-effect.mp3"
+SOUND_BACKGROUND_MUSIC = "resources/the-final-battle.mp3"
+GAME_SOUNDS = [SOUND_COLLECT_COIN, SOUND_JUMP, SOUND_GAME_OVER, SOUND_BACKGROUND_MUSIC]
+
+# Images decoded while the main menu is on screen, see startup_loader().
+# Tile images go to arcade's texture cache, character frames to the
+# texture registry.
+STARTUP_TILE_DIRS = ["resources"]
+STARTUP_CHARACTER_DIRS = ["resources/enemies", "resources/player"]
+
+# Score font, its glyphs are rendered before the first game
+HUD_FONT = "Kenney Blocks"
+HUD_FONT_SIZE = 25
+HUD_CHARACTERS = "Score: 0123456789"
+
+# Layers whose sprites move and must be reset when a level restarts
+DYNAMIC_LAYERS = ["Player", LAYER_NAME_MOVING_PLATFORMS, LAYER_NAME_ENEMIES]
+
+# Layers that never change, drawn chunk by chunk
+STATIC_LAYERS = [
+    LAYER_NAME_BACKGROUND,
+    LAYER_NAME_FOREGROUND,
+    LAYER_NAME_PLATFORMS,
+    LAYER_NAME_DONT_TOUCH,
+    LAYER_NAME_LADDERS,
+    LAYER_NAME_END,
+]
+
+# Parsed levels kept around so a restart does not read the map file again
+MAX_CACHED_LEVELS = 3
+MAX_CACHED_LEVEL_BYTES = 64 * 1024 * 1024
+
+# The level cache, the players, enemies and coins of the levels that are
+# built (see pools.py) and the preloader that reads the next level in the
+# background. Made by load_resources(), so importing this module reads no
+# files.
+level_cache = None
+sprite_pools = None
+level_preloader = None
+_resources_lock = threading.Lock()
+
+# Move enemies with one numpy step per frame instead of sprite by sprite
+VECTORIZED_PATROL = HAVE_NUMPY
+
+# How the player collides with the static layers: "sprites" runs arcade's
+# PhysicsEnginePlatformer against every tile sprite, "grid" runs
+# GridPhysicsEngine against a TileGrid of the layers below
+COLLISION_BACKEND = "sprites"
+TILE_GRID_LAYERS = {
+    LAYER_NAME_PLATFORMS: SOLID,
+    LAYER_NAME_LADDERS: LADDER,
+    LAYER_NAME_DONT_TOUCH: HAZARD,
+    LAYER_NAME_END: EXIT,
+}
+
+# Prebaked character atlases, see build_atlas.py
+ATLAS_DIR = "resources/atlas"
+
+# Most character textures kept decoded at once. Every enemy kind shows
+# 18 (idle and walk, both facings) and the player 16.
+TEXTURE_CACHE_CAPACITY = 256
+
+# Hit-box outlines traced offline, see hitboxes.py. Sprites that are only
+# checked for collisions, never moved or stood on by the physics engine,
+# get them with at most HIT_BOX_MAX_VERTICES corners, dropping corners that
+# lie within HIT_BOX_TOLERANCE world pixels of the edge left without them.
+HIT_BOX_FILE = "resources/hitboxes.json"
+HIT_BOX_MAX_VERTICES = 8
+HIT_BOX_TOLERANCE = 1.0
+SIMPLIFIED_HIT_BOX_LAYERS = (LAYER_NAME_COINS, LAYER_NAME_DONT_TOUCH, LAYER_NAME_ENEMIES)
+
+
+def load_resources():
+    """
+    Register the character atlases and hit boxes and make the level
+    cache, sprite pools and level preloader, the first time only. Called
+    by the views, and by whatever builds sprites or levels, before they
+    need any of them.
+    """
+    global level_cache, sprite_pools, level_preloader
+    if level_preloader is not None:
+        return
+    from levels import LevelCache, LevelPreloader
+    from pools import Pools
+
+    with _resources_lock:
+        if level_preloader is not None:
+            return
+        registry.add_atlas_dir(ATLAS_DIR)
+        registry.set_capacity(TEXTURE_CACHE_CAPACITY)
+        hit_boxes.load(HIT_BOX_FILE)
+        hit_boxes.set_simplification(HIT_BOX_MAX_VERTICES, HIT_BOX_TOLERANCE)
+        level_cache = LevelCache(
+            MAX_CACHED_LEVELS, MAX_CACHED_LEVEL_BYTES, on_evict=lambda level: release_level(level)
+        )
+        sprite_pools = Pools()
+        # Set last, the others are ready once it is
+        level_preloader = LevelPreloader(warm_up=warm_up_level)
+
+
 def load_texture_pair(filename):
     """
-    Load a texture pair, with the second being a mirror image.
+    A texture pair, with the second being a mirror image. Each is decoded
+    the first time it is shown.
     """
-    return [
-        arcade.load_texture(filename),
-        arcade.load_texture(filename, flipped_horizontally=True),
-    ]
+    return registry.lazy_pair(filename)
+
+
+def load_entity_textures(main_path):
+    """
+    Every animation frame an Entity can use. The result is shared through
+    the texture registry by all entities with the same main_path, and only
+    the frames that are shown get decoded.
+    """
+    return {
+        "idle": load_texture_pair(f"{main_path}_idle.png"),
+        "jump": load_texture_pair(f"{main_path}_jump.png"),
+        "fall": load_texture_pair(f"{main_path}_fall.png"),
+        "walk": [load_texture_pair(f"{main_path}_walk{i}.png") for i in range(8)],
+        "climb": registry.lazy_list([f"{main_path}_climb0.png", f"{main_path}_climb1.png"]),
+    }
+
+
+def load_player_textures(main_path):
+    """
+    Every animation frame used by the Player, decoded when first shown.
+    """
+    return {
+        "idle": load_texture_pair(f"{main_path}idle1.png"),
+        "jump": load_texture_pair(f"{main_path}jump1.png"),
+        "fall": load_texture_pair(f"{main_path}fall.png"),
+        "ladder": load_texture_pair(f"{main_path}ladder0.png"),
+        "climb": load_texture_pair(f"{main_path}ladder1.png"),
+        "walk": [load_texture_pair(f"{main_path}walk{i}.png") for i in range(3)],
+    }
+
+
+# Animations, see animation.py. Enemies step through a walk frame every
+# 4 ticks and the player every tick.
+ENEMY_ANIMATION = AnimationTable(
+    states={
+        "idle": ("idle_texture_pair", None),
+        "walk": ("walk_textures", 4 / 60),
+    },
+    rules=[
+        ("idle", {"walking": False}),
+        ("walk", {}),
+    ],
+    left=TEXTURE_LEFT,
+    right=TEXTURE_RIGHT,
+)
+PLAYER_ANIMATION = AnimationTable(
+    states={
+        "climb": ("climb_texture", None),
+        "ladder": ("ladder_texture", None),
+        "jump": ("jump_texture", None),
+        "fall": ("fall_texture", None),
+        "idle": ("idle_texture", None),
+        "walk": ("walk_textures", 1 / 60),
+    },
+    rules=[
+        ("climb", {"on_ladder": True, "climbing": True}),
+        ("ladder", {"on_ladder": True}),
+        ("jump", {"rising": True}),
+        ("fall", {"falling": True}),
+        ("idle", {"walking": False}),
+        ("walk", {}),
+    ],
+    left=TEXTURE_LEFT,
+    right=TEXTURE_RIGHT,
+)
+
+
 class Entity(arcade.Sprite):
-    def __init__(self, name_folder, name_file, type):
+    """
+    A sprite with its gameplay fields in entity_states, see entities.py.
+    The texture attributes read from the shared texture set.
+    """
+
+    # See entities.py for why the slot is not in the instance dict
+    __slots__ = ("slot",)
+
+    cur_texture = StateField("cur_texture")
+    facing_direction = StateField("facing_direction")
+    animation_state = StateField("animation_state")
+    animation_time = StateField("animation_time")
+
+    idle_texture_pair = property(lambda self: self.texture_set["idle"])
+    jump_texture_pair = property(lambda self: self.texture_set["jump"])
+    fall_texture_pair = property(lambda self: self.texture_set["fall"])
+    walk_textures = property(lambda self: self.texture_set["walk"])
+    climbing_textures = property(lambda self: self.texture_set["climb"])
+
+    def __init__(self, name_folder, name_file, type, scale=CHARACTER_SCALING):
+        load_resources()
         super().__init__()
+        # The fields are read through the slot
+        self.slot = entity_states.allocate(self)
 
         # Default to facing right
         self.facing_direction = TEXTURE_RIGHT
-        self.properties["type"] = type
         # Used for image sequences
         self.cur_texture = 0
-        self.scale = CHARACTER_SCALING
-        self.character_face_direction = TEXTURE_RIGHT
+        self.scale = scale
         if type == "zombie" or type == "robot":
             main_path = f":resources:images/animated_characters/{name_folder}/{name_file}"
         else:
             main_path = f"resources/enemies/{name_file}"
-        self.idle_texture_pair = load_texture_pair(f"{main_path}_idle.png")
-        self.jump_texture_pair = load_texture_pair(f"{main_path}_jump.png")
-        self.fall_texture_pair = load_texture_pair(f"{main_path}_fall.png")
-
-        # Load textures for walking
-        self.walk_textures = []
-        for i in range(8):
-            texture = load_texture_pair(f"{main_path}_walk{i}.png")
-            self.walk_textures.append(texture)
-
-        # Load textures for climbing
-        self.climbing_textures = []
-        texture = arcade.load_texture(f"{main_path}_climb0.png")
-        self.climbing_textures.append(texture)
-        texture = arcade.load_texture(f"{main_path}_climb1.png")
-        self.climbing_textures.append(texture)
+        # All entities of the same kind share one set of textures, kept on
+        # their class rather than on every sprite
+        cls = self.__class__
+        if "texture_set" not in cls.__dict__:
+            cls.texture_set = registry.texture_set(
+                main_path, lambda: load_entity_textures(main_path)
+            )
 
         # Set the initial texture
         self.texture = self.idle_texture_pair[0]
@@ -86,123 +291,429 @@ class Entity(arcade.Sprite):
         # Hit box will be set based on the first image used. If you want to specify
         # a different hit box, you can do it like the code below.
         # set_hit_box = [[-22, -64], [22, -64], [22, 28], [-22, 28]]
-        self.hit_box = self.texture.hit_box_points
+        hit_boxes.apply(self)
+
+    def release(self):
+        """
+        Give back the slot in entity_states, when the sprite goes back to
+        the sprite pools. reset() takes a new one.
+        """
+        entity_states.release(self.slot)
+        self.slot = None
 
 
 class Enemy(Entity):
-    def __init__(self, name_folder, name_file, type):
+    animation = ENEMY_ANIMATION
+
+    def __init__(self, name_folder, name_file, type, scale=CHARACTER_SCALING):
 
         # Setup parent class
-        super().__init__(name_folder, name_file, type)
-        self.should_update_walk = 0
+        super().__init__(name_folder, name_file, type, scale)
+        self.animation_state = -1
+        self.animation_time = 0.0
+
+    def reset(self):
+        """Put a pooled enemy back into the state it is made in."""
+        if self.slot is None:
+            self.slot = entity_states.allocate(self)
+        self.position = (0, 0)
+        self.change_x = 0
+        self.change_y = 0
+        self.boundary_left = None
+        self.boundary_right = None
+        self.facing_direction = TEXTURE_RIGHT
+        self.cur_texture = 0
+        self.animation_state = -1
+        self.animation_time = 0.0
+        self.texture = self.idle_texture_pair[0]
 
     def update_animation(self, delta_time: float = 1 / 60):
-
-         # Figure out if we need to flip face left or right
-        if self.change_x < 0 and self.facing_direction == TEXTURE_RIGHT:
-            self.facing_direction = TEXTURE_LEFT
-        elif self.change_x > 0 and self.facing_direction == TEXTURE_LEFT:
-            self.facing_direction = TEXTURE_RIGHT
-
-            # Idle animation
-        if self.change_x == 0:
-            self.texture = self.idle_texture_pair[self.facing_direction]
-            return
-
-            # Walking animation
-        if self.should_update_walk == 3:
-            self.cur_texture += 1
-            if self.cur_texture > 7:
-                self.cur_texture = 0
-            self.texture = self.walk_textures[self.cur_texture][self.facing_direction]
-            self.should_update_walk = 0
-            return
-
-        self.should_update_walk += 1
+        animate(self, delta_time)
 
 class RobotEnemy(Enemy):
     def __init__(self):
 
         # Set up parent class
-        super().__init__("robot", "robot", "robot")
-        self.scale = 1
+        super().__init__("robot", "robot", "robot", scale=1)
 
 class HeadcrabEnemy(Enemy):
     def __init__(self):
 
         # Set up parent class
-        super().__init__("headcrab", "headcrab", "headcrab")
-        self.scale = .25
+        super().__init__("headcrab", "headcrab", "headcrab", scale=.25)
 class ZombieEnemy(Enemy):
     def __init__(self):
         # Set up parent class
-        super().__init__("zombie", "zombie", "zombie")
-        self.scale = 1
+        super().__init__("zombie", "zombie", "zombie", scale=1)
 
 class Player(arcade.Sprite):
+    """The player, with its gameplay fields in entity_states like an Entity."""
+
+    __slots__ = ("slot",)
+
+    animation = PLAYER_ANIMATION
+
+    cur_texture = StateField("cur_texture")
+    facing_direction = StateField("facing_direction")
+    animation_state = StateField("animation_state")
+    animation_time = StateField("animation_time")
+    is_on_ladder = StateField("is_on_ladder", flag=True)
+    climbing = StateField("climbing", flag=True)
+
+    idle_texture = property(lambda self: self.texture_set["idle"])
+    jump_texture = property(lambda self: self.texture_set["jump"])
+    fall_texture = property(lambda self: self.texture_set["fall"])
+    ladder_texture = property(lambda self: self.texture_set["ladder"])
+    climb_texture = property(lambda self: self.texture_set["climb"])
+    walk_textures = property(lambda self: self.texture_set["walk"])
+
     def __init__(self):
+        load_resources()
         super().__init__()
+        self.slot = entity_states.allocate(self)
         main_path = "resources/player/"
         self.scale = CHARACTER_SCALING
-        self.idle_texture = load_texture_pair(f"{main_path}idle1.png")
-        self.jump_texture = load_texture_pair(f"{main_path}jump1.png")
-        self.fall_texture = load_texture_pair(f"{main_path}fall.png")
-        self.ladder_texture = load_texture_pair(f"{main_path}ladder0.png")
-        self.climb_texture = load_texture_pair((f"{main_path}ladder1.png"))
+        if "texture_set" not in Player.__dict__:
+            Player.texture_set = registry.texture_set(
+                main_path, lambda: load_player_textures(main_path)
+            )
         # Load a left facing texture and a right facing texture.
         # flipped_horizontally=True will mirror the image we load.
         self.cur_texture = 0
-        self.character_face_direction = TEXTURE_RIGHT
+        self.facing_direction = TEXTURE_RIGHT
         # By default, face right.
         self.texture = self.idle_texture[0]
+        # The hit box stays the one of this first texture, unsimplified as
+        # the physics engine moves the player with it
+        hit_boxes.apply(self, simplified=False)
         self.is_on_ladder = False
         self.climbing = False
-
-        # Load textures for walking
-        self.walk_textures = []
-        for i in range(3):
-            texture = load_texture_pair(f"{main_path}walk{i}.png")
-            self.walk_textures.append(texture)
+        self.animation_state = -1
+        self.animation_time = 0.0
+
+    def release(self):
+        """Give back the slot in entity_states, see Entity.release()."""
+        entity_states.release(self.slot)
+        self.slot = None
+
+    def reset(self):
+        """Put a pooled player back into the state it is made in."""
+        if self.slot is None:
+            self.slot = entity_states.allocate(self)
+        self.position = (0, 0)
+        self.change_x = 0
+        self.change_y = 0
+        self.cur_texture = 0
+        self.facing_direction = TEXTURE_RIGHT
+        self.texture = self.idle_texture[0]
+        self.is_on_ladder = False
+        self.climbing = False
+        self.animation_state = -1
+        self.animation_time = 0.0
 
     def update_animation(self, delta_time: float = 1 / 60):
+        animate(self, delta_time)
 
-        # Figure out if we need to flip face left or right
-        if self.change_x < 0 and self.character_face_direction == TEXTURE_RIGHT:
-            self.character_face_direction = TEXTURE_LEFT
-        elif self.change_x > 0 and self.character_face_direction == TEXTURE_LEFT:
-            self.character_face_direction = TEXTURE_RIGHT
 
-        if self.is_on_ladder and abs(self.change_y) > 1:
-            self.texture = self.climb_texture[self.character_face_direction]
-            return
+class Coin(arcade.Sprite):
+    """A tile of the coin layer, taken from the sprite pools."""
 
-        if self.is_on_ladder:
-            self.texture = self.ladder_texture[self.character_face_direction]
-            return
+    def reset(self, texture=None, scale=TILE_SCALING):
+        """Show texture at scale, with no position, tint or properties."""
+        self.position = (0, 0)
+        self.angle = 0
+        self.color = arcade.color.WHITE
+        self.alpha = 255
+        self.properties.clear()
+        if texture is not None:
+            self.texture = texture
+            self.scale = scale
+            # A reused coin may have been resized by its last level
+            self.width = texture.width * scale
+            self.height = texture.height * scale
+            hit_boxes.apply(self)
 
 
-        # Jump animation
-        if self.change_y > 0 and not self.is_on_ladder:
-            self.texture = self.jump_texture[self.character_face_direction]
-            return
-        elif self.change_y < 0 and not self.is_on_ladder:
-            self.texture = self.fall_texture[self.character_face_direction]
-            return
+def acquire_coin(texture, scale):
+    """Sprite factory of the coin layer, see load_compiled_level()."""
+    return sprite_pools.acquire(Coin, texture, scale)
 
-        # Idle animation
-        if self.change_x == 0:
-            self.texture = self.idle_texture[self.character_face_direction]
-            return
 
+def pool_coins(scene):
+    """
+    Swap the plain sprites arcade.TileMap made for the coin layer for
+    Coins from the sprite pools, in place. Compiled levels make Coins
+    directly.
+    """
+    if LAYER_NAME_COINS not in scene.name_mapping:
+        return
+    coins = scene[LAYER_NAME_COINS]
+    for index, sprite in enumerate(list(coins)):
+        # Animated tiles keep their own class
+        if type(sprite) is not arcade.Sprite:
+            continue
+        coin = acquire_coin(sprite.texture, sprite.scale)
+        coin.position = sprite.position
+        coin.angle = sprite.angle
+        if sprite.properties:
+            coin.properties.update(sprite.properties)
+        coins[index] = coin
+
+
+# Layers whose sprites come from the sprite pools. A level that is not
+# being played gives them back, and keeps what it needs to take them out
+# of the pools again.
+POOLED_LAYERS = ["Player", LAYER_NAME_ENEMIES, LAYER_NAME_COINS]
+
+
+def release_level(level):
+    """
+    Give the player, enemies and coins of a level back to the sprite
+    pools, when the level is left or dropped from the level cache. Each
+    one is kept in level.spawns as its class, reset arguments, patrol
+    bounds, properties and state to start from, for populate_level().
+    """
+    from levels import snapshot_sprite
+
+    if level.spawns is not None:
+        return
+    spawns = {}
+    for name in POOLED_LAYERS:
+        entries = []
+        for sprite in level.members.get(name, ()):
+            args = (sprite.texture, sprite.scale) if isinstance(sprite, Coin) else ()
+            state = level.states.pop(sprite, None) or snapshot_sprite(sprite)
+            properties = dict(sprite.properties) if sprite.properties else None
+            entries.append(
+                (type(sprite), args, (sprite.boundary_left, sprite.boundary_right), properties, state)
+            )
+            sprite.remove_from_sprite_lists()
+            sprite_pools.release(sprite)
+        if name in level.members:
+            level.members[name] = []
+        spawns[name] = entries
+    level.spawns = spawns
+
+
+def populate_level(level):
+    """Take the sprites release_level() gave back out of the pools again."""
+    from levels import restore_sprite
+
+    if level.spawns is None:
+        return
+    for name, entries in level.spawns.items():
+        sprite_list = level.scene[name]
+        members = level.members.setdefault(name, [])
+        for cls, args, (boundary_left, boundary_right), properties, state in entries:
+            sprite = sprite_pools.acquire(cls, *args)
+            restore_sprite(sprite, state)
+            sprite.boundary_left = boundary_left
+            sprite.boundary_right = boundary_right
+            if properties:
+                sprite.properties.update(properties)
+            sprite_list.append(sprite)
+            members.append(sprite)
+            if name in level.dynamic_layers:
+                level.states[sprite] = state
+    level.spawns = None
+
+
+def level_map_name(level):
+    """Map file of a level number."""
+    return f"resources/WORLD{level}.tmx"
+
+
+# Enemy sprite class for each "type" property of the map's enemy objects
+ENEMY_CLASSES = {
+    "robot": RobotEnemy,
+    "zombie": ZombieEnemy,
+    "headcrab": HeadcrabEnemy,
+}
+
+
+def enemy_class(enemy_type):
+    """The enemy sprite class for the "type" property of a map object."""
+    cls = ENEMY_CLASSES.get(enemy_type)
+    if cls is None:
+        raise Exception(f"Unknown enemy type {enemy_type}.")
+    return cls
+
+
+def create_enemy(enemy_type):
+    """Create an enemy sprite from the "type" property of a map object."""
+    return enemy_class(enemy_type)()
+
+
+def warm_up_level(tiled_map):
+    """
+    Decode the character textures a parsed map will show, and trace the
+    hit boxes of the first ones, so building and playing the level later
+    does no image work.
+    Runs on the preload thread.
+    """
+    import pytiled_parser
+
+    sprites = [sprite_pools.acquire(Player)]
+    for layer in tiled_map.layers:
+        if isinstance(layer, pytiled_parser.ObjectLayer) and layer.name == LAYER_NAME_ENEMIES:
+            for enemy_type in {my_object.properties["type"] for my_object in layer.tiled_objects}:
+                sprites.append(sprite_pools.acquire(enemy_class(enemy_type)))
+    for sprite in sprites:
+        for name in sprite.animation.frames_attributes:
+            preload(getattr(sprite, name))
+        if isinstance(sprite, Player):
+            hit_boxes.outline(sprite.texture)
+        else:
+            hit_boxes.get(sprite.texture, sprite.scale)
+        # Idle in the pools, for the level to take when it is built
+        sprite_pools.release(sprite)
 
 
-        # Walking animation
-        self.cur_texture += 1
-        if self.cur_texture > 2:
-            self.cur_texture = 0
-        self.texture = self.walk_textures[self.cur_texture][
-            self.character_face_direction
-        ]
+def load_level(map_name, tiled_map=None):
+    """
+    Read in a level: its tile map, a scene holding all its layers, the player
+    and the enemies. Returns a CachedLevel with a pristine snapshot.
+
+    A fresh compiled .lvl next to the map (see level_format.py) is used first,
+    then tiled_map, an already parsed map as handed out by the level
+    preloader, and only then is the map file itself parsed.
+    """
+    from level_format import load_compiled_level
+    from levels import CachedLevel
+
+    load_resources()
+    # Layer Specific Options for the Tilemap
+    layer_options = {
+        LAYER_NAME_PLATFORMS: {
+            "use_spatial_hash": True,
+        },
+        LAYER_NAME_COINS: {
+            "use_spatial_hash": True,
+            "sprite_factory": acquire_coin,
+        },
+        LAYER_NAME_DONT_TOUCH: {
+            "use_spatial_hash": True,
+        },
+        LAYER_NAME_END: {
+            "use_spatial_hash": True,
+        },
+        LAYER_NAME_LADDERS: {
+            "use_spatial_hash": True,
+        },
+        LAYER_NAME_MOVING_PLATFORMS: {
+            "use_spatial_hash": False,
+        },
+        # LAYER_NAME_ENEMIES: {
+        #     "use_spatial_hash": True
+        # }
+    }
+
+    # Read in the tiled map, unless it was compiled or parsed ahead of time
+    tile_map = load_compiled_level(map_name, TILE_SCALING, layer_options, hit_boxes)
+    if tile_map is None:
+        tile_map = arcade.TileMap(map_name, TILE_SCALING, layer_options, tiled_map=tiled_map)
+
+    # Initialize Scene with our TileMap, this will automatically add all layers
+    # from the map as SpriteLists in the scene in the proper order.
+    scene = arcade.Scene.from_tilemap(tile_map)
+    pool_coins(scene)
+    hit_boxes.apply_to_lists(
+        scene[name] for name in SIMPLIFIED_HIT_BOX_LAYERS if name in scene.name_mapping
+    )
+
+    # Set up the player, specifically placing it at these coordinates.
+    player_sprite = sprite_pools.acquire(Player)
+    player_sprite.center_x = PLAYER_START_X
+    player_sprite.center_y = PLAYER_START_Y
+    scene.add_sprite("Player", player_sprite)
+
+    # -- Enemies
+    if LAYER_NAME_ENEMIES not in scene.name_mapping:
+        scene.add_sprite_list(LAYER_NAME_ENEMIES)
+    enemies_layer = tile_map.object_lists.get(LAYER_NAME_ENEMIES, [])
+
+    for my_object in enemies_layer:
+        # cartesian = tile_map.get_cartesian(
+        #     my_object.center_x, my_object.center_y
+        # )
+        cartesian = tile_map.get_cartesian(
+            my_object.shape[0], my_object.shape[1]
+        )
+        enemy = sprite_pools.acquire(enemy_class(my_object.properties["type"]))
+        enemy.center_x = math.floor(
+            cartesian[0] * TILE_SCALING * tile_map.tile_width
+        )
+        enemy.center_y = math.floor(
+            (cartesian[1] + 1) * (tile_map.tile_height * TILE_SCALING)
+        )
+        if "boundary_left" in my_object.properties:
+            enemy.boundary_left = my_object.properties["boundary_left"]
+        if "boundary_right" in my_object.properties:
+            enemy.boundary_right = my_object.properties["boundary_right"]
+        if "change_x" in my_object.properties:
+            enemy.change_x = my_object.properties["change_x"]
+
+        scene.add_sprite(LAYER_NAME_ENEMIES, enemy)
+
+    return CachedLevel(tile_map, scene, DYNAMIC_LAYERS)
+
+
+def cache_level(map_name, tiled_map=None):
+    """
+    Build a level and its renderer into the level cache ahead of
+    GameView.setup(). Main thread only, sprite lists are made with OpenGL.
+    """
+    level = level_cache.get(map_name)
+    if level is None:
+        level = load_level(map_name, tiled_map)
+        level_cache.put(map_name, level)
+    if level.renderer is None:
+        level.renderer = SceneRenderer(level.scene, STATIC_LAYERS, level.tile_map.tile_width * TILE_SCALING)
+    return level
+
+
+def startup_loader(level=1):
+    """
+    An AssetLoader for everything the first game needs: the level's map
+    and the textures it shows, every image of the startup directories,
+    the game sounds and numpy for the enemy patrol, then on the main
+    thread the built level, the character textures' place in the atlas
+    and the score glyphs. Not started yet.
+    """
+    from assets import AssetLoader
+    from levels import prepare_level
+
+    load_resources()
+    loader = AssetLoader()
+    map_name = level_map_name(level)
+    # Longest jobs first
+    loader.add(map_name, prepare_level, map_name, warm_up_level)
+    if VECTORIZED_PATROL:
+        loader.add("numpy", load_numpy)
+    for sound in GAME_SOUNDS:
+        loader.add(sound, sound_bank.get, sound)
+    for directory in STARTUP_TILE_DIRS:
+        for file_name in sorted(glob.glob(os.path.join(directory, "*.png"))):
+            loader.add(file_name, arcade.load_texture, file_name)
+    for directory in STARTUP_CHARACTER_DIRS:
+        for file_name in sorted(glob.glob(os.path.join(directory, "*.png"))):
+            loader.add(file_name, registry.pair, file_name)
+    loader.add_main(f"level {level}", lambda: cache_level(map_name, loader.result(map_name)))
+    loader.add_main("character atlas", upload_character_textures)
+    loader.add_main("score glyphs", warm_up_glyphs, HUD_CHARACTERS, HUD_FONT_SIZE, HUD_FONT)
+    return loader
+
+
+def upload_character_textures():
+    """
+    Put every decoded character texture into the sprite lists' texture
+    atlas, so the first frames that show them do not grow the atlas.
+    Main thread only.
+    """
+    atlas = arcade.get_window().ctx.default_atlas
+    for texture in list(registry.textures.values()):
+        atlas.add(texture)
+
 
 class MainMenu(arcade.View):
     """Class that manages the 'menu' view."""
@@ -210,14 +721,9 @@ class MainMenu(arcade.View):
     def __init__(self):
         """ This is run once when we switch to this view """
         super().__init__()
-    def on_show_view(self):
-        """Called when switching to this view."""
-        arcade.set_background_color(arcade.color.BLACK)
-
-    def on_draw(self):
-        """Draw the menu"""
-        self.clear()
-        arcade.draw_text(
+        self.text = TextLayer()
+        self.text.add(
+            "title",
             "FREEMAN SOULS: LAFF HIFE",
             SCREEN_WIDTH / 2,
             SCREEN_HEIGHT - 100,
@@ -226,7 +732,8 @@ class MainMenu(arcade.View):
             anchor_x="center",
             font_name="Soul_Font"
         )
-        arcade.draw_text(
+        self.text.add(
+            "prompt",
             "CLICK ANY BUTTON",
             SCREEN_WIDTH / 2,
             SCREEN_HEIGHT / 2,
@@ -235,22 +742,78 @@ class MainMenu(arcade.View):
             anchor_x="center",
             font_name="Soul_Font"
         )
+        self.text.add(
+            "loading",
+            "LOADING 0%",
+            SCREEN_WIDTH / 2,
+            SCREEN_HEIGHT / 2 - 60,
+            arcade.color.GRAY,
+            font_size=20,
+            anchor_x="center",
+            font_name="Soul_Font"
+        )
+
+        # Loads the first level, textures and sounds while the menu is on
+        # screen, so starting the game does not have to
+        self.loader = None
+
+    def on_show_view(self):
+        """Called when switching to this view."""
+        arcade.set_background_color(arcade.color.BLACK)
+        if self.loader is None:
+            self.loader = startup_loader()
+
+    def on_update(self, delta_time):
+        """Run the loader's main thread work and show its progress."""
+        if self.loader is None:
+            return
+        if self.loader.step():
+            self.text.set("loading", "READY")
+        else:
+            self.text.set("loading", f"LOADING {int(self.loader.progress * 100)}%")
+
+    def on_draw(self):
+        """Draw the menu"""
+        self.clear()
+        self.text.draw()
+        # Start loading once the menu is on screen, so the loader's
+        # threads do not slow down the first frame
+        if self.loader is not None and self.loader.start_time is None:
+            self.loader.start()
 
     def on_mouse_press(self, _x, _y, _button, _modifiers):
         """Use a mouse press to advance to the 'game' view."""
+        # The game reads what the loader loads, so whatever it has not
+        # done yet is done now rather than loaded twice
+        if self.loader is not None:
+            self.loader.finish()
         game_view = GameView()
         self.window.show_view(game_view)
 
+    def on_hide_view(self):
+        """Stop the loader's threads when leaving the menu."""
+        if self.loader is not None:
+            self.loader.shutdown()
+
 class GameView(arcade.View):
     """
     Main application class.
+
+    With headless=True the view runs without a window, cameras or sound,
+    so the game logic can be driven from headless.py with no GL context.
     """
 
-    def __init__(self):
+    def __init__(self, headless=False):
 
         # Call the parent class and set up the window
         # super().__init__(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
-        super().__init__()
+        self.headless = headless
+        if headless:
+            self.window = None
+            self.key = None
+        else:
+            super().__init__()
+        load_resources()
         # Where is the right edge of the map?
         self.end_of_map = 0
 
@@ -262,6 +825,8 @@ class GameView(arcade.View):
         # Our TileMap Object
 
         self.tile_map = None
+        # The cached level the scene belongs to
+        self.cached_level = None
 
 
         # Our Scene Object
@@ -270,8 +835,23 @@ class GameView(arcade.View):
         # Separate variable that holds the player sprite
         self.player_sprite = None
 
-        # Our physics engine
+        # Our physics engine, and which kind to build, see COLLISION_BACKEND
         self.physics_engine = None
+        self.collision_backend = COLLISION_BACKEND
+        self.tile_grid = None
+
+        # Game logic runs in fixed ticks, moving sprites are drawn between
+        # their positions at the last two
+        self.timestep = FixedTimestep()
+        self.interpolation = Interpolation()
+
+        # Batched enemy movement, None when enemies move sprite by sprite
+        self.enemy_patrol = None
+
+        # Grid of everything the player can touch, and what the player
+        # touched this frame
+        self.world = None
+        self.contacts = None
 
         # A Camera that can be used for scrolling the screen
         self.camera = None
@@ -279,135 +859,143 @@ class GameView(arcade.View):
         # A Camera that can be used to draw GUI elements
         self.gui_camera = None
 
+        # Draws the scene, skipping static tiles the camera does not see
+        self.scene_renderer = None
+
         # Keep track of the score
         self.score = 0
         # Do we need to reset the score?
         self.reset_score = True
 
-        # Load sounds
-        self.collect_coin_sound = arcade.load_sound("resources/bruh-sound-effect-2.mp3")
-        self.jump_sound = arcade.load_sound("resources/Punch.wav")
-        self.game_over = arcade.load_sound("resources/you-died-sound-effect.mp3")
-        self.background_music = arcade.load_sound("resources/the-final-battle.mp3")
-
-        arcade.set_background_color(arcade.csscolor.CORNFLOWER_BLUE)
-
-    def setup(self):
-        """Set up the game here. Call this function to restart the game."""
-
-        # Set up the Cameras
-        self.camera = arcade.Camera(self.window.width, self.window.height)
-        self.gui_camera = arcade.Camera(self.window.width, self.window.height)
+        # Set when the player died or ran out of levels
+        self.game_over_reached = False
 
+        # Seconds the last level swap took, and an optional callback
+        # on_level_swap(level, seconds) to report it
+        self.last_level_swap_time = None
+        self.on_level_swap = None
 
-        # Name of map file to load
+        # State right after setup(), respawned into, and the last few
+        # seconds of play, rewound with backspace
+        self.spawn_state = None
+        self.rewind = RewindBuffer()
 
-        # # Map name
-        map_name = f"resources/WORLD{self.level}.tmx"
+        # Records key events and state hashes when set, see replay.py
+        self.recorder = None
 
-        # Layer Specific Options for the Tilemap
-        layer_options = {
-            LAYER_NAME_PLATFORMS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_COINS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_DONT_TOUCH: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_END: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_LADDERS: {
-                "use_spatial_hash": True,
-            },
-            LAYER_NAME_MOVING_PLATFORMS: {
-                "use_spatial_hash": False,
-            },
-            # LAYER_NAME_ENEMIES: {
-            #     "use_spatial_hash": True
-            # }
-        }
+        # Per-phase timings, toggled with F3 and shown over the game
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = ProfilerOverlay(self.profiler)
 
+        # Load sounds, shared with every other view through the sound bank
+        self.collect_coin_sound = None
+        self.jump_sound = None
+        self.game_over = None
+        self.background_music = None
+        if headless:
+            return
+        self.collect_coin_sound = sound_bank.get(SOUND_COLLECT_COIN)
+        self.jump_sound = sound_bank.get(SOUND_JUMP)
+        self.game_over = sound_bank.get(SOUND_GAME_OVER)
+        self.background_music = sound_bank.get(SOUND_BACKGROUND_MUSIC)
+
+        # Score text, laid out again only when the score changes
+        self.hud = TextLayer()
+        self.hud.add(
+            "score",
+            f"Score: {self.score}",
+            380,
+            10,
+            arcade.csscolor.WHITE,
+            HUD_FONT_SIZE,
+            font_name=HUD_FONT
+        )
+        self.shown_score = self.score
 
-        # Layer specific options are defined based on Layer names in a dictionary
-
-        # Doing this will make the SpriteList for the platforms layer
-
-        # use spatial hashing for detection.
-
-
-
-        # Read in the tiled map
-
-        self.tile_map = arcade.load_tilemap(map_name, TILE_SCALING, layer_options)
+        arcade.set_background_color(arcade.csscolor.CORNFLOWER_BLUE)
 
+    def setup(self, collision_backend=None):
+        """
+        Set up the game here. Call this function to restart the game.
+        collision_backend switches between "sprites" and "grid" collisions
+        for this and later restarts.
+        """
+        if collision_backend is not None:
+            self.collision_backend = collision_backend
 
+        # Set up the Cameras
+        if not self.headless:
+            self.camera = arcade.Camera(self.window.width, self.window.height)
+            self.gui_camera = arcade.Camera(self.window.width, self.window.height)
 
-        # Initialize Scene with our TileMap, this will automatically add all layers
 
-        # from the map as SpriteLists in the scene in the proper order.
+        # Name of map file to load
 
-        self.scene = arcade.Scene.from_tilemap(self.tile_map)
+        # # Map name
+        map_name = level_map_name(self.level)
+
+        # The level being left gives its player, enemies and coins back to
+        # the pools. A restart reuses the cached level, takes them out again
+        # and resets it from its snapshot, only a level we have not seen yet
+        # is read from disk.
+        if self.cached_level is not None:
+            release_level(self.cached_level)
+            self.cached_level = None
+        level = level_cache.get(map_name)
+        if level is None:
+            level = load_level(map_name, level_preloader.take(map_name))
+            level_cache.put(map_name, level)
+        else:
+            populate_level(level)
+            level.restore()
+
+        # Start reading the next level while this one is played
+        next_map_name = level_map_name(self.level + 1)
+        if next_map_name not in level_cache.levels:
+            level_preloader.preload(next_map_name)
+
+        self.cached_level = level
+        self.tile_map = level.tile_map
+        self.scene = level.scene
+        if self.collision_backend == "grid" and level.tile_grid is None:
+            level.tile_grid = TileGrid.from_tile_map(self.tile_map, TILE_GRID_LAYERS)
+        self.tile_grid = level.tile_grid
+        if not self.headless and level.renderer is None:
+            level.renderer = SceneRenderer(
+                self.scene, STATIC_LAYERS, self.tile_map.tile_width * TILE_SCALING
+            )
+        self.scene_renderer = level.renderer
+        self.player_sprite = self.scene["Player"][0]
+        if VECTORIZED_PATROL:
+            self.enemy_patrol = EnemyPatrol(self.scene[LAYER_NAME_ENEMIES], GRID_CELL_SIZE)
+        else:
+            self.enemy_patrol = None
+        self.setup_world()
+        self.interpolation.clear()
+
+        # Without a GL context arcade can only do collisions through spatial
+        # hashes, its other broad phase runs on the GPU. Enemies are only
+        # ever looked up through self.world.
+        if self.headless:
+            for sprite_list in self.scene.sprite_lists:
+                if sprite_list.spatial_hash is None and sprite_list is not self.scene[LAYER_NAME_ENEMIES]:
+                    sprite_list.enable_spatial_hashing()
 
         # Keep track of the score, make sure we keep the score if the player finishes a level
         if self.reset_score:
             self.score = 0
         self.reset_score = True
 
-        arcade.play_sound(self.background_music, volume=.25)
-        # Keep track of the score
-        # self.scene.add_sprite_list_after("Player", LAYER_NAME_FOREGROUND)
-        # Set up the player, specifically placing it at these coordinates.
-
-        self.player_sprite = Player()
-        self.player_sprite.center_x = PLAYER_START_X
-        self.player_sprite.center_y = PLAYER_START_Y
-        self.scene.add_sprite("Player", self.player_sprite)
+        mixer.play_music(self.background_music, volume=.25)
 
         # # Calculate the right edge of the my_map in pixels
         self.end_of_map = self.tile_map.width * GRID_PIXEL_SIZE
-        # -- Enemies
-        enemies_layer = self.tile_map.object_lists[LAYER_NAME_ENEMIES]
-
-        for my_object in enemies_layer:
-            # cartesian = self.tile_map.get_cartesian(
-            #     my_object.center_x, my_object.center_y
-            # )
-            cartesian = self.tile_map.get_cartesian(
-                my_object.shape[0], my_object.shape[1]
-            )
-            enemy_type = my_object.properties["type"]
-            if enemy_type == "robot":
-                enemy = RobotEnemy()
-            elif enemy_type == "zombie":
-                enemy = ZombieEnemy()
-            elif enemy_type == "headcrab":
-                enemy = HeadcrabEnemy()
-            else:
-                raise Exception(f"Unknown enemy type {enemy_type}.")
-            enemy.center_x = math.floor(
-                cartesian[0] * TILE_SCALING * self.tile_map.tile_width
-            )
-            enemy.center_y = math.floor(
-                (cartesian[1] + 1) * (self.tile_map.tile_height * TILE_SCALING)
-            )
-            if "boundary_left" in my_object.properties:
-                enemy.boundary_left = my_object.properties["boundary_left"]
-            if "boundary_right" in my_object.properties:
-                enemy.boundary_right = my_object.properties["boundary_right"]
-            if "change_x" in my_object.properties:
-                enemy.change_x = my_object.properties["change_x"]
-
-            self.scene.add_sprite(LAYER_NAME_ENEMIES, enemy)
-
 
         # --- Other stuff
 
         # Set the background color
 
-        if self.tile_map.background_color:
+        if self.tile_map.background_color and not self.headless:
 
             arcade.set_background_color(self.tile_map.background_color)
 
@@ -415,15 +1003,90 @@ class GameView(arcade.View):
 
         # Create the 'physics engine'
 
-        self.physics_engine = arcade.PhysicsEnginePlatformer(
+        if self.collision_backend == "grid":
+            self.physics_engine = GridPhysicsEngine(
+                self.player_sprite, self.tile_grid, gravity_constant=GRAVITY,
+                platforms=self.scene[LAYER_NAME_MOVING_PLATFORMS],
+            )
+        elif self.collision_backend == "sprites":
+            self.physics_engine = arcade.PhysicsEnginePlatformer(
 
-            self.player_sprite, gravity_constant=GRAVITY, walls=self.scene["Platforms"],
-            platforms=self.scene[LAYER_NAME_MOVING_PLATFORMS],
-            ladders=self.scene[LAYER_NAME_LADDERS]
+                self.player_sprite, gravity_constant=GRAVITY, walls=self.scene["Platforms"],
+                platforms=self.scene[LAYER_NAME_MOVING_PLATFORMS],
+                ladders=self.scene[LAYER_NAME_LADDERS]
 
-        )
+            )
+        else:
+            raise Exception(f"Unknown collision backend {self.collision_backend}.")
         self.physics_engine.enable_multi_jump(2)
 
+        self.spawn_state = self.save_state()
+
+    def save_state(self):
+        """Snapshot of everything a tick can change, see snapshot.py."""
+        player = self.player_sprite
+        enemies = self.scene[LAYER_NAME_ENEMIES]
+        coins = self.scene[LAYER_NAME_COINS]
+        removed_coins = array("I", [
+            index
+            for index, coin in enumerate(self.cached_level.members[LAYER_NAME_COINS])
+            if coins not in coin.sprite_lists
+        ])
+        return GameState(
+            self.level,
+            self.score,
+            self.physics_engine.jumps_since_ground,
+            capture([player], PLAYER_ATTRIBUTES),
+            capture(enemies, ENEMY_ATTRIBUTES),
+            capture(self.scene[LAYER_NAME_MOVING_PLATFORMS], PLATFORM_ATTRIBUTES),
+            removed_coins,
+            player_texture=player.texture,
+            enemy_textures=[enemy.texture for enemy in enemies],
+        )
+
+    def load_state(self, state):
+        """Put the game back into a state taken by save_state()."""
+        if state.level != self.level:
+            self.level = state.level
+            self.reset_score = False
+            self.setup()
+
+        # Collected coins, in the scene and in the collision grid
+        coins = self.scene[LAYER_NAME_COINS]
+        removed = set(state.removed_coins)
+        for index, coin in enumerate(self.cached_level.members[LAYER_NAME_COINS]):
+            collected = coins not in coin.sprite_lists
+            if index in removed and not collected:
+                self.world.remove(coin)
+                coins.remove(coin)
+            elif index not in removed and collected:
+                coins.append(coin)
+                self.world.insert(coin, "coins")
+
+        player_textures = None if state.player_texture is None else [state.player_texture]
+        apply([self.player_sprite], PLAYER_ATTRIBUTES, state.player, player_textures)
+        enemies = self.scene[LAYER_NAME_ENEMIES]
+        apply(list(enemies), ENEMY_ATTRIBUTES, state.enemies, state.enemy_textures)
+        apply(list(self.scene[LAYER_NAME_MOVING_PLATFORMS]), PLATFORM_ATTRIBUTES, state.platforms)
+        if self.enemy_patrol:
+            self.enemy_patrol.pull()
+        self.world.move(enemies)
+
+        self.physics_engine.jumps_since_ground = state.jumps_since_ground
+        self.score = state.score
+        self.contacts = None
+        self.interpolation.clear()
+
+    def setup_world(self):
+        """Index the sprites of the scene the player can run into."""
+        self.world = WorldQuery({
+            "coins": self.scene[LAYER_NAME_COINS],
+            "enemies": self.scene[LAYER_NAME_ENEMIES],
+            "hazards": self.scene[LAYER_NAME_DONT_TOUCH],
+            "exits": self.scene[LAYER_NAME_END],
+        })
+        self.contacts = None
+
     def on_show_view(self):
         self.setup()
     def on_draw(self):
@@ -432,28 +1095,42 @@ class GameView(arcade.View):
         # Clear the screen to the background color
         self.clear()
 
+        # Draw the moving sprites part of the way into the next tick
+        self.interpolation.apply(self.timestep.alpha)
+
+        # Position the camera
+        self.center_camera_to_player()
+
+        self.draw_scene()
+        self.draw_gui()
+        self.interpolation.restore()
+
+        if self.profiler.enabled:
+            self.profiler_overlay.draw(self.scene, self.window.width, self.window.height)
+            self.profiler.end_frame()
+
+    def draw_scene(self):
         # Activate the game camera
         self.camera.use()
 
 
         # Draw our Scene
 
-        self.scene.draw()
-
+        self.scene_renderer.draw(self.camera)
+        if self.profiler.enabled:
+            self.profiler.counters["chunks drawn"] = (
+                f"{self.scene_renderer.chunks_drawn}/{self.scene_renderer.chunks_total}"
+            )
 
+    def draw_gui(self):
         # Activate the GUI camera before drawing GUI elements
         self.gui_camera.use()
 
         # Draw our score on the screen, scrolling it with the viewport
-        score_text = f"Score: {self.score}"
-        arcade.draw_text(
-            score_text,
-            380,
-            10,
-            arcade.csscolor.WHITE,
-            25,
-            font_name="Kenney Blocks"
-        )
+        if self.score != self.shown_score:
+            self.hud.set("score", f"Score: {self.score}")
+            self.shown_score = self.score
+        self.hud.draw()
 
     # Draw hit boxes.
 
@@ -472,7 +1149,7 @@ class GameView(arcade.View):
             ):
                 self.player_sprite.change_y = PLAYER_JUMP_SPEED
                 self.jump_needs_reset = True
-                arcade.play_sound(self.jump_sound)
+                mixer.play_sfx(self.jump_sound)
         elif self.down_pressed and not self.up_pressed:
             if self.physics_engine.is_on_ladder():
                 self.player_sprite.change_y = -PLAYER_MOVEMENT_SPEED
@@ -494,12 +1171,14 @@ class GameView(arcade.View):
 
     def on_key_press(self, key, modifiers):
         """Called whenever a key is pressed."""
+        if self.recorder:
+            self.recorder.key_press(key, modifiers)
         if key == arcade.key.UP or key == arcade.key.SPACE or key == arcade.key.W:
             if self.physics_engine.is_on_ladder():
                 self.player_sprite.change_y = PLAYER_MOVEMENT_SPEED
             elif self.physics_engine.can_jump():
                 self.player_sprite.change_y = PLAYER_JUMP_SPEED
-                arcade.play_sound(self.jump_sound)
+                mixer.play_sfx(self.jump_sound)
                 self.physics_engine.increment_jump_counter()
         elif key == arcade.key.LEFT or key == arcade.key.A:
             self.player_sprite.change_x = -PLAYER_MOVEMENT_SPEED
@@ -510,10 +1189,18 @@ class GameView(arcade.View):
                 self.player_sprite.change_y = -PLAYER_MOVEMENT_SPEED
             else:
                 self.player_sprite.height *= 0.5
+        elif key == arcade.key.F3:
+            self.profiler.toggle(self)
+        elif key == arcade.key.BACKSPACE:
+            state = self.rewind.pop()
+            if state:
+                self.load_state(state)
         # self.process_keychange()
 
     def on_key_release(self, key, modifiers):
         """Called when the user releases a key."""
+        if self.recorder:
+            self.recorder.key_release(key, modifiers)
         if key == arcade.key.UP or key == arcade.key.W:
             if self.physics_engine.is_on_ladder():
                 self.player_sprite.change_y = 0
@@ -543,7 +1230,38 @@ class GameView(arcade.View):
         self.camera.move_to(player_centered)
 
     def on_update(self, delta_time):
-        """Movement and game logic"""
+        """Run the ticks of movement and game logic delta_time is worth."""
+        if self.profiler.enabled:
+            self.profiler.begin_frame()
+        mixer.new_frame()
+        ticks = self.timestep.advance(delta_time)
+        for _ in range(ticks):
+            self.update_tick()
+            self.rewind.tick(self)
+            if self.recorder:
+                self.recorder.end_tick(self)
+            if self.game_over_reached:
+                break
+        if self.profiler.enabled:
+            self.profiler.counters["ticks"] = ticks
+            self.profiler.counters["dropped ticks"] = self.timestep.dropped_ticks
+            self.profiler.counters["pooled sprites"] = sprite_pools.summary()
+
+    def update_tick(self):
+        """One fixed step of movement and game logic."""
+        if not self.headless:
+            self.interpolation.record(self.scene[name] for name in DYNAMIC_LAYERS)
+        self.update_physics()
+        self.update_scene()
+        self.update_animations(self.timestep.tick_length)
+        self.update_enemy_patrol()
+        if self.check_enemy_and_coin_collisions():
+            return
+
+        self.check_level_collisions()
+
+    def update_physics(self):
+        """Move the player with the physics engine."""
         self.player_sprite.update()
         # Move the player with the physics engine
         self.physics_engine.update()
@@ -555,14 +1273,25 @@ class GameView(arcade.View):
             self.player_sprite.is_on_ladder = False
             # self.process_keychange()
 
-
-        # Update walls, used with moving platforms
-        self.scene.update([LAYER_NAME_MOVING_PLATFORMS, LAYER_NAME_ENEMIES])
-
-        # Update Animations
-        self.scene.update_animation(
-            delta_time, [LAYER_NAME_COINS, LAYER_NAME_BACKGROUND, LAYER_NAME_ENEMIES, "Player"]
-        )
+    def update_scene(self):
+        # Update walls, used with moving platforms. Batched enemies are
+        # moved by update_enemy_patrol instead.
+        if self.enemy_patrol:
+            self.scene.update([LAYER_NAME_MOVING_PLATFORMS])
+        else:
+            self.scene.update([LAYER_NAME_MOVING_PLATFORMS, LAYER_NAME_ENEMIES])
+
+    def update_animations(self, delta_time):
+        # Update Animations: animated tiles, then the characters in one pass
+        self.scene.update_animation(delta_time, [LAYER_NAME_COINS, LAYER_NAME_BACKGROUND])
+        animate_sprites([self.scene[LAYER_NAME_ENEMIES], self.scene["Player"]], delta_time)
+
+    def update_enemy_patrol(self):
+        """Turn enemies around at the edges of their patrol."""
+        if self.enemy_patrol:
+            self.enemy_patrol.step()
+            self.world.move(self.enemy_patrol.crossed_sprites)
+            return
 
         for enemy in self.scene[LAYER_NAME_ENEMIES]:
             if (
@@ -579,85 +1308,101 @@ class GameView(arcade.View):
             ):
                 enemy.change_x *= -1
 
-        # See if we hit anything
-        player_collision_list = arcade.check_for_collision_with_lists(
-            self.player_sprite,
-            [
-                self.scene[LAYER_NAME_COINS],
-                self.scene[LAYER_NAME_ENEMIES],
-            ],
-        )
-        # Loop through each coin we hit (if any) and remove it
-        for collision in player_collision_list:
+        # The scene moved every enemy
+        self.world.move(self.scene[LAYER_NAME_ENEMIES])
 
-            if self.scene[LAYER_NAME_ENEMIES] in collision.sprite_lists:
-                arcade.play_sound(self.game_over)
-                game_over = GameOverView()
-                self.window.show_view(game_over)
-                return
-            else:
-
-                self.score += 1
-                # Figure out how many points this coin is worth
-                # if "Points" not in collision.properties:
-                #     print("Warning, collected a coin without a Points property.")
-                # else:
-                #     points = int(collision.properties["Points"])
-                #     self.score += points
-
-                # Remove the coin
-                collision.remove_from_sprite_lists()
-                arcade.play_sound(self.collect_coin_sound)
+    def check_enemy_and_coin_collisions(self):
+        """
+        Collect the coins the player touches. Returns True if the player ran
+        into an enemy and the game is over.
+        """
+        # See if we hit anything: coins, enemies, hazards and the exit in
+        # one lookup, kept for check_level_collisions
+        self.contacts = self.world.query(self.player_sprite)
 
-        # Position the camera
-        self.center_camera_to_player()
-        # Did the player fall off the map?
+        # Loop through each coin we hit (if any) and remove it
+        for collision in self.contacts["coins"]:
+            self.score += 1
+            # Figure out how many points this coin is worth
+            # if "Points" not in collision.properties:
+            #     print("Warning, collected a coin without a Points property.")
+            # else:
+            #     points = int(collision.properties["Points"])
+            #     self.score += points
+
+            # Remove the coin
+            self.world.remove(collision)
+            collision.remove_from_sprite_lists()
+            mixer.play_sfx(self.collect_coin_sound)
+
+        if self.contacts["enemies"]:
+            mixer.play_sfx(self.game_over)
+            self.end_game()
+            return True
+        return False
+
+    def check_level_collisions(self):
+        """Handle falling off the map, hazards and reaching the end of the level."""
+        contacts = self.contacts
+
+        # Did the player fall off the map? Back to the level as it was set
+        # up, with the score it was started with, as the coins come back too
         if self.player_sprite.center_y < -100:
-            self.player_sprite.center_x = PLAYER_START_X
-            self.player_sprite.center_y = PLAYER_START_Y
-
-            arcade.play_sound(self.game_over)
+            mixer.play_sfx(self.game_over)
+            self.load_state(self.spawn_state)
+            contacts = self.world.query(self.player_sprite)
 
         # Did the player touch something they should not?
-        if arcade.check_for_collision_with_list(
-            self.player_sprite, self.scene[LAYER_NAME_DONT_TOUCH]
-        ):
-            self.player_sprite.change_x = 0
-            self.player_sprite.change_y = 0
-            self.player_sprite.center_x = PLAYER_START_X
-            self.player_sprite.center_y = PLAYER_START_Y
-
-            arcade.play_sound(self.game_over)
-            self.setup()
+        if contacts["hazards"]:
+            # Back to the level as it was set up, without the score
+            mixer.play_sfx(self.game_over)
+            self.load_state(self.spawn_state)
+            self.score = 0
+            contacts = self.world.query(self.player_sprite)
         # See if the user got to the end of the level
         if self.player_sprite.center_x >= self.end_of_map:
-            # Advance to the next level
-            self.level += 1
+            self.next_level()
+            return
 
+        if contacts["exits"]:
+            self.next_level()
+
+    def end_game(self):
+        """Leave the game for the game over screen."""
+        self.game_over_reached = True
+        if self.window:
+            game_over = GameOverView()
+            self.window.show_view(game_over)
+
+    def next_level(self):
+        """Advance to the next level and time how long the swap takes."""
+        # There is nothing after the last level
+        if not os.path.exists(level_map_name(self.level + 1)):
+            self.end_game()
+            return
 
-            # Make sure to keep the score from this level when setting up the next level
-            self.reset_score = False
+        start_time = time.perf_counter()
 
-            # Load the next level
-            self.setup()
+        # Advance to the next level
+        self.level += 1
 
-        if arcade.check_for_collision_with_list(
-                self.player_sprite, self.scene[LAYER_NAME_END]
-        ):
-            self.level += 1
-            self.reset_score = False
-            self.setup()
+        # Make sure to keep the score from this level when setting up the next level
+        self.reset_score = False
+
+        # Load the next level
+        self.setup()
+
+        self.last_level_swap_time = time.perf_counter() - start_time
+        if self.on_level_swap:
+            self.on_level_swap(self.level, self.last_level_swap_time)
 class GameOverView(arcade.View):
     """Class to manage the game overview"""
 
-    def on_show_view(self):
-        """Called when switching to this view"""
-        arcade.set_background_color(arcade.color.BLACK)
-
-    def on_draw(self):
-        """Draw the game overview"""
-        self.clear()
-        arcade.draw_text(
+    def __init__(self):
+        super().__init__()
+        self.text = TextLayer()
+        self.text.add(
+            "title",
             "YOU DIED",
             SCREEN_WIDTH / 2,
             SCREEN_HEIGHT / 2,
@@ -667,15 +1412,40 @@ class GameOverView(arcade.View):
             font_name="Soul_Font"
         )
 
+    def on_show_view(self):
+        """Called when switching to this view"""
+        arcade.set_background_color(arcade.color.BLACK)
+
+    def on_draw(self):
+        """Draw the game overview"""
+        self.clear()
+        self.text.draw()
+
     def on_mouse_press(self, _x, _y, _button, _modifiers):
         """Use a mouse press to advance to the 'game' view."""
+        # The game reads what the loader loads, so whatever it has not
+        # done yet is done now rather than loaded twice
+        if self.loader is not None:
+            self.loader.finish()
         game_view = GameView()
         self.window.show_view(game_view)
-def main():
-    """Main function"""
+
+    def on_hide_view(self):
+        """Stop the loader's threads when leaving the menu."""
+        if self.loader is not None:
+            self.loader.shutdown()
+def open_menu():
+    """Open the window on the main menu. Returns the window."""
     window = arcade.Window(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+    load_fonts()
     menu_view = MainMenu()
     window.show_view(menu_view)
+    return window
+
+
+def main():
+    """Main function"""
+    open_menu()
     arcade.run()
 
 
@@ -0,0 +1,97 @@
+"""
+Headless simulation
+
+Runs GameView with no window, GL context, cameras or sound: the same
+tilemap loading, physics engine, enemy patrol and collision logic, stepped
+at a fixed timestep as fast as the CPU allows. Meant for CI boxes with no
+display.
+
+Usage:
+    python headless.py --level 1 --ticks 3600 --runs 10
+"""
+import argparse
+import json
+import time
+
+import arcade
+
+from game_mymap import GameView
+from timestep import TICK_LENGTH
+
+# Simulation step, one game tick per on_update
+TICK = TICK_LENGTH
+
+
+def scripted_input(tick):
+    """
+    Default input script: hold right the whole time and jump twice a second.
+    Returns (pressed, released) key lists for this tick.
+    """
+    pressed = []
+    released = []
+    if tick == 0:
+        pressed.append(arcade.key.RIGHT)
+    if tick % 30 == 0:
+        pressed.append(arcade.key.UP)
+    elif tick % 30 == 10:
+        released.append(arcade.key.UP)
+    return pressed, released
+
+
+def create_game(level=1, collision_backend=None):
+    """A set up, window-less GameView on the given level."""
+    game = GameView(headless=True)
+    game.level = level
+    game.setup(collision_backend)
+    return game
+
+
+def run(level=1, ticks=3600, inputs=scripted_input, delta_time=TICK, collision_backend=None):
+    """
+    Play one run of at most `ticks` ticks, stopping early on game over.
+    Returns the run's results, including its ticks per second.
+    """
+    game = create_game(level, collision_backend)
+    start_time = time.perf_counter()
+    tick = 0
+    while tick < ticks and not game.game_over_reached:
+        pressed, released = inputs(tick)
+        for key in pressed:
+            game.on_key_press(key, 0)
+        for key in released:
+            game.on_key_release(key, 0)
+        game.on_update(delta_time)
+        tick += 1
+    elapsed = time.perf_counter() - start_time
+    return {
+        "ticks": tick,
+        "seconds": elapsed,
+        "ticks_per_second": tick / elapsed if elapsed else 0.0,
+        "game_over": game.game_over_reached,
+        "level": game.level,
+        "score": game.score,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game without a window.")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=3600, help="ticks per run")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--collisions", choices=["sprites", "grid"], help="collision backend")
+    args = parser.parse_args()
+
+    results = [
+        run(args.level, args.ticks, collision_backend=args.collisions) for _ in range(args.runs)
+    ]
+    total_ticks = sum(result["ticks"] for result in results)
+    total_seconds = sum(result["seconds"] for result in results)
+    print(json.dumps({
+        "runs": results,
+        "ticks": total_ticks,
+        "ticks_per_second": total_ticks / total_seconds if total_seconds else 0.0,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
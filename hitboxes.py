@@ -0,0 +1,235 @@
+"""
+Shared hit-box polygons
+
+arcade traces a texture's hit box by scanning the alpha channel of its
+image, in Python, the first time the box is asked for. HitBoxCache keeps
+the traced outlines by image content, so a texture that is decoded again
+(after the texture registry dropped it, or in the next run) is not
+scanned again, and hands out one hit-box polygon per (texture name,
+scale) that every sprite showing that texture shares.
+
+The outlines can be traced offline into a sidecar file next to the
+images. The game reads it at startup and puts the outlines on the
+textures before any sprite asks for them:
+
+    python hitboxes.py                  # trace every WORLD*.tmx level
+    python hitboxes.py resources/WORLD1.tmx
+
+A cache with a vertex cap or a tolerance also simplifies the polygons it
+hands out, so the narrow phase of a collision check tests fewer edges.
+Tolerance is in world pixels, which is why hit boxes are kept per scale.
+Sprites the physics engine moves or stands on keep their full outline.
+"""
+import glob
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+
+import arcade
+
+SIDECAR_VERSION = 1
+
+# arcade 2.6 has no public way to read how a texture traces its hit box or
+# to hand it an outline traced elsewhere, so this module, and only this
+# module, uses these Texture attributes. Fail on import rather than with
+# wrong hit boxes if an arcade upgrade renames them.
+_TEXTURE_ATTRIBUTES = ("_hit_box_algorithm", "_hit_box_detail", "_hit_box_points")
+if not all(hasattr(arcade.Texture("hit-box-probe"), name) for name in _TEXTURE_ATTRIBUTES):
+    raise Exception(
+        f"hitboxes.py does not know the Texture hit-box attributes of arcade {arcade.version.VERSION}"
+    )
+
+
+def image_key(texture):
+    """What a traced outline depends on: the hit-box algorithm and the pixels."""
+    image = texture.image
+    digest = hashlib.sha1(image.tobytes()).hexdigest()
+    return f"{texture._hit_box_algorithm}-{texture._hit_box_detail}-{image.width}x{image.height}-{digest}"
+
+
+def simplify(points, max_vertices=None, tolerance=0.0):
+    """
+    Drop the vertices of a polygon that lie within tolerance of the line
+    between their neighbours, the closest first, then keep dropping the
+    closest until at most max_vertices are left. Never goes below a
+    triangle.
+    """
+    points = [tuple(point) for point in points]
+    limit = max(3, max_vertices) if max_vertices else None
+    while len(points) > 3:
+        count = len(points)
+        closest = None
+        closest_distance = None
+        for index in range(count):
+            x0, y0 = points[index - 1]
+            x1, y1 = points[index]
+            x2, y2 = points[(index + 1) % count]
+            base = math.hypot(x2 - x0, y2 - y0)
+            if base:
+                distance = abs((x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)) / base
+            else:
+                distance = math.hypot(x1 - x0, y1 - y0)
+            if closest_distance is None or distance < closest_distance:
+                closest = index
+                closest_distance = distance
+        if closest_distance > tolerance and (limit is None or count <= limit):
+            break
+        del points[closest]
+    return tuple(points)
+
+
+class HitBoxCache:
+    """
+    Hit boxes keyed by (texture name, scale), and the outlines they are
+    made from keyed by image_key(). max_vertices=None and tolerance=0
+    hand out arcade's own polygons unchanged.
+    """
+
+    def __init__(self, max_vertices=None, tolerance=0.0):
+        self.max_vertices = max_vertices
+        self.tolerance = tolerance
+        self.outlines = {}
+        self.hit_boxes = {}
+        # Hit boxes are traced while levels preload, off the main thread
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Outlines arcade had to trace, and ones taken from the sidecar
+        self.traced = 0
+        self.loaded = 0
+
+    def set_simplification(self, max_vertices=None, tolerance=0.0):
+        """Change the vertex cap and tolerance, forgetting the old hit boxes."""
+        with self.lock:
+            self.max_vertices = max_vertices
+            self.tolerance = tolerance
+            self.hit_boxes.clear()
+
+    def outline(self, texture):
+        """
+        The full outline of a texture. Taken from the sidecar outlines if
+        they have it, and put on the texture so arcade does not trace it.
+        """
+        if texture._hit_box_points is not None:
+            return texture._hit_box_points
+        key = image_key(texture)
+        with self.lock:
+            outline = self.outlines.get(key)
+        if outline is None:
+            outline = texture.hit_box_points
+            with self.lock:
+                self.outlines[key] = outline
+                self.traced += 1
+        else:
+            texture._hit_box_points = outline
+            with self.lock:
+                self.loaded += 1
+        return outline
+
+    def record(self, texture):
+        """Keep the outline of a texture arcade has traced already, for save()."""
+        outline = texture.hit_box_points
+        with self.lock:
+            self.outlines[image_key(texture)] = outline
+
+    def prime(self, texture):
+        """Put the sidecar outline on a texture before sprites are made with it."""
+        if texture._hit_box_points is None and self.outlines:
+            self.outline(texture)
+
+    def get(self, texture, scale=1.0):
+        """The hit box, in texture pixels, for sprites showing texture at scale."""
+        key = (texture.name, scale)
+        with self.lock:
+            hit_box = self.hit_boxes.get(key)
+            if hit_box is not None:
+                self.hits += 1
+                return hit_box
+            self.misses += 1
+        hit_box = simplify(self.outline(texture), self.max_vertices, self.tolerance / scale)
+        with self.lock:
+            # Another thread may have made it meanwhile, keep just one
+            hit_box = self.hit_boxes.setdefault(key, hit_box)
+        return hit_box
+
+    def apply(self, sprite, simplified=True):
+        """
+        Give a sprite the shared hit box of its current texture and scale,
+        or with simplified=False the full outline arcade would give it.
+        """
+        if simplified:
+            sprite.hit_box = self.get(sprite.texture, sprite.scale)
+        else:
+            sprite.hit_box = self.outline(sprite.texture)
+
+    def apply_to_lists(self, sprite_lists):
+        for sprite_list in sprite_lists:
+            for sprite in sprite_list:
+                self.apply(sprite)
+
+    def load(self, file_name):
+        """Read outlines traced offline by save(). A missing file is fine."""
+        if not os.path.exists(file_name):
+            return
+        with open(file_name) as sidecar:
+            data = json.load(sidecar)
+        if data.get("version") != SIDECAR_VERSION:
+            print(f"Warning, ignoring {file_name}, it is not a version {SIDECAR_VERSION} hit-box file")
+            return
+        with self.lock:
+            for key, points in data["outlines"].items():
+                self.outlines[key] = tuple(tuple(point) for point in points)
+
+    def save(self, file_name):
+        with self.lock:
+            outlines = {key: [list(point) for point in points] for key, points in sorted(self.outlines.items())}
+        with open(file_name, "w") as sidecar:
+            json.dump({"version": SIDECAR_VERSION, "outlines": outlines}, sidecar, separators=(",", ":"))
+
+    def stats(self):
+        return {
+            "hit_boxes": len(self.hit_boxes),
+            "outlines": len(self.outlines),
+            "hits": self.hits,
+            "misses": self.misses,
+            "traced": self.traced,
+            "loaded": self.loaded,
+            "max_vertices": self.max_vertices,
+            "tolerance": self.tolerance,
+        }
+
+    def clear(self):
+        """Forget every hit box and outline and reset the counters."""
+        with self.lock:
+            self.outlines.clear()
+            self.hit_boxes.clear()
+            self.hits = 0
+            self.misses = 0
+            self.traced = 0
+            self.loaded = 0
+
+
+hit_boxes = HitBoxCache()
+
+
+def main():
+    import game_mymap
+
+    game_mymap.load_resources()
+    # Trace everything again rather than keep outlines of old images
+    hit_boxes.clear()
+    map_names = sys.argv[1:] or sorted(glob.glob("resources/WORLD*.tmx"))
+    for map_name in map_names:
+        level = game_mymap.load_level(map_name)
+        for sprite_list in level.scene.sprite_lists:
+            for sprite in sprite_list:
+                hit_boxes.record(sprite.texture)
+    hit_boxes.save(game_mymap.HIT_BOX_FILE)
+    print(f"{len(hit_boxes.outlines)} outlines from {len(map_names)} levels -> {game_mymap.HIT_BOX_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+HUD and menu text
+
+arcade.draw_text lays its label out again whenever the text, position or
+color differ from the last call with the same style, and does its style
+lookups on every call. The views here keep one arcade.Text per string
+instead, whose layout is only redone when that string changes.
+"""
+import arcade
+
+# Font files the game uses, loaded once per process
+FONT_FILES = ["resources/Soul_Font.ttf"]
+_fonts_loaded = False
+
+
+def load_fonts():
+    """Register the game's fonts with pyglet, the first time only."""
+    global _fonts_loaded
+    if _fonts_loaded:
+        return
+    for font_file in FONT_FILES:
+        try:
+            arcade.load_font(font_file)
+        except FileNotFoundError as error:
+            print(f"Warning, {error}")
+    _fonts_loaded = True
+
+
+def warm_up_glyphs(characters, font_size, font_name):
+    """
+    Render characters in a font once, so the first text that shows them
+    finds their glyphs in pyglet's font atlas. Needs the GL context.
+    """
+    load_fonts()
+    arcade.Text(characters, 0, 0, font_size=font_size, font_name=font_name)
+
+
+class TextLayer:
+    """Named, persistent text objects, drawn together."""
+
+    def __init__(self):
+        load_fonts()
+        self.texts = {}
+
+    def add(self, name, text, start_x, start_y, color=arcade.color.WHITE, font_size=12, **kwargs):
+        """Create a text. kwargs are passed on to arcade.Text."""
+        self.texts[name] = arcade.Text(str(text), start_x, start_y, color, font_size, **kwargs)
+        return self.texts[name]
+
+    def set(self, name, text):
+        """Change a text. The layout is only rebuilt if it is different."""
+        self.texts[name].text = text
+
+    def draw(self):
+        for text in self.texts.values():
+            text.draw()
@@ -0,0 +1,420 @@
+"""
+Compiled binary level format
+
+A Tiled map (WORLD*.tmx / world*.tmj) is compiled once into a .lvl file
+next to it. The file holds a small JSON header followed by flat arrays:
+
+    magic "FSLV", format version, header length
+    header JSON   map size, tile table, layer table, object tables and
+                  the SHA-1, size and modification time of every source
+                  file the level was built from
+    per layer     uint16/uint32 tile-id grid (width * height, 0 = empty cell)
+                  uint16 tile index, float32 center x, float32 center y
+                  for every sprite, in world coordinates
+
+Loading memory-maps the file and builds the sprite lists straight from
+those arrays, with no XML/CSV/JSON parsing of the map itself. A compiled
+level whose sources changed since it was built is treated as stale and
+ignored, so the game falls back to the Tiled map. Sources are only read
+and hashed again when their size or modification time changed.
+
+Usage:
+    python level_format.py resources/WORLD1.tmx resources/WORLD2.tmx
+"""
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ElementTree
+from array import array
+from collections import OrderedDict
+
+import arcade
+import pytiled_parser
+from arcade.arcade_types import TiledObject
+from arcade.tilemap.tilemap import _get_image_info_from_tileset, _get_image_source
+
+MAGIC = b"FSLV"
+VERSION = 2
+HEADER = struct.Struct("<4sHI")
+
+# Map scaling the levels are compiled for, see TILE_SCALING in game_mymap.py
+DEFAULT_SCALING = 0.5
+
+
+def compiled_path(map_name):
+    """Where the compiled version of a map lives."""
+    return os.path.splitext(map_name)[0] + ".lvl"
+
+
+def file_digest(filename):
+    with open(filename, "rb") as source:
+        return hashlib.sha1(source.read()).hexdigest()
+
+
+def source_record(filename):
+    """[SHA-1, size, modification time in ns] of a source file, for the header."""
+    stat = os.stat(filename)
+    return [file_digest(filename), stat.st_size, stat.st_mtime_ns]
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _tileset_sources(map_name):
+    """External tileset files referenced by a .tmx or .tmj map."""
+    map_directory = os.path.dirname(os.path.abspath(map_name))
+    if map_name.endswith(".tmx"):
+        references = [
+            element.get("source") for element in ElementTree.parse(map_name).getroot().iter("tileset")
+        ]
+    else:
+        with open(map_name) as map_file:
+            references = [tileset.get("source") for tileset in json.load(map_file).get("tilesets", [])]
+    return [os.path.join(map_directory, source) for source in references if source]
+
+
+def _flatten_layers(layers):
+    for layer in layers:
+        if isinstance(layer, pytiled_parser.LayerGroup):
+            yield from _flatten_layers(layer.layers)
+        else:
+            yield layer
+
+
+def compile_level(map_name, scaling=DEFAULT_SCALING, output=None):
+    """Compile a Tiled map into a .lvl file. Returns the output path."""
+    output = output or compiled_path(map_name)
+    base_dir = os.path.dirname(os.path.abspath(output))
+    tile_map = arcade.TileMap(map_name, scaling)
+    tiled_map = tile_map.tiled_map
+    map_directory = os.path.dirname(tiled_map.map_file)
+    map_height_px = tiled_map.map_size.height * tiled_map.tile_size[1]
+
+    # Files whose changes make the compiled level stale
+    sources = {os.path.abspath(map_name)}
+    sources.update(os.path.abspath(source) for source in _tileset_sources(map_name))
+
+    tiles = []
+    tile_indexes = {}
+
+    def tile_index(gid):
+        if gid not in tile_indexes:
+            tile = tile_map._get_tile_by_gid(gid)
+            if tile is None:
+                raise ValueError(f"Couldn't find tile for item {gid} in file '{map_name}'.")
+            image_file = _get_image_source(tile, map_directory)
+            if image_file is None:
+                raise ValueError(f"Couldn't find image for tile {tile.id} in file '{map_name}'.")
+            image_x, image_y, width, height = _get_image_info_from_tileset(tile)
+            properties = dict(tile.properties or {})
+            properties["tile_id"] = tile.id
+            if tile.class_:
+                properties["type"] = tile.class_
+            tile_indexes[gid] = len(tiles)
+            tiles.append({
+                "image": os.path.relpath(image_file, base_dir),
+                "rect": [image_x, image_y, width, height],
+                "flipped": [
+                    tile.flipped_horizontally,
+                    tile.flipped_vertically,
+                    tile.flipped_diagonally,
+                ],
+                "properties": _jsonable(properties),
+            })
+        return tile_indexes[gid]
+
+    layers = []
+    blobs = []
+    for layer in _flatten_layers(tiled_map.layers):
+        entry = {
+            "name": layer.name,
+            "visible": layer.visible,
+            "opacity": layer.opacity,
+            "tint": _jsonable(layer.tint_color),
+            "properties": _jsonable(layer.properties) if layer.properties else None,
+        }
+        if isinstance(layer, pytiled_parser.TileLayer):
+            grid = array("I")
+            indexes = array("H")
+            xs = array("f")
+            ys = array("f")
+            for row_index, row in enumerate(layer.data):
+                for column_index, item in enumerate(row):
+                    grid.append(item)
+                    if item == 0:
+                        continue
+                    index = tile_index(item)
+                    width, height = tiles[index]["rect"][2:]
+                    indexes.append(index)
+                    xs.append(column_index * (tiled_map.tile_size[0] * scaling) + width * scaling / 2)
+                    ys.append(
+                        (tiled_map.map_size.height - row_index - 1) * (tiled_map.tile_size[1] * scaling)
+                        + height * scaling / 2
+                    )
+            # Grids without flip flags or huge tilesets fit in 16 bits
+            if not grid or max(grid) <= 0xFFFF:
+                grid = array("H", grid)
+            entry["kind"] = "tiles"
+            entry["columns"] = len(layer.data[0]) if layer.data else 0
+            entry["rows"] = len(layer.data)
+            entry["count"] = len(indexes)
+            entry["arrays"] = []
+            for data in (grid, indexes, xs, ys):
+                entry["arrays"].append(len(blobs))
+                blobs.append(data)
+            layers.append(entry)
+        elif isinstance(layer, pytiled_parser.ObjectLayer):
+            sprites = []
+            for cur_object in layer.tiled_objects:
+                if not isinstance(cur_object, pytiled_parser.tiled_object.Tile):
+                    continue
+                x = cur_object.coordinates.x * scaling
+                y = (map_height_px - cur_object.coordinates.y) * scaling
+                width = cur_object.size[0] * scaling
+                height = cur_object.size[1] * scaling
+                angle = -cur_object.rotation if cur_object.rotation else 0
+                center_x, center_y = arcade.rotate_point(width / 2, height / 2, 0, 0, angle)
+                properties = dict(cur_object.properties or {})
+                if cur_object.class_:
+                    properties["type"] = cur_object.class_
+                if cur_object.name:
+                    properties["name"] = cur_object.name
+                sprites.append({
+                    "tile": tile_index(cur_object.gid),
+                    "position": [x + center_x, y + center_y],
+                    "size": [width, height],
+                    "angle": angle,
+                    "properties": _jsonable(properties),
+                })
+            entry["kind"] = "objects"
+            entry["sprites"] = sprites
+            entry["objects"] = [
+                {
+                    "shape": _jsonable(tiled_object.shape),
+                    "properties": _jsonable(tiled_object.properties),
+                    "name": tiled_object.name,
+                    "type": tiled_object.type,
+                }
+                for tiled_object in tile_map.object_lists.get(layer.name, [])
+            ]
+            layers.append(entry)
+
+    header = {
+        "sources": {
+            os.path.relpath(source, base_dir): source_record(source) for source in sorted(sources)
+        },
+        "scaling": scaling,
+        "width": tile_map.width,
+        "height": tile_map.height,
+        "tile_width": tile_map.tile_width,
+        "tile_height": tile_map.tile_height,
+        "background_color": _jsonable(tile_map.background_color),
+        "properties": _jsonable(tile_map.properties) if tile_map.properties else None,
+        "tiles": tiles,
+        "layers": layers,
+        "arrays": [],
+    }
+
+    # Array offsets are relative to the end of the header
+    offset = 0
+    for data in blobs:
+        header["arrays"].append([data.typecode, offset, len(data)])
+        offset += len(data) * data.itemsize
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    header_bytes += b" " * (-(HEADER.size + len(header_bytes)) % 4)
+
+    with open(output, "wb") as level_file:
+        level_file.write(HEADER.pack(MAGIC, VERSION, len(header_bytes)))
+        level_file.write(header_bytes)
+        for data in blobs:
+            data.tofile(level_file)
+    return output
+
+
+class CompiledTileMap:
+    """
+    The parts of arcade.TileMap the game uses, built from a .lvl file.
+    Scene.from_tilemap() accepts it like a regular TileMap.
+    """
+
+    def __init__(self, header, sprite_lists, object_lists, tile_grids):
+        self.tiled_map = None
+        self.width = header["width"]
+        self.height = header["height"]
+        self.tile_width = header["tile_width"]
+        self.tile_height = header["tile_height"]
+        self.scaling = header["scaling"]
+        self.background_color = tuple(header["background_color"]) if header["background_color"] else None
+        self.properties = header["properties"]
+        self.sprite_lists = sprite_lists
+        self.object_lists = object_lists
+        # Layer name -> flat tile-id array, row 0 at the top of the map
+        self.tile_grids = tile_grids
+
+    def get_cartesian(self, x, y):
+        """Same as arcade.TileMap.get_cartesian."""
+        x = math.floor(x / (self.tile_width * self.scaling))
+        y = math.floor(y / (self.tile_height * self.scaling))
+        return x, y
+
+
+def read_header(level_file):
+    magic, version, header_length = HEADER.unpack(level_file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        return None
+    return json.loads(level_file.read(header_length))
+
+
+def is_stale(level_path, header):
+    """
+    True if any file the level was compiled from has changed. A file is
+    only hashed if its size is the same but its modification time is not.
+    """
+    base_dir = os.path.dirname(os.path.abspath(level_path))
+    for source, (digest, size, mtime) in header["sources"].items():
+        source = os.path.join(base_dir, source)
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return True
+        if stat.st_size != size:
+            return True
+        if stat.st_mtime_ns != mtime and file_digest(source) != digest:
+            return True
+    return False
+
+
+def load_compiled_level(map_name, scaling=DEFAULT_SCALING, layer_options=None, hit_boxes=None):
+    """
+    Build a CompiledTileMap for map_name from its .lvl file. Returns None if
+    there is no compiled file, or it is stale or built for another scaling.
+    Tile textures take their hit-box outlines from hit_boxes, a HitBoxCache,
+    when one is given. A layer's "sprite_factory" option, a function of
+    (texture, scaling), makes that layer's sprites instead of arcade.Sprite.
+    """
+    level_path = compiled_path(map_name)
+    if not os.path.exists(level_path):
+        return None
+    with open(level_path, "rb") as level_file:
+        header = read_header(level_file)
+        if header is None:
+            print(f"Warning, {level_path} is not a version {VERSION} compiled level, loading {map_name}")
+            return None
+        if header["scaling"] != scaling:
+            # Built for another game, nothing is wrong with it
+            return None
+        if is_stale(level_path, header):
+            print(f"Warning, compiled level {level_path} is stale, loading {map_name}")
+            return None
+        data = mmap.mmap(level_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    layer_options = layer_options or {}
+    base_dir = os.path.dirname(os.path.abspath(level_path))
+    start = HEADER.size + struct.unpack_from("<I", data, 6)[0]
+    view = memoryview(data)
+    arrays = [
+        view[start + offset:start + offset + count * array(typecode).itemsize].cast(typecode)
+        for typecode, offset, count in header["arrays"]
+    ]
+
+    # One texture per tile, shared by all sprites of that tile
+    textures = []
+    for tile in header["tiles"]:
+        image_x, image_y, width, height = tile["rect"]
+        flipped_horizontally, flipped_vertically, flipped_diagonally = tile["flipped"]
+        textures.append(arcade.load_texture(
+            os.path.normpath(os.path.join(base_dir, tile["image"])),
+            image_x, image_y, width, height,
+            flipped_horizontally=flipped_horizontally,
+            flipped_vertically=flipped_vertically,
+            flipped_diagonally=flipped_diagonally,
+        ))
+        if hit_boxes is not None:
+            # Before any sprite is made with it, so arcade does not trace it
+            hit_boxes.prime(textures[-1])
+
+    def make_sprite(index, sprite_factory=None):
+        if sprite_factory:
+            sprite = sprite_factory(textures[index], scaling)
+        else:
+            sprite = arcade.Sprite(scale=scaling, texture=textures[index])
+        sprite.properties.update(header["tiles"][index]["properties"])
+        return sprite
+
+    sprite_lists = OrderedDict()
+    object_lists = OrderedDict()
+    tile_grids = {}
+    for layer in header["layers"]:
+        options = layer_options.get(layer["name"], {})
+        sprite_list = arcade.SpriteList(
+            use_spatial_hash=options.get("use_spatial_hash"),
+            capacity=layer.get("count") or len(layer.get("sprites", [])) or 1,
+        )
+        alpha = int(layer["opacity"] * 255) if layer["opacity"] else None
+        if layer["kind"] == "tiles":
+            grid, indexes, xs, ys = (arrays[i] for i in layer["arrays"])
+            tile_grids[layer["name"]] = array(grid.format, grid)
+            for index, center_x, center_y in zip(indexes, xs, ys):
+                sprite = make_sprite(index, options.get("sprite_factory"))
+                sprite.position = (center_x, center_y)
+                if layer["tint"]:
+                    sprite.color = tuple(layer["tint"])
+                if alpha:
+                    sprite.alpha = alpha
+                sprite_list.append(sprite)
+        else:
+            for record in layer["sprites"]:
+                sprite = make_sprite(record["tile"], options.get("sprite_factory"))
+                sprite.width, sprite.height = record["size"]
+                sprite.position = tuple(record["position"])
+                sprite.angle = record["angle"]
+                if layer["tint"]:
+                    sprite.color = tuple(layer["tint"])
+                if alpha:
+                    sprite.alpha = alpha
+                properties = record["properties"]
+                for name in ("change_x", "change_y"):
+                    if name in properties:
+                        setattr(sprite, name, float(properties[name]))
+                for name in ("boundary_bottom", "boundary_top", "boundary_left", "boundary_right"):
+                    if name in properties:
+                        setattr(sprite, name, float(properties[name]))
+                sprite.properties.update(properties)
+                sprite_list.append(sprite)
+            if layer["objects"]:
+                object_lists[layer["name"]] = [
+                    TiledObject(item["shape"], item["properties"], item["name"], item["type"])
+                    for item in layer["objects"]
+                ]
+        sprite_list.visible = layer["visible"]
+        if layer["properties"]:
+            sprite_list.properties = layer["properties"]
+        if layer["kind"] == "tiles" or len(sprite_list):
+            sprite_lists[layer["name"]] = sprite_list
+
+    for memory in arrays:
+        memory.release()
+    view.release()
+    data.close()
+    return CompiledTileMap(header, sprite_lists, object_lists, tile_grids)
+
+
+def main():
+    for map_name in sys.argv[1:]:
+        output = compile_level(map_name)
+        print(f"{map_name} -> {output} ({os.path.getsize(output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Level cache
+
+Keeps parsed tile maps and their scenes in memory so restarting a level
+resets sprites from a snapshot instead of parsing the map file again.
+
+The LevelPreloader reads the next level on a worker thread while the
+current one is played, so the swap at the level boundary only has to
+build sprites from data that is already in memory.
+"""
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import arcade
+import PIL.Image
+import pytiled_parser
+
+# Rough memory held by one tile sprite plus its share of the parsed map,
+# measured on WORLD2. Used to keep the cache under its byte cap.
+SPRITE_BYTES_ESTIMATE = 1300
+
+# Sprite attributes that gameplay changes and a restart has to put back
+SNAPSHOT_ATTRIBUTES = (
+    "cur_texture",
+    "facing_direction",
+    "animation_state",
+    "animation_time",
+    "is_on_ladder",
+    "climbing",
+)
+
+
+def snapshot_sprite(sprite):
+    """Capture the mutable state of one sprite."""
+    extra = {
+        name: getattr(sprite, name)
+        for name in SNAPSHOT_ATTRIBUTES
+        if hasattr(sprite, name)
+    }
+    return (
+        sprite.texture,
+        sprite.width,
+        sprite.height,
+        sprite.center_x,
+        sprite.center_y,
+        sprite.change_x,
+        sprite.change_y,
+        sprite.angle,
+        extra,
+    )
+
+
+def restore_sprite(sprite, state):
+    """Put a sprite back into a state captured by snapshot_sprite."""
+    texture, width, height, center_x, center_y, change_x, change_y, angle, extra = state
+    sprite.texture = texture
+    sprite.width = width
+    sprite.height = height
+    sprite.center_x = center_x
+    sprite.center_y = center_y
+    sprite.change_x = change_x
+    sprite.change_y = change_y
+    sprite.angle = angle
+    for name, value in extra.items():
+        setattr(sprite, name, value)
+
+
+class CachedLevel:
+    """
+    A loaded level: its tile map, its scene and a pristine snapshot of the
+    scene taken right after it was built.
+
+    Only sprites in dynamic_layers have their state restored; the other
+    layers never move, so for them only list membership (e.g. collected
+    coins) is put back.
+    """
+
+    def __init__(self, tile_map, scene, dynamic_layers=()):
+        self.tile_map = tile_map
+        self.scene = scene
+        self.dynamic_layers = [name for name in dynamic_layers if name in scene.name_mapping]
+        self.members = {}
+        self.states = {}
+        # What to take out of the sprite pools to play the level again,
+        # while its pooled sprites are given back (see the game's
+        # release_level()), None while they are in the scene
+        self.spawns = None
+        # Collision grid and chunked drawing of the static layers, built
+        # on first use
+        self.tile_grid = None
+        self.renderer = None
+        self.snapshot()
+
+    def snapshot(self):
+        """Remember the current scene as the state to restart from."""
+        self.members = {
+            name: list(sprite_list) for name, sprite_list in self.scene.name_mapping.items()
+        }
+        self.states = {}
+        for name in self.dynamic_layers:
+            for sprite in self.scene[name]:
+                self.states[sprite] = snapshot_sprite(sprite)
+
+    def restore(self):
+        """Reset the scene to the snapshot taken by snapshot()."""
+        for name, sprites in self.members.items():
+            sprite_list = self.scene[name]
+            if sprite_list.sprite_list == sprites:
+                continue
+            wanted = set(sprites)
+            for sprite in list(sprite_list):
+                if sprite not in wanted:
+                    sprite_list.remove(sprite)
+            for sprite in sprites:
+                if sprite_list not in sprite.sprite_lists:
+                    sprite_list.append(sprite)
+        for sprite, state in self.states.items():
+            restore_sprite(sprite, state)
+
+    @property
+    def size_bytes(self):
+        """Estimated memory held by this level."""
+        sprites = sum(len(sprites) for sprites in self.members.values())
+        if self.spawns is not None:
+            sprites += sum(len(entries) for entries in self.spawns.values())
+        return SPRITE_BYTES_ESTIMATE * sprites
+
+
+class LevelCache:
+    """
+    Least recently used cache of CachedLevel objects. Levels are dropped
+    once there are more than max_levels of them, or once their estimated
+    size goes over max_bytes. on_evict, if given, is called with every
+    level that is dropped, e.g. to pool its sprites.
+    """
+
+    def __init__(self, max_levels=3, max_bytes=None, on_evict=None):
+        self.max_levels = max_levels
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.levels = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached level for key, or None."""
+        level = self.levels.get(key)
+        if level is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.levels.move_to_end(key)
+        return level
+
+    def put(self, key, level):
+        """Add a level, dropping the least recently used ones if needed."""
+        self.levels[key] = level
+        self.levels.move_to_end(key)
+        while len(self.levels) > 1 and (
+            len(self.levels) > self.max_levels
+            or (self.max_bytes is not None and self.size_bytes > self.max_bytes)
+        ):
+            _, level = self.levels.popitem(last=False)
+            self.evictions += 1
+            self._evicted(level)
+
+    def _evicted(self, level):
+        if self.on_evict is not None:
+            self.on_evict(level)
+
+    def discard(self, key):
+        """Forget one level."""
+        level = self.levels.pop(key, None)
+        if level is not None:
+            self._evicted(level)
+
+    def clear(self):
+        """Forget every level."""
+        levels = list(self.levels.values())
+        self.levels.clear()
+        for level in levels:
+            self._evicted(level)
+
+    @property
+    def size_bytes(self):
+        return sum(level.size_bytes for level in self.levels.values())
+
+    def stats(self):
+        return {
+            "levels": list(self.levels),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size_bytes": self.size_bytes,
+        }
+
+
+def is_image_file(path):
+    """True if PIL has a decoder for the file's extension."""
+    return Path(path).suffix.lower() in PIL.Image.registered_extensions()
+
+
+def prepare_level(map_name, warm_up=None):
+    """
+    Do the CPU-side part of loading a level: parse the map file and decode
+    every image its tilesets use into arcade's texture cache. warm_up, if
+    given, is called with the parsed map to decode anything else the level
+    needs (e.g. character textures).
+
+    Nothing here touches OpenGL, so it is safe to run on a worker thread.
+    """
+    tiled_map = pytiled_parser.parse_map(Path(map_name))
+    images = []
+    for tileset in tiled_map.tilesets.values():
+        if tileset.image:
+            images.append(tileset.image)
+        for tile in (tileset.tiles or {}).values():
+            # Tilesets may list files that are not images (my_tileset.tsx
+            # lists world2.tmj), or missing tiles no map uses; arcade
+            # reports those itself if a level really needs them
+            if tile.image and os.path.exists(tile.image) and is_image_file(tile.image):
+                images.append(tile.image)
+    for image in images:
+        arcade.load_texture(image)
+    if warm_up:
+        warm_up(tiled_map)
+    return tiled_map
+
+
+class LevelPreloader:
+    """
+    Prepares levels on a single background thread.
+
+    preload() starts preparing a map, take() hands back its parsed map,
+    waiting for the worker if it is not done yet. A map that fails to
+    load is reported once, when it fails, and kept in failed.
+    """
+
+    def __init__(self, warm_up=None):
+        self.warm_up = warm_up
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-preload")
+        self.pending = {}
+        # (map name, error) of the maps that failed
+        self.failed = []
+
+    def preload(self, map_name):
+        """Start preparing map_name, unless it is missing or already queued."""
+        if map_name in self.pending or not os.path.exists(map_name):
+            return
+        self.pending[map_name] = self.executor.submit(self._prepare, map_name)
+
+    def _prepare(self, map_name):
+        try:
+            return prepare_level(map_name, self.warm_up)
+        except Exception as error:
+            print(f"Warning, preloading {map_name} failed: {error}")
+            self.failed.append((map_name, str(error)))
+            return None
+
+    def take(self, map_name):
+        """
+        Return the parsed map for map_name, or None if it was never
+        preloaded or failed to load (the caller then loads it normally).
+        """
+        future = self.pending.pop(map_name, None)
+        if future is None:
+            return None
+        return future.result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
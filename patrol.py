@@ -0,0 +1,130 @@
+"""
+Enemy patrol
+
+Holds the position, velocity and patrol bounds of every enemy in numpy
+arrays, so moving the enemies and turning them around at the edges of
+their patrol is one batched step per frame instead of a Python loop over
+the sprites. Only the sprites that moved or turned are written back.
+
+numpy is optional. Without it HAVE_NUMPY is False and GameView keeps its
+per-sprite patrol loop. It is only imported by load_numpy(), at the
+latest by the first EnemyPatrol, as it is a good part of the game's
+import time.
+"""
+import importlib.util
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+numpy = None
+
+
+def load_numpy():
+    """Import numpy, the first time only."""
+    global numpy
+    if numpy is None:
+        import numpy
+    return numpy
+
+
+class EnemyPatrol:
+    """
+    Batched kinematics of the sprites in one SpriteList.
+
+    While an EnemyPatrol is in use its arrays are the source of truth for
+    the enemies' position and change_x. Call pull() after moving an enemy
+    sprite by hand, so the arrays pick up the change.
+
+    With a cell_size, step() also lists in crossed_sprites the enemies
+    whose hit box entered a different set of cells of a grid of that size,
+    the only ones a spatial index has to re-bin.
+    """
+
+    def __init__(self, sprite_list, cell_size=None):
+        if not HAVE_NUMPY:
+            raise Exception("EnemyPatrol needs numpy.")
+        load_numpy()
+        self.sprite_list = sprite_list
+        self.cell_size = cell_size
+        # Sprites moved by the last step(), and those that changed cells
+        self.moved_sprites = []
+        self.crossed_sprites = []
+        self.pull()
+
+    def pull(self):
+        """Read the state of every sprite in the list into the arrays."""
+        sprites = list(self.sprite_list)
+        self.sprites = sprites
+        count = len(sprites)
+        self.x = numpy.fromiter((sprite.center_x for sprite in sprites), float, count)
+        self.y = numpy.fromiter((sprite.center_y for sprite in sprites), float, count)
+        self.change_x = numpy.fromiter((sprite.change_x for sprite in sprites), float, count)
+        self.change_y = numpy.fromiter((sprite.change_y for sprite in sprites), float, count)
+
+        # Hit boxes do not change with the animation frame, so the edges
+        # stay at a fixed distance from the center
+        self.left_offset = self.x - numpy.fromiter((sprite.left for sprite in sprites), float, count)
+        self.right_offset = numpy.fromiter((sprite.right for sprite in sprites), float, count) - self.x
+
+        # A missing or zero boundary means no patrol on that side
+        self.boundary_left = numpy.fromiter(
+            (sprite.boundary_left or 0 for sprite in sprites), float, count
+        )
+        self.boundary_right = numpy.fromiter(
+            (sprite.boundary_right or 0 for sprite in sprites), float, count
+        )
+        self.has_left = self.boundary_left != 0
+        self.has_right = self.boundary_right != 0
+
+        if self.cell_size:
+            self.bottom_offset = self.y - numpy.fromiter((sprite.bottom for sprite in sprites), float, count)
+            self.top_offset = numpy.fromiter((sprite.top for sprite in sprites), float, count) - self.y
+            self.cells = self.cell_ranges()
+
+    def step(self):
+        """
+        Move every enemy by its velocity, then turn around the ones past
+        the edge of their patrol, like Sprite.update followed by the
+        per-sprite patrol check.
+        """
+        if len(self.sprite_list) != len(self.sprites):
+            self.pull()
+
+        moved = numpy.flatnonzero((self.change_x != 0) | (self.change_y != 0))
+        self.x += self.change_x
+        self.y += self.change_y
+
+        # Checked one side after the other, like the per-sprite loop: an
+        # enemy past both edges turns twice and keeps going
+        past_right = self.has_right & (self.x + self.right_offset > self.boundary_right) & (self.change_x > 0)
+        self.change_x[past_right] *= -1
+        past_left = self.has_left & (self.x - self.left_offset < self.boundary_left) & (self.change_x < 0)
+        self.change_x[past_left] *= -1
+        turned = numpy.flatnonzero(past_right ^ past_left)
+
+        self.push(moved, turned)
+
+        if self.cell_size:
+            cells = self.cell_ranges()
+            crossed = numpy.flatnonzero((cells != self.cells).any(axis=1))
+            self.cells = cells
+            self.crossed_sprites = [self.sprites[index] for index in crossed.tolist()]
+
+    def cell_ranges(self):
+        """First and last grid cell covered by every hit box, one row per enemy."""
+        return numpy.floor_divide(
+            numpy.stack([
+                self.x - self.left_offset,
+                self.y - self.bottom_offset,
+                self.x + self.right_offset,
+                self.y + self.top_offset,
+            ], axis=1),
+            self.cell_size,
+        )
+
+    def push(self, moved, turned):
+        """Write the new state of the moved and turned sprites back."""
+        sprites = self.sprites
+        self.moved_sprites = [sprites[index] for index in moved.tolist()]
+        for sprite, x, y in zip(self.moved_sprites, self.x[moved].tolist(), self.y[moved].tolist()):
+            sprite.position = (x, y)
+        for index, change_x in zip(turned.tolist(), self.change_x[turned].tolist()):
+            sprites[index].change_x = change_x
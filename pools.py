@@ -0,0 +1,102 @@
+"""
+Object pools
+
+Sprites that a level builds by the dozen, like enemies and coins, are
+taken from a Pool of their class instead of being constructed, and put
+back into it when their level is dropped. A pooled object is reset to a
+fresh state rather than constructed again, so loading and dropping
+levels does not leave the garbage collector a pile of sprites and
+sprite list references to walk.
+
+A pooled class needs a constructor without arguments and a reset()
+method, which is also called on new objects, with the arguments given to
+acquire(). A release() method, if it has one, is called when an object
+goes back to its pool, to let go of what an idle object does not need.
+"""
+import threading
+
+
+class Pool:
+    """Idle objects of one class, and counters to watch the pool with."""
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.idle = []
+        # Objects handed out and not released yet, and the most at once
+        self.in_use = 0
+        self.high_water = 0
+        # Objects constructed, and handed out again after a release
+        self.allocations = 0
+        self.reuses = 0
+        self.releases = 0
+        # The level preloader thread takes sprites from the pools too
+        self.lock = threading.Lock()
+
+    def acquire(self, *args):
+        """An idle object, or a new one if there is none, reset with args."""
+        with self.lock:
+            obj = self.idle.pop() if self.idle else None
+            if obj is not None:
+                self.reuses += 1
+            else:
+                self.allocations += 1
+            self.in_use += 1
+            if self.in_use > self.high_water:
+                self.high_water = self.in_use
+        # Made and reset outside the lock, a sprite is only in one place
+        if obj is None:
+            obj = self.cls()
+        obj.reset(*args)
+        return obj
+
+    def release(self, obj):
+        """Take an object back. The caller must not use it any more."""
+        if hasattr(obj, "release"):
+            obj.release()
+        with self.lock:
+            self.idle.append(obj)
+            self.in_use -= 1
+            self.releases += 1
+
+    def stats(self):
+        return {
+            "in_use": self.in_use,
+            "idle": len(self.idle),
+            "high_water": self.high_water,
+            "allocations": self.allocations,
+            "reuses": self.reuses,
+            "releases": self.releases,
+        }
+
+
+class Pools:
+    """One Pool per class, made on first use."""
+
+    def __init__(self):
+        self.pools = {}
+        self.lock = threading.Lock()
+
+    def pool(self, cls):
+        pool = self.pools.get(cls)
+        if pool is None:
+            with self.lock:
+                pool = self.pools.setdefault(cls, Pool(cls))
+        return pool
+
+    def acquire(self, cls, *args):
+        return self.pool(cls).acquire(*args)
+
+    def release(self, obj):
+        self.pool(type(obj)).release(obj)
+
+    def stats(self):
+        """Counters of every pool, by class name."""
+        return {cls.__name__: pool.stats() for cls, pool in list(self.pools.items())}
+
+    def summary(self):
+        """One line of the counters added up over every pool."""
+        pools = list(self.pools.values())
+        in_use = sum(pool.in_use for pool in pools)
+        high_water = sum(pool.high_water for pool in pools)
+        allocations = sum(pool.allocations for pool in pools)
+        return f"{in_use} in use, {high_water} high water, {allocations} allocated"
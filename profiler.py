@@ -0,0 +1,253 @@
+"""
+Frame profiler
+
+Times each phase of GameView.on_update and on_draw with time.perf_counter
+and keeps the last few seconds of samples per phase, so the overlay can
+show frame ms, per-phase ms, sprite counts per layer and draw calls.
+
+Phases are timed by wrapping the GameView methods on the instance while
+the profiler is enabled. Disabling it removes the wrappers again, so a
+game that never turns it on runs exactly the same code as before.
+Draw calls are counted by wrapping arcade's Geometry.render, which
+disable() puts back even if removing the other wrappers fails.
+"""
+import math
+import time
+from collections import deque
+
+import arcade
+from arcade.gl import Geometry
+
+# Phase name -> GameView methods whose time counts towards it
+PHASES = {
+    "physics": ["update_physics"],
+    "scene_update": ["update_scene"],
+    "animation": ["update_animations"],
+    "enemy_patrol": ["update_enemy_patrol"],
+    "collisions": ["check_enemy_and_coin_collisions", "check_level_collisions"],
+    "camera": ["center_camera_to_player"],
+    "draw_scene": ["draw_scene"],
+    "draw_gui": ["draw_gui"],
+}
+
+# Frames of samples kept for the rolling statistics, 2 seconds at 60 fps
+HISTORY_FRAMES = 120
+
+# Width of one histogram bucket, and number of buckets
+HISTOGRAM_BUCKET_MS = 1.0
+HISTOGRAM_BUCKETS = 17
+# Characters the overlay draws a bucket with, from empty to the fullest
+HISTOGRAM_SHADES = " .:-=+*#"
+
+# Frames between two rebuilds of the overlay text
+OVERLAY_REFRESH_FRAMES = 15
+OVERLAY_FONT_SIZE = 10
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+
+def summarize(samples):
+    """Summary of a list of durations in seconds, in milliseconds."""
+    ordered = sorted(sample * 1000 for sample in samples)
+    return {
+        "mean": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+def histogram_text(counts):
+    """One character per bucket of a histogram, scaled to its fullest bucket."""
+    top = max(counts, default=0)
+    if not top:
+        return " " * len(counts)
+    last = len(HISTOGRAM_SHADES) - 1
+    return "".join(HISTOGRAM_SHADES[math.ceil(count * last / top)] for count in counts)
+
+
+class FrameProfiler:
+    """
+    Per-phase frame timings of one GameView.
+
+    begin_frame() is called at the start of on_update and end_frame() at
+    the end of on_draw (or of the tick, when nothing is drawn). With
+    history=None every frame is kept, which is what benchmarks want.
+    """
+
+    # Profiler counting Geometry.render calls, and the unpatched method
+    _counting = None
+    _original_render = Geometry.render
+
+    def __init__(self, phases=PHASES, history=HISTORY_FRAMES):
+        self.phases = phases
+        self.enabled = False
+        self.target = None
+        self.current = dict.fromkeys(phases, 0.0)
+        self.samples = {name: deque(maxlen=history) for name in list(phases) + ["frame"]}
+        self.draw_call_samples = deque(maxlen=history)
+        self.draw_calls = 0
+        self.frame_start = None
+        self.frames = 0
+        # Name -> latest value of other things worth showing, e.g. chunks drawn
+        self.counters = {}
+
+    def enable(self, target):
+        """Start timing the phase methods of target."""
+        if self.enabled:
+            self.disable()
+        self.target = target
+        for phase, method_names in self.phases.items():
+            for method_name in method_names:
+                method = getattr(target, method_name, None)
+                if method is not None:
+                    setattr(target, method_name, self._timed(phase, method))
+        self._count_draw_calls(True)
+        self.enabled = True
+
+    def disable(self):
+        """Stop timing, putting the original methods back."""
+        if not self.enabled:
+            return
+        try:
+            for method_names in self.phases.values():
+                for method_name in method_names:
+                    self.target.__dict__.pop(method_name, None)
+        finally:
+            self._count_draw_calls(False)
+            self.target = None
+            self.frame_start = None
+            self.enabled = False
+
+    def toggle(self, target):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable(target)
+
+    def _timed(self, phase, method):
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                current[phase] += time.perf_counter() - start_time
+
+        return timed
+
+    def _count_draw_calls(self, counting):
+        """Count every arcade Geometry.render call while enabled."""
+        cls = FrameProfiler
+        if counting:
+            cls._counting = self
+            if Geometry.render is cls._original_render:
+                def render(geometry, *args, **kwargs):
+                    if cls._counting:
+                        cls._counting.draw_calls += 1
+                    return cls._original_render(geometry, *args, **kwargs)
+
+                Geometry.render = render
+        elif cls._counting is self:
+            cls._counting = None
+            Geometry.render = cls._original_render
+
+    def begin_frame(self):
+        """Start timing a frame."""
+        for phase in self.current:
+            self.current[phase] = 0.0
+        self.draw_calls = 0
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        """Finish the frame started by begin_frame and store its samples."""
+        if self.frame_start is None:
+            return
+        self.samples["frame"].append(time.perf_counter() - self.frame_start)
+        for phase, seconds in self.current.items():
+            self.samples[phase].append(seconds)
+        self.draw_call_samples.append(self.draw_calls)
+        self.frame_start = None
+        self.frames += 1
+
+    def summary(self, name):
+        """mean/p50/p95/p99/max in milliseconds of one phase, or of "frame"."""
+        return summarize(self.samples[name])
+
+    def histogram(self, name, bucket_ms=HISTOGRAM_BUCKET_MS, buckets=HISTOGRAM_BUCKETS):
+        """
+        Sample counts per bucket_ms wide bucket of one phase. The last
+        bucket holds everything slower.
+        """
+        counts = [0] * buckets
+        for seconds in self.samples[name]:
+            counts[min(buckets - 1, int(seconds * 1000 / bucket_ms))] += 1
+        return counts
+
+
+class ProfilerOverlay:
+    """
+    Text overlay of a FrameProfiler, drawn in screen space. The text is
+    only rebuilt every OVERLAY_REFRESH_FRAMES frames. Every timing line
+    ends with its histogram, one HISTOGRAM_BUCKET_MS column per bucket.
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.text = None
+        self.last_refresh = None
+
+    def lines(self, scene):
+        profiler = self.profiler
+        frame = profiler.summary("frame")
+        lines = [
+            f"frame {frame['mean']:5.2f} ms  p95 {frame['p95']:5.2f}  max {frame['max']:5.2f}"
+            f"  |{histogram_text(profiler.histogram('frame'))}|",
+        ]
+        for phase in profiler.phases:
+            summary = profiler.summary(phase)
+            lines.append(
+                f"  {phase:<13}{summary['mean']:6.2f} ms  p95 {summary['p95']:5.2f}"
+                f"  |{histogram_text(profiler.histogram(phase))}|"
+            )
+        draw_calls = profiler.draw_call_samples[-1] if profiler.draw_call_samples else 0
+        lines.append(f"draw calls {draw_calls}")
+        for name, value in profiler.counters.items():
+            lines.append(f"{name} {value}")
+        for name, sprite_list in scene.name_mapping.items():
+            lines.append(f"  {name:<17}{len(sprite_list):5d}")
+        return lines
+
+    def draw(self, scene, width, height):
+        """Draw the overlay in the top left corner of a width x height screen."""
+        if self.text is None:
+            self.text = arcade.Text(
+                "",
+                10,
+                height - 10,
+                arcade.color.WHITE,
+                OVERLAY_FONT_SIZE,
+                width=width - 20,
+                font_name=("Courier New", "Courier", "monospace"),
+                anchor_y="top",
+                multiline=True,
+            )
+        if self.last_refresh is None or self.profiler.frames - self.last_refresh >= OVERLAY_REFRESH_FRAMES:
+            self.text.text = "\n".join(self.lines(scene))
+            self.last_refresh = self.profiler.frames
+        arcade.draw_lrtb_rectangle_filled(
+            self.text.left - 5,
+            self.text.left + self.text.content_width + 5,
+            self.text.top + 5,
+            self.text.bottom - 5,
+            (0, 0, 0, 160),
+        )
+        self.text.draw()
@@ -0,0 +1,256 @@
+"""
+Input recording and replay
+
+A Recorder attached to a GameView writes the level, collision backend,
+random seed and every key event of a game, tick by tick, to a small
+binary file, together with a hash of the game state after each tick.
+Replaying feeds the same events to a fresh GameView at the same ticks,
+either as fast as possible without a window or in real time with one,
+and stops at the first tick whose state hash differs.
+
+File layout, little endian:
+
+    header      b"FSRP", version (H), level (H), seed (I), backend length
+                (B) and name
+    each tick   event count (B), then per event kind (B, 0 press,
+                1 release), key (I) and modifiers (H), then the state hash
+                after the tick (I)
+
+Usage:
+    python replay.py record run.rep --level 1
+    python replay.py play run.rep
+    python replay.py play run.rep --window --realtime --profile
+"""
+import argparse
+import json
+import random
+import struct
+import sys
+import time
+import zlib
+
+import arcade
+
+import game_mymap
+from benchmark import DRAW_PHASES
+from game_mymap import LAYER_NAME_COINS, LAYER_NAME_ENEMIES, LAYER_NAME_MOVING_PLATFORMS, GameView
+from headless import create_game
+from profiler import FrameProfiler
+from timestep import TICK_LENGTH
+
+MAGIC = b"FSRP"
+# Bumped whenever the game rules change what a recording plays out to,
+# e.g. 2 for respawning from the spawn snapshot
+VERSION = 2
+
+KEY_PRESS = 0
+KEY_RELEASE = 1
+
+_HEADER = struct.Struct("<4sHHIB")
+_COUNT = struct.Struct("<B")
+_EVENT = struct.Struct("<BIH")
+_HASH = struct.Struct("<I")
+
+
+def state_hash(game):
+    """CRC32 of what a tick changes: player, enemies, platforms, coins, score and level."""
+    player = game.player_sprite
+    values = [
+        game.level,
+        game.score,
+        len(game.scene[LAYER_NAME_COINS]),
+        player.center_x,
+        player.center_y,
+        player.change_x,
+        player.change_y,
+    ]
+    for enemy in game.scene[LAYER_NAME_ENEMIES]:
+        values.extend((enemy.center_x, enemy.center_y, enemy.change_x))
+    for platform in game.scene[LAYER_NAME_MOVING_PLATFORMS]:
+        values.extend((platform.center_x, platform.center_y))
+    return zlib.crc32(struct.pack(f"<{len(values)}d", *values))
+
+
+class Recording:
+    """The level, backend and seed of a game and its ticks of (events, state hash)."""
+
+    def __init__(self, level, collision_backend, seed, ticks=None):
+        self.level = level
+        self.collision_backend = collision_backend
+        self.seed = seed
+        self.ticks = ticks if ticks is not None else []
+
+    def save(self, file_name):
+        backend = self.collision_backend.encode()
+        parts = [_HEADER.pack(MAGIC, VERSION, self.level, self.seed, len(backend)), backend]
+        for events, tick_hash in self.ticks:
+            parts.append(_COUNT.pack(len(events)))
+            for event in events:
+                parts.append(_EVENT.pack(*event))
+            parts.append(_HASH.pack(tick_hash))
+        with open(file_name, "wb") as file:
+            file.write(b"".join(parts))
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name, "rb") as file:
+            data = file.read()
+        magic, version, level, seed, backend_length = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{file_name} is not a version {VERSION} replay.")
+        offset = _HEADER.size
+        collision_backend = data[offset:offset + backend_length].decode()
+        offset += backend_length
+        ticks = []
+        while offset < len(data):
+            (count,) = _COUNT.unpack_from(data, offset)
+            offset += _COUNT.size
+            events = []
+            for _ in range(count):
+                events.append(_EVENT.unpack_from(data, offset))
+                offset += _EVENT.size
+            (tick_hash,) = _HASH.unpack_from(data, offset)
+            offset += _HASH.size
+            ticks.append((events, tick_hash))
+        return cls(level, collision_backend, seed, ticks)
+
+
+class Recorder:
+    """
+    Set as GameView.recorder before the game is set up. GameView reports
+    its key events and the end of every tick to it. Seeds random with
+    seed, a random one if None.
+    """
+
+    def __init__(self, level, collision_backend, seed=None):
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        self.recording = Recording(level, collision_backend, seed)
+        self.events = []
+
+    def key_press(self, key, modifiers):
+        self.events.append((KEY_PRESS, key, modifiers))
+
+    def key_release(self, key, modifiers):
+        self.events.append((KEY_RELEASE, key, modifiers))
+
+    def end_tick(self, game):
+        self.recording.ticks.append((self.events, state_hash(game)))
+        self.events = []
+
+
+def apply_events(game, events):
+    for kind, key, modifiers in events:
+        if kind == KEY_PRESS:
+            game.on_key_press(key, modifiers)
+        else:
+            game.on_key_release(key, modifiers)
+
+
+def replay(recording, window=None, realtime=False, profiler=None):
+    """
+    Play a recording back. Returns the number of ticks played and the
+    first tick whose state hash differs from the recorded one, or None.
+    """
+    random.seed(recording.seed)
+    if window:
+        game = GameView()
+        game.level = recording.level
+        game.collision_backend = recording.collision_backend
+        window.show_view(game)
+    else:
+        game = create_game(recording.level, recording.collision_backend)
+    if profiler:
+        profiler.enable(game)
+
+    ticks = 0
+    diverged_at = None
+    next_tick_time = time.perf_counter()
+    try:
+        for tick, (events, tick_hash) in enumerate(recording.ticks):
+            apply_events(game, events)
+            if profiler:
+                profiler.begin_frame()
+            game.on_update(TICK_LENGTH)
+            if window:
+                game.on_draw()
+            if profiler:
+                profiler.end_frame()
+            if window:
+                window.flip()
+                window.dispatch_events()
+
+            ticks += 1
+            if state_hash(game) != tick_hash:
+                diverged_at = tick
+                break
+            if realtime:
+                next_tick_time += TICK_LENGTH
+                time.sleep(max(0.0, next_tick_time - time.perf_counter()))
+    finally:
+        if profiler:
+            profiler.disable()
+    return ticks, diverged_at
+
+
+def record(file_name, level, collision_backend):
+    """Play the game in a window, saving the recording when it is closed."""
+    window = arcade.Window(game_mymap.SCREEN_WIDTH, game_mymap.SCREEN_HEIGHT, game_mymap.SCREEN_TITLE)
+    game_mymap.load_fonts()
+    game = GameView()
+    game.level = level
+    game.collision_backend = collision_backend
+    game.recorder = Recorder(level, collision_backend)
+    window.show_view(game)
+    arcade.run()
+    game.recorder.recording.save(file_name)
+    print(f"Saved {len(game.recorder.recording.ticks)} ticks to {file_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and replay games.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record_parser = commands.add_parser("record", help="play in a window and record")
+    record_parser.add_argument("file")
+    record_parser.add_argument("--level", type=int, default=1)
+    record_parser.add_argument("--collisions", choices=["sprites", "grid"], default=game_mymap.COLLISION_BACKEND)
+    play_parser = commands.add_parser("play", help="replay a recording")
+    play_parser.add_argument("file")
+    play_parser.add_argument("--window", action="store_true", help="draw the replay")
+    play_parser.add_argument("--realtime", action="store_true", help="one tick per 1/60 s")
+    play_parser.add_argument("--profile", action="store_true", help="print per-phase timings")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.file, args.level, args.collisions)
+        return
+
+    recording = Recording.load(args.file)
+    window = None
+    if args.window:
+        window = arcade.Window(game_mymap.SCREEN_WIDTH, game_mymap.SCREEN_HEIGHT, game_mymap.SCREEN_TITLE)
+    profiler = FrameProfiler(history=None) if args.profile else None
+    start_time = time.perf_counter()
+    ticks, diverged_at = replay(recording, window, args.realtime, profiler)
+    elapsed = time.perf_counter() - start_time
+    results = {
+        "ticks": ticks,
+        "seconds": elapsed,
+        "ticks_per_second": ticks / elapsed if elapsed else 0.0,
+        "diverged_at": diverged_at,
+    }
+    if profiler:
+        results["phases"] = {
+            phase: profiler.summary(phase)
+            for phase in profiler.samples
+            if window or phase not in DRAW_PHASES
+        }
+    print(json.dumps(results, indent=2))
+    if diverged_at is not None:
+        print(f"Warning, replay diverged at tick {diverged_at}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
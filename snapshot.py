@@ -0,0 +1,164 @@
+"""
+Game state snapshots
+
+A GameState is everything a tick can change: the player's kinematics and
+jump counter, the enemies and moving platforms as one array per
+attribute, which coins have been collected, the score and the level.
+Taking one and putting it back only walk those sprites, the tile layers
+are not touched, so GameView can respawn the player without setting the
+level up again, and a RewindBuffer can keep the last few seconds of play.
+
+to_bytes() packs a state into a small binary checkpoint. Textures are not
+part of it: a state read back with from_bytes() leaves the sprites'
+textures alone until their animation moves to another frame.
+"""
+import struct
+from array import array
+from collections import deque
+from operator import attrgetter
+
+MAGIC = b"FSGS"
+VERSION = 2
+
+# Attributes kept per sprite kind, all stored as doubles
+PLAYER_ATTRIBUTES = (
+    "center_x",
+    "center_y",
+    "change_x",
+    "change_y",
+    "width",
+    "height",
+    "cur_texture",
+    "facing_direction",
+    "is_on_ladder",
+    "climbing",
+    "animation_state",
+    "animation_time",
+)
+ENEMY_ATTRIBUTES = (
+    "center_x",
+    "center_y",
+    "change_x",
+    "change_y",
+    "cur_texture",
+    "facing_direction",
+    "animation_state",
+    "animation_time",
+)
+PLATFORM_ATTRIBUTES = ("center_x", "center_y", "change_x", "change_y")
+
+# Snapshots kept for rewinding, and ticks between two of them: 10 seconds
+# of play in half second steps
+REWIND_SNAPSHOTS = 20
+REWIND_INTERVAL = 30
+
+_HEADER = struct.Struct("<4sHHiIIII")
+
+
+def capture(sprites, attributes):
+    """One array of doubles per attribute, in sprite order."""
+    return [array("d", map(attrgetter(name), sprites)) for name in attributes]
+
+
+def apply(sprites, attributes, columns, textures=None):
+    """
+    Put back what capture() took. Values are converted to the type the
+    sprite's attribute has, so flags and texture indices stay ints.
+    """
+    if any(len(column) != len(sprites) for column in columns):
+        raise Exception(f"Snapshot has {len(columns[0])} sprites, the scene has {len(sprites)}.")
+    names = attributes[2:]
+    for index, sprite in enumerate(sprites):
+        sprite.position = (columns[0][index], columns[1][index])
+        for name, column in zip(names, columns[2:]):
+            setattr(sprite, name, type(getattr(sprite, name))(column[index]))
+        if textures is not None:
+            sprite.texture = textures[index]
+
+
+class GameState:
+    """A snapshot of one GameView, see GameView.save_state()."""
+
+    def __init__(
+        self, level, score, jumps_since_ground, player, enemies, platforms, removed_coins,
+        player_texture=None, enemy_textures=None,
+    ):
+        self.level = level
+        self.score = score
+        self.jumps_since_ground = jumps_since_ground
+        # Arrays of PLAYER_ATTRIBUTES, ENEMY_ATTRIBUTES and PLATFORM_ATTRIBUTES
+        self.player = player
+        self.enemies = enemies
+        self.platforms = platforms
+        # Indexes of the collected coins in the level's coin layer
+        self.removed_coins = removed_coins
+        self.player_texture = player_texture
+        self.enemy_textures = enemy_textures
+
+    def to_bytes(self):
+        parts = [
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                self.level,
+                self.score,
+                self.jumps_since_ground,
+                len(self.enemies[0]),
+                len(self.platforms[0]),
+                len(self.removed_coins),
+            )
+        ]
+        for column in self.player + self.enemies + self.platforms:
+            parts.append(column.tobytes())
+        parts.append(self.removed_coins.tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, level, score, jumps, enemy_count, platform_count, coin_count = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"Not a version {VERSION} game state.")
+        offset = _HEADER.size
+
+        def read(typecode, count):
+            nonlocal offset
+            column = array(typecode)
+            size = column.itemsize * count
+            column.frombytes(data[offset:offset + size])
+            offset += size
+            return column
+
+        player = [read("d", 1) for _ in PLAYER_ATTRIBUTES]
+        enemies = [read("d", enemy_count) for _ in ENEMY_ATTRIBUTES]
+        platforms = [read("d", platform_count) for _ in PLATFORM_ATTRIBUTES]
+        removed_coins = read("I", coin_count)
+        return cls(level, score, jumps, player, enemies, platforms, removed_coins)
+
+
+class RewindBuffer:
+    """The last `capacity` states, one taken every `interval` ticks."""
+
+    def __init__(self, capacity=REWIND_SNAPSHOTS, interval=REWIND_INTERVAL):
+        self.interval = interval
+        self.states = deque(maxlen=capacity)
+        self.ticks = 0
+
+    def tick(self, game):
+        """Call after every tick, takes a snapshot every interval ticks."""
+        self.ticks += 1
+        if self.ticks >= self.interval:
+            self.ticks = 0
+            self.states.append(game.save_state())
+
+    def pop(self):
+        """The most recent state, removed from the buffer, or None."""
+        self.ticks = 0
+        if not self.states:
+            return None
+        return self.states.pop()
+
+    def clear(self):
+        self.states.clear()
+        self.ticks = 0
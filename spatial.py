@@ -0,0 +1,161 @@
+"""
+Spatial index
+
+A uniform grid over the sprites the player can touch: coins, enemies,
+hazards and the level exit. Static sprites are binned once when the level
+is set up. Enemies are re-binned as they move, and only when they cross
+into a different set of cells.
+
+WorldQuery answers "what is the player touching" with one grid lookup
+for all of those layers, then the same polygon check arcade uses.
+"""
+import arcade
+
+# Side of one grid cell in pixels, arcade's spatial hash default
+GRID_CELL_SIZE = 128
+
+
+class SpatialGrid:
+    """Uniform grid of sprites keyed by the cells their hit box covers."""
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # sprite -> (cell range, hit box edges relative to the center)
+        self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, sprite):
+        return sprite in self.entries
+
+    def cell_range(self, left, bottom, right, top):
+        cell_size = self.cell_size
+        return (
+            int(left // cell_size),
+            int(bottom // cell_size),
+            int(right // cell_size),
+            int(top // cell_size),
+        )
+
+    def _add(self, sprite, cells):
+        min_x, min_y, max_x, max_y = cells
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket is None:
+                    self.cells[(cell_x, cell_y)] = {sprite}
+                else:
+                    bucket.add(sprite)
+
+    def _discard(self, sprite, cells):
+        min_x, min_y, max_x, max_y = cells
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket is not None:
+                    bucket.discard(sprite)
+                    if not bucket:
+                        del self.cells[(cell_x, cell_y)]
+
+    def insert(self, sprite):
+        """
+        Add a sprite. Its hit box edges are measured once, sprites are
+        expected not to rotate or change scale while in the grid.
+        """
+        if sprite in self.entries:
+            self.remove(sprite)
+        x, y = sprite.position
+        edges = (sprite.left - x, sprite.bottom - y, sprite.right - x, sprite.top - y)
+        cells = self.cell_range(x + edges[0], y + edges[1], x + edges[2], y + edges[3])
+        self.entries[sprite] = (cells, edges)
+        self._add(sprite, cells)
+
+    def remove(self, sprite):
+        entry = self.entries.pop(sprite, None)
+        if entry is not None:
+            self._discard(sprite, entry[0])
+
+    def move(self, sprite):
+        """Re-bin a sprite after it moved. Cheap when it stayed in its cells."""
+        cells, edges = self.entries[sprite]
+        x, y = sprite.position
+        new_cells = self.cell_range(x + edges[0], y + edges[1], x + edges[2], y + edges[3])
+        if new_cells != cells:
+            self._discard(sprite, cells)
+            self._add(sprite, new_cells)
+            self.entries[sprite] = (new_cells, edges)
+
+    def sync(self, sprites):
+        """move() every sprite of an iterable that is in the grid."""
+        entries = self.entries
+        for sprite in sprites:
+            if sprite in entries:
+                self.move(sprite)
+
+    def query(self, left, bottom, right, top):
+        """Set of the sprites in the cells overlapping a box."""
+        min_x, min_y, max_x, max_y = self.cell_range(left, bottom, right, top)
+        found = set()
+        cells = self.cells
+        for cell_x in range(min_x, max_x + 1):
+            for cell_y in range(min_y, max_y + 1):
+                bucket = cells.get((cell_x, cell_y))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+class WorldQuery:
+    """
+    Everything one sprite (the player) can run into, in a single grid.
+
+    layers maps a kind, such as "coins" or "enemies", to its SpriteList.
+    query() returns a dict with the same kinds as keys and the sprites of
+    that kind the player touches as values.
+    """
+
+    def __init__(self, layers, cell_size=GRID_CELL_SIZE):
+        self.kinds = {}
+        self.sprite_kinds = {}
+        self.grid = SpatialGrid(cell_size)
+        for kind, sprite_list in layers.items():
+            self.kinds[kind] = sprite_list
+            for sprite in sprite_list:
+                self.insert(sprite, kind)
+        self.queries = 0
+        self.candidates = 0
+
+    def insert(self, sprite, kind):
+        self.sprite_kinds[sprite] = kind
+        self.grid.insert(sprite)
+
+    def remove(self, sprite):
+        """Forget a sprite, e.g. a collected coin."""
+        self.grid.remove(sprite)
+        self.sprite_kinds.pop(sprite, None)
+
+    def move(self, sprites):
+        """Re-bin sprites that moved since the last query."""
+        self.grid.sync(sprites)
+
+    def query(self, sprite):
+        """Sprites of every kind whose hit box overlaps the hit box of sprite."""
+        contacts = {kind: [] for kind in self.kinds}
+        candidates = self.grid.query(sprite.left, sprite.bottom, sprite.right, sprite.top)
+        self.queries += 1
+        self.candidates += len(candidates)
+        sprite_kinds = self.sprite_kinds
+        for other in candidates:
+            if other is not sprite and arcade.check_for_collision(sprite, other):
+                contacts[sprite_kinds[other]].append(other)
+        return contacts
+
+    def stats(self):
+        return {
+            "sprites": len(self.grid),
+            "cells": len(self.grid.cells),
+            "queries": self.queries,
+            "candidates": self.candidates,
+        }
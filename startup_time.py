@@ -0,0 +1,139 @@
+"""
+Cold-start time
+
+Starts the game in a fresh interpreter, up to the first frame of the main
+menu, and reports how long that took:
+
+    imports         importing game_mymap, and arcade with it
+    window          opening the window and showing MainMenu
+    first_frame     drawing and flipping the menu's first frame
+    total           from launching the interpreter to that first frame
+
+`report` also lists the modules that took longest to import, from
+python -X importtime, in milliseconds. `check` takes the best of a few
+runs and exits with status 1 if it is over the budget, so a change that
+slows down startup fails a CI step. tests/test_startup.py runs the same
+check under pytest. Run with --headless where there is no display.
+
+Usage:
+    python startup_time.py report
+    python startup_time.py check --budget 1.5 --runs 3 --headless
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Seconds from launch to the first menu frame a check allows
+STARTUP_BUDGET = 1.5
+
+# Modules listed by report
+REPORT_MODULES = 25
+
+
+def child(headless):
+    """Start the game up to the first menu frame, print the phase times."""
+    start_time = time.perf_counter()
+    if headless:
+        import pyglet
+
+        pyglet.options["headless"] = True
+    import game_mymap
+
+    imported_time = time.perf_counter()
+    window = game_mymap.open_menu()
+    window_time = time.perf_counter()
+    window.current_view.on_draw()
+    window.flip()
+    frame_time = time.perf_counter()
+    print(json.dumps({
+        "imports": imported_time - start_time,
+        "window": window_time - imported_time,
+        "first_frame": frame_time - window_time,
+    }), flush=True)
+    # The menu's asset loader is of no interest here
+    os._exit(0)
+
+
+def run_child(headless, import_time=False):
+    """
+    One cold start in a new interpreter. Returns the phase times, and the
+    python -X importtime output if import_time.
+    """
+    command = [sys.executable]
+    if import_time:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "child"]
+    if headless:
+        command.append("--headless")
+    start_time = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    total = time.perf_counter() - start_time
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if process.returncode != 0 or not lines:
+        raise Exception(f"Starting the game failed:\n{process.stderr}")
+    phases = json.loads(lines[-1])
+    phases["total"] = total
+    return phases, process.stderr
+
+
+def import_times(importtime_output):
+    """(module, self ms, cumulative ms) of every import, slowest first."""
+    modules = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    modules.sort(key=lambda module: module[2], reverse=True)
+    return modules
+
+
+def report(headless):
+    phases, importtime_output = run_child(headless, import_time=True)
+    results = {
+        "phases": phases,
+        "imports": [
+            {"module": name, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+            for name, self_ms, cumulative_ms in import_times(importtime_output)[:REPORT_MODULES]
+        ],
+    }
+    print(json.dumps(results, indent=2))
+
+
+def check(headless, budget, runs):
+    times = [run_child(headless)[0] for _ in range(runs)]
+    best = min(times, key=lambda phases: phases["total"])
+    print(json.dumps({"budget": budget, "best": best, "totals": [phases["total"] for phases in times]}, indent=2))
+    if best["total"] > budget:
+        print(f"Warning, cold start took {best['total']:.3f} s, over the budget of {budget:.3f} s")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the game's cold-start time.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("report", "phase and per-module import times of one start"),
+        ("check", "fail if starting up takes longer than the budget"),
+        ("child", "start the game up to the first menu frame"),
+    ):
+        command_parser = commands.add_parser(name, help=help_text)
+        command_parser.add_argument("--headless", action="store_true", help="no display needed")
+        if name == "check":
+            command_parser.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="seconds")
+            command_parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.command == "child":
+        child(args.headless)
+    elif args.command == "report":
+        report(args.headless)
+    else:
+        check(args.headless, args.budget, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+The game's modules live at the top of the repository and open no window
+here: pyglet runs headless, so the tests need no display.
+"""
+import os
+import sys
+
+import pyglet
+import pytest
+
+pyglet.options["headless"] = True
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Resource paths are relative to the repository
+os.chdir(ROOT)
+
+from entities import StateField, entity_states  # noqa: E402
+
+
+class Thing:
+    """
+    A poolable object with fields in entity_states, for the pool and
+    entity tests. Like the game's entities it takes a slot when it is
+    reset and gives it back when its pool takes it back.
+    """
+
+    cur_texture = StateField("cur_texture")
+    is_on_ladder = StateField("is_on_ladder", flag=True)
+
+    def __init__(self):
+        self.slot = None
+        self.value = None
+        self.released = 0
+
+    def reset(self, value=0):
+        if self.slot is None:
+            self.slot = entity_states.allocate()
+        self.value = value
+
+    def release(self):
+        entity_states.release(self.slot)
+        self.slot = None
+        self.released += 1
+
+
+@pytest.fixture
+def thing_class():
+    return Thing
@@ -0,0 +1,62 @@
+import pytest
+
+from animation import AnimationTable, animate, animate_sprites
+from game_mymap import TEXTURE_LEFT, TEXTURE_RIGHT, HeadcrabEnemy, Player
+
+TICK = 1 / 60
+
+
+def state(sprite):
+    return sprite.animation.names[sprite.animation_state]
+
+
+def test_player_state_follows_velocity_and_ladder():
+    player = Player()
+    animate(player, TICK)
+    assert state(player) == "idle"
+    assert player.texture is player.idle_texture[TEXTURE_RIGHT]
+
+    player.change_x = -5
+    animate(player, TICK)
+    assert state(player) == "walk"
+    assert player.facing_direction == TEXTURE_LEFT
+    assert player.texture is player.walk_textures[0][TEXTURE_LEFT]
+    animate(player, TICK)
+    assert player.texture is player.walk_textures[1][TEXTURE_LEFT]
+
+    player.change_y = 3
+    animate(player, TICK)
+    assert state(player) == "jump"
+    assert player.texture is player.jump_texture[TEXTURE_LEFT]
+    player.change_y = -3
+    animate(player, TICK)
+    assert state(player) == "fall"
+
+    player.is_on_ladder = True
+    player.change_y = 2
+    animate(player, TICK)
+    assert state(player) == "climb"
+    player.change_y = 0
+    animate(player, TICK)
+    assert state(player) == "ladder"
+
+
+def test_enemies_step_a_walk_frame_every_four_ticks():
+    enemies = [HeadcrabEnemy(), HeadcrabEnemy()]
+    enemies[0].change_x = 2
+    for _ in range(9):
+        animate_sprites([enemies], TICK)
+    walking, idle = enemies
+    assert state(walking) == "walk" and walking.cur_texture == 2
+    assert state(idle) == "idle" and idle.cur_texture == 0
+    assert walking.texture is walking.walk_textures[2][TEXTURE_RIGHT]
+
+
+def test_every_condition_needs_a_state():
+    with pytest.raises(Exception, match="No animation state"):
+        AnimationTable(
+            states={"idle": ("idle_texture", None)},
+            rules=[("idle", {"walking": False})],
+            left=TEXTURE_LEFT,
+            right=TEXTURE_RIGHT,
+        )
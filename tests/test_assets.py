@@ -0,0 +1,58 @@
+import threading
+import time
+
+from assets import AssetLoader
+
+
+def test_finish_runs_every_job_in_order():
+    loader = AssetLoader(max_workers=2)
+    ran = []
+
+    def slow():
+        time.sleep(0.1)
+        ran.append("slow")
+        return 1
+
+    loader.add("slow", slow)
+    loader.add("broken", lambda: 1 / 0)
+    loader.add_main("first", lambda: ran.append("first") or loader.result("slow") + 1)
+    loader.add_main("second", lambda: ran.append("second"))
+    # Never started, as when the menu is clicked before its first frame
+    loader.finish()
+    loader.shutdown()
+    assert loader.finished
+    assert ran == ["slow", "first", "second"]
+    assert loader.result("first") == 2
+    assert [name for name, error in loader.failed] == ["broken"]
+
+
+def test_step_runs_main_jobs_after_the_pool():
+    loader = AssetLoader(max_workers=1)
+    release = threading.Event()
+    loader.add("pool", release.wait)
+    loader.add_main("main", lambda: "done")
+    loader.start()
+    assert not loader.step()
+    assert loader.result("main") is None
+    release.set()
+    while not loader.step():
+        pass
+    loader.shutdown()
+    assert loader.result("main") == "done"
+
+
+def test_shutdown_drops_the_jobs_not_started():
+    loader = AssetLoader(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    ran = []
+    loader.add("running", lambda: started.set() or release.wait())
+    for index in range(5):
+        loader.add(f"queued {index}", ran.append, index)
+    loader.start()
+    started.wait()
+    threading.Timer(0.05, release.set).start()
+    loader.shutdown()
+    assert ran == []
+    assert loader.result("running") is True
+    assert not any(thread.name.startswith("asset-load") for thread in threading.enumerate())
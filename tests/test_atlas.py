@@ -0,0 +1,21 @@
+import glob
+
+import pytest
+
+from build_atlas import pack_rows, stale_sources
+
+
+@pytest.mark.parametrize("index_path", sorted(glob.glob("resources/atlas/*.json")))
+def test_atlas_is_up_to_date_with_its_sources(index_path):
+    # Rebuild with: python build_atlas.py
+    assert stale_sources(index_path) == []
+
+
+def test_packed_frames_do_not_overlap():
+    sizes = [(30, 10), (50, 40), (20, 40), (60, 5)]
+    positions, (width, height) = pack_rows(sizes, max_width=80, padding=1)
+    boxes = [(x, y, x + w, y + h) for (x, y), (w, h) in zip(positions, sizes)]
+    for index, (left, bottom, right, top) in enumerate(boxes):
+        assert right <= width and top <= height
+        for other_left, other_bottom, other_right, other_top in boxes[index + 1:]:
+            assert right <= other_left or other_right <= left or top <= other_bottom or other_top <= bottom
@@ -0,0 +1,73 @@
+import arcade
+import pytest
+
+from audio import AudioMixer
+
+
+class Sound:
+    """Stands in for an arcade.Sound, playing until the test says it is done."""
+
+    def __init__(self, name):
+        self.name = name
+        self.done = set()
+
+    def is_complete(self, player):
+        return player in self.done
+
+
+@pytest.fixture
+def players(monkeypatch):
+    """Players handed out by arcade.play_sound, and the ones stopped."""
+    played = []
+    stopped = []
+
+    def play_sound(sound, volume=1.0, looping=False):
+        player = (sound.name, len(played))
+        played.append(player)
+        return player
+
+    monkeypatch.setattr(arcade, "play_sound", play_sound)
+    monkeypatch.setattr(arcade, "stop_sound", stopped.append)
+    return played, stopped
+
+
+def test_the_oldest_voice_is_stolen(players):
+    played, stopped = players
+    mixer = AudioMixer(max_voices=2)
+    sounds = [Sound(name) for name in "abc"]
+    for sound in sounds:
+        mixer.new_frame()
+        mixer.play_sfx(sound)
+    assert stopped == [("a", 0)]
+    assert [player for _, player in mixer.voices] == [("b", 1), ("c", 2)]
+    # A voice that finished frees its place without stealing
+    sounds[1].done.add(("b", 1))
+    mixer.new_frame()
+    mixer.play_sfx(sounds[0])
+    assert stopped == [("a", 0)]
+    assert mixer.stats()["stolen"] == 1
+
+
+def test_an_effect_plays_once_per_frame(players):
+    played, _ = players
+    mixer = AudioMixer()
+    sound = Sound("coin")
+    assert mixer.play_sfx(sound) is not None
+    assert mixer.play_sfx(sound) is None
+    mixer.new_frame()
+    mixer.play_sfx(sound)
+    assert len(played) == 2
+    assert mixer.stats()["deduplicated"] == 1
+    assert mixer.play_sfx(None) is None
+
+
+def test_music_restarts_only_for_a_new_track(players):
+    played, stopped = players
+    mixer = AudioMixer()
+    theme, boss = Sound("theme"), Sound("boss")
+    mixer.play_music(theme)
+    mixer.play_music(theme)
+    assert played == [("theme", 0)]
+    mixer.play_music(boss)
+    assert stopped == [("theme", 0)]
+    assert mixer.music is boss
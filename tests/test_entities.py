@@ -0,0 +1,95 @@
+import threading
+
+from entities import EntityStates, entity_states
+
+
+def test_slots_are_reused_and_cleared():
+    states = EntityStates()
+    first = states.allocate()
+    second = states.allocate()
+    assert (first, second) == (0, 1)
+    states.animation_time[first] = 2.5
+    states.cur_texture[first] = 3
+    states.release(first)
+    assert len(states) == 1
+    again = states.allocate()
+    assert again == first
+    assert states.animation_time[again] == 0.0 and states.cur_texture[again] == 0
+    assert len(states.cur_texture) == 2
+
+
+def test_allocate_from_many_threads_gives_distinct_slots():
+    states = EntityStates()
+    slots = []
+
+    def allocate():
+        for _ in range(500):
+            slots.append(states.allocate())
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(slots) == list(range(2000))
+    assert all(len(getattr(states, name)) == 2000 for name in ("cur_texture", "animation_time", "climbing"))
+
+
+def test_state_fields_read_and_write_the_store(thing_class):
+    thing = thing_class()
+    thing.reset()
+    thing.cur_texture = 4
+    thing.is_on_ladder = True
+    assert entity_states.cur_texture[thing.slot] == 4
+    assert thing.is_on_ladder is True
+    thing.release()
+
+
+def test_pooled_entities_give_their_slot_back():
+    import game_mymap
+    from game_mymap import HeadcrabEnemy, load_resources
+
+    load_resources()
+    pools = game_mymap.sprite_pools
+    enemy = pools.acquire(HeadcrabEnemy)
+    in_use = len(entity_states)
+    pools.release(enemy)
+    assert enemy.slot is None
+    assert len(entity_states) == in_use - 1
+    assert pools.acquire(HeadcrabEnemy) is enemy
+    assert enemy.slot is not None and enemy.cur_texture == 0
+    assert "slot" not in vars(enemy)
+    pools.release(enemy)
+
+
+def test_entities_dropped_outside_the_pools_give_their_slot_back():
+    import gc
+
+    from game_mymap import HeadcrabEnemy, load_resources
+
+    def build_and_drop():
+        enemies = [HeadcrabEnemy() for _ in range(10)]
+        del enemies
+        gc.collect()
+
+    load_resources()
+    build_and_drop()
+    in_use = len(entity_states)
+    rows = len(entity_states.cur_texture)
+    for _ in range(100):
+        build_and_drop()
+        assert len(entity_states) == in_use
+    assert len(entity_states.cur_texture) == rows
+
+
+def test_released_slots_are_not_given_back_again_when_collected(thing_class):
+    import gc
+
+    states = EntityStates()
+    owner = thing_class()
+    slot = states.allocate(owner)
+    states.release(slot)
+    assert states.allocate() == slot
+    del owner
+    gc.collect()
+    assert len(states) == 1 and states.free == []
@@ -0,0 +1,42 @@
+from game_mymap import LAYER_NAME_COINS, LAYER_NAME_ENEMIES
+from headless import create_game
+from snapshot import GameState
+
+
+def test_load_state_puts_the_game_back():
+    game = create_game(1)
+    state = game.save_state()
+    player = game.player_sprite
+    start = player.position
+    enemy_positions = [enemy.position for enemy in game.scene[LAYER_NAME_ENEMIES]]
+    coin_count = len(game.scene[LAYER_NAME_COINS])
+
+    # Play a bit, then collect a coin by hand
+    for _ in range(30):
+        game.on_update(game.timestep.tick_length)
+    player.center_x += 100
+    coin = game.scene[LAYER_NAME_COINS][0]
+    game.world.remove(coin)
+    game.scene[LAYER_NAME_COINS].remove(coin)
+    game.score = 5
+
+    # Through bytes, as a checkpoint file would be
+    game.load_state(GameState.from_bytes(state.to_bytes()))
+    assert player.position == start
+    assert [enemy.position for enemy in game.scene[LAYER_NAME_ENEMIES]] == enemy_positions
+    assert len(game.scene[LAYER_NAME_COINS]) == coin_count
+    assert game.score == 0
+    assert game.save_state().to_bytes() == state.to_bytes()
+
+
+def test_falling_off_the_map_respawns_from_the_spawn_state():
+    game = create_game(1)
+    spawn = game.spawn_state.to_bytes()
+    coin = game.scene[LAYER_NAME_COINS][0]
+    game.world.remove(coin)
+    game.scene[LAYER_NAME_COINS].remove(coin)
+    game.player_sprite.change_x = 10
+    game.player_sprite.center_y = -200
+    game.contacts = game.world.query(game.player_sprite)
+    game.check_level_collisions()
+    assert game.save_state().to_bytes() == spawn
@@ -0,0 +1,108 @@
+import json
+import threading
+
+import arcade
+import PIL.Image
+
+import game_mymap
+from headless import create_game, scripted_input
+from hitboxes import SIDECAR_VERSION, HitBoxCache, hit_boxes, simplify
+from replay import state_hash
+
+SQUARE = ((0, 0), (5, 0), (10, 0), (10, 10), (0, 10))
+
+
+def test_simplify_drops_collinear_vertices_only():
+    assert simplify(SQUARE) == ((0, 0), (10, 0), (10, 10), (0, 10))
+    bumpy = ((0, 0), (5, 1), (10, 0), (10, 10), (0, 10))
+    assert len(simplify(bumpy)) == 5
+    assert len(simplify(bumpy, tolerance=1.5)) == 4
+
+
+def test_simplify_caps_vertices_but_keeps_a_triangle():
+    assert len(simplify(SQUARE, max_vertices=4)) == 4
+    assert len(simplify(SQUARE, max_vertices=1)) == 3
+
+
+def test_sidecar_round_trip(tmp_path):
+    file_name = tmp_path / "hitboxes.json"
+    cache = HitBoxCache()
+    cache.outlines["key"] = SQUARE
+    cache.save(file_name)
+    loaded = HitBoxCache()
+    loaded.load(file_name)
+    assert loaded.outlines == {"key": SQUARE}
+
+
+def test_sidecar_of_another_version_is_ignored(tmp_path):
+    file_name = tmp_path / "hitboxes.json"
+    file_name.write_text(json.dumps({"version": SIDECAR_VERSION + 1, "outlines": {"key": []}}))
+    cache = HitBoxCache()
+    cache.load(file_name)
+    cache.load(tmp_path / "missing.json")
+    assert cache.outlines == {}
+
+
+def play(max_vertices, tolerance, ticks=1500):
+    """State hashes of the scripted run of level 1 with these hit boxes."""
+    game_mymap.load_resources()
+    hit_boxes.set_simplification(max_vertices, tolerance)
+    # Levels built with the other hit boxes
+    game_mymap.level_cache.clear()
+    game = create_game(1)
+    hashes = []
+    for tick in range(ticks):
+        pressed, released = scripted_input(tick)
+        for key in pressed:
+            game.on_key_press(key, 0)
+        for key in released:
+            game.on_key_release(key, 0)
+        game.on_update(1 / 60)
+        hashes.append(state_hash(game))
+    return hashes
+
+
+def test_simplified_hit_boxes_play_out_the_same():
+    try:
+        assert play(game_mymap.HIT_BOX_MAX_VERTICES, game_mymap.HIT_BOX_TOLERANCE) == play(None, 0.0)
+    finally:
+        hit_boxes.set_simplification(game_mymap.HIT_BOX_MAX_VERTICES, game_mymap.HIT_BOX_TOLERANCE)
+        game_mymap.level_cache.clear()
+
+
+def test_physics_sprites_keep_the_full_outline():
+    game_mymap.load_resources()
+    # Triangles, so nothing simplified can pass for an outline
+    hit_boxes.set_simplification(3)
+    game_mymap.level_cache.clear()
+    try:
+        game = create_game(1)
+        player = game.player_sprite
+        assert player.get_hit_box() == hit_boxes.outline(player.texture)
+        for name in (game_mymap.LAYER_NAME_PLATFORMS, game_mymap.LAYER_NAME_MOVING_PLATFORMS):
+            for sprite in game.scene[name]:
+                assert sprite.get_hit_box() == hit_boxes.outline(sprite.texture)
+        for coin in game.scene[game_mymap.LAYER_NAME_COINS]:
+            assert len(coin.get_hit_box()) == 3
+    finally:
+        hit_boxes.set_simplification(game_mymap.HIT_BOX_MAX_VERTICES, game_mymap.HIT_BOX_TOLERANCE)
+        game_mymap.level_cache.clear()
+
+
+def test_counters_add_up_across_threads():
+    cache = HitBoxCache()
+    image = PIL.Image.new("RGBA", (10, 10), (255, 255, 255, 255))
+    textures = [arcade.Texture(f"box-{index}", image, hit_box_algorithm="None") for index in range(4)]
+
+    def get_all():
+        for _ in range(500):
+            for texture in textures:
+                cache.get(texture)
+
+    threads = [threading.Thread(target=get_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits + cache.misses == 4 * 500 * len(textures)
+    assert len(cache.hit_boxes) == len(textures)
@@ -0,0 +1,84 @@
+import os
+import shutil
+
+import arcade
+import pytest
+
+import level_format
+from level_format import DEFAULT_SCALING, compile_level, compiled_path, is_stale, load_compiled_level
+
+MAP_NAME = "resources/WORLD1.tmx"
+
+
+@pytest.fixture(scope="module")
+def map_name(tmp_path_factory):
+    """WORLD1, compiled next to the map; a .lvl that was there is put back."""
+    level_path = compiled_path(MAP_NAME)
+    backup = None
+    if os.path.exists(level_path):
+        backup = tmp_path_factory.mktemp("level") / "WORLD1.lvl"
+        shutil.copy(level_path, backup)
+    compile_level(MAP_NAME)
+    yield MAP_NAME
+    if backup is None:
+        os.remove(level_path)
+    else:
+        shutil.copy(backup, level_path)
+
+
+def sprite_layout(sprite_list):
+    return [
+        (sprite.texture.name, round(sprite.center_x, 3), round(sprite.center_y, 3))
+        for sprite in sprite_list
+    ]
+
+
+def test_compiled_level_matches_tile_map(map_name):
+    compiled = load_compiled_level(map_name, DEFAULT_SCALING)
+    tile_map = arcade.TileMap(map_name, DEFAULT_SCALING)
+    assert compiled is not None
+    assert compiled.sprite_lists.keys() == tile_map.sprite_lists.keys()
+    for name, sprite_list in tile_map.sprite_lists.items():
+        assert sprite_layout(compiled.sprite_lists[name]) == sprite_layout(sprite_list), name
+    assert compiled.object_lists.keys() == tile_map.object_lists.keys()
+    assert (compiled.width, compiled.height) == (tile_map.width, tile_map.height)
+
+
+def test_sprite_factory_makes_a_layers_sprites(map_name):
+    made = []
+
+    def factory(texture, scaling):
+        sprite = arcade.Sprite(scale=scaling, texture=texture)
+        made.append(sprite)
+        return sprite
+
+    compiled = load_compiled_level(map_name, DEFAULT_SCALING, {"Coins": {"sprite_factory": factory}})
+    assert made and made == list(compiled.sprite_lists["Coins"])
+
+
+def test_other_scaling_is_not_loaded(map_name):
+    assert load_compiled_level(map_name, DEFAULT_SCALING * 2) is None
+
+
+def test_unchanged_sources_are_not_read_again(map_name, monkeypatch):
+    hashed = []
+    monkeypatch.setattr(level_format, "file_digest", lambda filename: hashed.append(filename))
+    assert load_compiled_level(map_name, DEFAULT_SCALING) is not None
+    assert hashed == []
+
+
+def test_only_a_changed_source_makes_the_level_stale(tmp_path):
+    source = tmp_path / "map.tmx"
+    source.write_text("<map/>")
+    header = {"sources": {"map.tmx": level_format.source_record(str(source))}}
+    level_path = str(tmp_path / "map.lvl")
+    assert not is_stale(level_path, header)
+    # Touched, or checked out again, with the same bytes
+    os.utime(source, ns=(0, 0))
+    assert not is_stale(level_path, header)
+    source.write_text("<mop/>")
+    assert is_stale(level_path, header)
+    source.write_text("<map/>\n")
+    assert is_stale(level_path, header)
+    source.unlink()
+    assert is_stale(level_path, header)
@@ -0,0 +1,59 @@
+from levels import LevelCache, LevelPreloader
+
+
+class Level:
+    def __init__(self, size_bytes=0):
+        self.size_bytes = size_bytes
+
+
+def test_least_recently_used_level_is_evicted():
+    cache = LevelCache(max_levels=2)
+    one, two, three = Level(), Level(), Level()
+    cache.put(1, one)
+    cache.put(2, two)
+    assert cache.get(1) is one
+    cache.put(3, three)
+    assert list(cache.levels) == [1, 3]
+    assert cache.get(2) is None
+    assert cache.get(3) is three
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+def test_byte_budget_keeps_at_least_the_newest_level():
+    cache = LevelCache(max_levels=10, max_bytes=100)
+    cache.put(1, Level(60))
+    cache.put(2, Level(60))
+    assert list(cache.levels) == [2]
+    cache.put(3, Level(500))
+    assert list(cache.levels) == [3]
+
+
+def test_every_dropped_level_goes_to_on_evict():
+    evicted = []
+    cache = LevelCache(max_levels=2, on_evict=evicted.append)
+    one, two, three = Level(), Level(), Level()
+    cache.put(1, one)
+    cache.put(2, two)
+    cache.put(3, three)
+    assert evicted == [one]
+    cache.discard(2)
+    cache.discard(2)
+    assert evicted == [one, two]
+    cache.clear()
+    assert evicted == [one, two, three]
+    assert cache.size_bytes == 0
+
+
+def test_preloaded_maps_are_handed_out_once(tmp_path):
+    broken = tmp_path / "broken.tmx"
+    broken.write_text("<map")
+    preloader = LevelPreloader()
+    preloader.preload("resources/WORLD1.tmx")
+    preloader.preload(str(broken))
+    preloader.preload(str(tmp_path / "missing.tmx"))
+    assert preloader.take("resources/WORLD1.tmx").layers
+    assert preloader.take("resources/WORLD1.tmx") is None
+    assert preloader.take(str(broken)) is None
+    assert [name for name, _ in preloader.failed] == [str(broken)]
+    assert preloader.take(str(tmp_path / "missing.tmx")) is None
+    preloader.shutdown()
@@ -0,0 +1,69 @@
+import random
+
+import arcade
+import pytest
+
+import game_mymap
+from game_mymap import LAYER_NAME_ENEMIES
+from headless import create_game, scripted_input
+from patrol import HAVE_NUMPY, EnemyPatrol
+
+pytestmark = pytest.mark.skipif(not HAVE_NUMPY, reason="EnemyPatrol needs numpy")
+
+
+def patrol_sprite_by_sprite(sprite_list):
+    """The per-sprite patrol of GameView without numpy."""
+    sprite_list.update()
+    for enemy in sprite_list:
+        if enemy.boundary_right and enemy.right > enemy.boundary_right and enemy.change_x > 0:
+            enemy.change_x *= -1
+        if enemy.boundary_left and enemy.left < enemy.boundary_left and enemy.change_x < 0:
+            enemy.change_x *= -1
+
+
+def enemies(seed):
+    rng = random.Random(seed)
+    sprite_list = arcade.SpriteList(use_spatial_hash=False)
+    for _ in range(50):
+        enemy = arcade.SpriteSolidColor(rng.randint(10, 40), 20, arcade.color.WHITE)
+        enemy.center_x = rng.uniform(0, 1000)
+        enemy.center_y = rng.uniform(0, 200)
+        enemy.change_x = rng.choice([-3, -1.5, 0, 2])
+        # Some patrol one side only, or not at all
+        if rng.random() < 0.8:
+            enemy.boundary_left = enemy.center_x - rng.uniform(0, 150)
+        if rng.random() < 0.8:
+            enemy.boundary_right = enemy.center_x + rng.uniform(0, 150)
+        sprite_list.append(enemy)
+    return sprite_list
+
+
+def test_batched_step_matches_the_sprite_loop():
+    expected = enemies(1)
+    batched = enemies(1)
+    patrol = EnemyPatrol(batched)
+    for _ in range(500):
+        patrol_sprite_by_sprite(expected)
+        patrol.step()
+        assert [(tuple(enemy.position), enemy.change_x) for enemy in batched] == [
+            (tuple(enemy.position), enemy.change_x) for enemy in expected
+        ]
+
+
+def play(monkeypatch, vectorized, ticks=1500):
+    monkeypatch.setattr(game_mymap, "VECTORIZED_PATROL", vectorized)
+    game = create_game(1)
+    positions = []
+    for tick in range(ticks):
+        pressed, released = scripted_input(tick)
+        for key in pressed:
+            game.on_key_press(key, 0)
+        for key in released:
+            game.on_key_release(key, 0)
+        game.on_update(1 / 60)
+        positions.append([(tuple(enemy.position), enemy.change_x) for enemy in game.scene[LAYER_NAME_ENEMIES]])
+    return positions
+
+
+def test_game_enemies_move_the_same_with_and_without_numpy(monkeypatch):
+    assert play(monkeypatch, True) == play(monkeypatch, False)
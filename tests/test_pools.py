@@ -0,0 +1,63 @@
+import game_mymap
+from game_mymap import LAYER_NAME_COINS, LAYER_NAME_ENEMIES, Coin
+from headless import create_game
+from pools import Pool, Pools
+
+
+def test_released_objects_are_reused_and_reset(thing_class):
+    pool = Pool(thing_class)
+    first = pool.acquire(1)
+    second = pool.acquire(2)
+    assert (first.value, second.value) == (1, 2)
+    pool.release(first)
+    assert first.released == 1
+    again = pool.acquire(3)
+    assert again is first and again.value == 3
+    assert pool.stats() == {
+        "in_use": 2, "idle": 0, "high_water": 2, "allocations": 2, "reuses": 1, "releases": 1,
+    }
+
+
+def test_pools_release_by_class(thing_class):
+    pools = Pools()
+    thing = pools.acquire(thing_class, 5)
+    pools.release(thing)
+    assert pools.stats()["Thing"]["idle"] == 1
+    assert pools.acquire(thing_class) is thing
+    assert pools.summary() == "1 in use, 1 high water, 1 allocated"
+
+
+def test_level_switches_reuse_pooled_sprites():
+    game = create_game(1)
+    pools = game_mymap.sprite_pools
+    # Visit both levels once, then switching and restarting makes nothing new
+    for level in (2, 1):
+        game.level = level
+        game.setup()
+    allocations = {name: stats["allocations"] for name, stats in pools.stats().items()}
+    for level in (1, 2, 2, 1):
+        game.level = level
+        game.setup()
+        assert all(isinstance(coin, Coin) for coin in game.scene[LAYER_NAME_COINS])
+    assert {name: stats["allocations"] for name, stats in pools.stats().items()} == allocations
+
+
+def test_a_released_level_comes_back_as_it_was_built():
+    game = create_game(1)
+    coins = [coin.position for coin in game.scene[LAYER_NAME_COINS]]
+    enemies = [
+        (type(enemy), enemy.position, enemy.boundary_left, enemy.boundary_right, enemy.change_x)
+        for enemy in game.scene[LAYER_NAME_ENEMIES]
+    ]
+    game.player_sprite.center_x += 300
+    game.level = 2
+    game.setup()
+    assert game.cached_level is not None
+    game.level = 1
+    game.setup()
+    assert [coin.position for coin in game.scene[LAYER_NAME_COINS]] == coins
+    assert [
+        (type(enemy), enemy.position, enemy.boundary_left, enemy.boundary_right, enemy.change_x)
+        for enemy in game.scene[LAYER_NAME_ENEMIES]
+    ] == enemies
+    assert game.player_sprite.position == (game_mymap.PLAYER_START_X, game_mymap.PLAYER_START_Y)
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+from arcade.gl import Geometry
+
+from profiler import HISTOGRAM_BUCKETS, FrameProfiler, ProfilerOverlay, histogram_text
+
+
+class View:
+    def update_physics(self):
+        pass
+
+
+def test_disable_puts_everything_back():
+    view = View()
+    original_render = Geometry.render
+    profiler = FrameProfiler()
+    profiler.enable(view)
+    assert "update_physics" in view.__dict__
+    assert Geometry.render is not original_render
+    profiler.disable()
+    assert "update_physics" not in view.__dict__
+    assert Geometry.render is original_render
+
+
+def test_render_is_restored_when_disable_fails():
+    original_render = Geometry.render
+    profiler = FrameProfiler()
+    profiler.enable(View())
+    # Something without a __dict__ to remove the wrappers from
+    profiler.target = object()
+    with pytest.raises(AttributeError):
+        profiler.disable()
+    assert Geometry.render is original_render
+    assert not profiler.enabled
+
+
+def test_histogram_text():
+    assert histogram_text([0, 0, 0]) == "   "
+    assert histogram_text([0, 1, 7, 14]) == " .=#"
+
+
+def test_overlay_draws_the_histograms():
+    profiler = FrameProfiler(phases={"physics": ["update_physics"]})
+    for seconds in [0.0005, 0.0015, 0.0015, 0.1]:
+        profiler.samples["frame"].append(seconds)
+        profiler.samples["physics"].append(seconds / 2)
+    lines = ProfilerOverlay(profiler).lines(SimpleNamespace(name_mapping={}))
+    frame_histogram = "|" + histogram_text(profiler.histogram("frame")) + "|"
+    assert lines[0].endswith(frame_histogram)
+    assert len(frame_histogram) == HISTOGRAM_BUCKETS + 2
+    assert lines[1].endswith("|" + histogram_text(profiler.histogram("physics")) + "|")
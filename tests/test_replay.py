@@ -0,0 +1,34 @@
+import pytest
+
+from replay import _HEADER, KEY_PRESS, KEY_RELEASE, MAGIC, VERSION, Recording
+
+
+def test_recording_round_trip(tmp_path):
+    file_name = tmp_path / "run.rep"
+    ticks = [
+        ([], 1),
+        ([(KEY_PRESS, 65362, 0), (KEY_PRESS, 65363, 16)], 2 ** 32 - 1),
+        ([(KEY_RELEASE, 65362, 0)], 7),
+    ]
+    Recording(2, "grid", 1234, ticks).save(file_name)
+    recording = Recording.load(file_name)
+    assert (recording.level, recording.collision_backend, recording.seed) == (2, "grid", 1234)
+    assert recording.ticks == ticks
+
+
+def test_other_files_are_refused(tmp_path):
+    file_name = tmp_path / "run.rep"
+    file_name.write_bytes(b"NOPE" + bytes(16))
+    with pytest.raises(Exception, match="replay"):
+        Recording.load(file_name)
+
+
+def test_recordings_of_older_rules_are_refused(tmp_path):
+    file_name = tmp_path / "run.rep"
+    Recording(1, "grid", 1234, [([], 1)]).save(file_name)
+    data = file_name.read_bytes()
+    magic, version, level, seed, backend_length = _HEADER.unpack_from(data)
+    assert (magic, version) == (MAGIC, VERSION)
+    file_name.write_bytes(_HEADER.pack(MAGIC, VERSION - 1, level, seed, backend_length) + data[_HEADER.size:])
+    with pytest.raises(Exception, match=f"version {VERSION} replay"):
+        Recording.load(file_name)
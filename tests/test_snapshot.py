@@ -0,0 +1,99 @@
+from array import array
+
+import arcade
+import pytest
+
+from snapshot import (
+    ENEMY_ATTRIBUTES,
+    PLATFORM_ATTRIBUTES,
+    PLAYER_ATTRIBUTES,
+    GameState,
+    RewindBuffer,
+    apply,
+    capture,
+)
+
+
+def make_state(enemy_count=3, platform_count=2):
+    def columns(attributes, count, base):
+        return [array("d", [base + index * 10 + row for row in range(count)]) for index in range(len(attributes))]
+
+    return GameState(
+        level=2,
+        score=17,
+        jumps_since_ground=1,
+        player=columns(PLAYER_ATTRIBUTES, 1, 0.5),
+        enemies=columns(ENEMY_ATTRIBUTES, enemy_count, 100.25),
+        platforms=columns(PLATFORM_ATTRIBUTES, platform_count, -3.0),
+        removed_coins=array("I", [0, 4, 5]),
+    )
+
+
+def test_bytes_round_trip():
+    state = make_state()
+    loaded = GameState.from_bytes(state.to_bytes())
+    for name in ("level", "score", "jumps_since_ground", "player", "enemies", "platforms", "removed_coins"):
+        assert getattr(loaded, name) == getattr(state, name), name
+
+
+def test_bytes_round_trip_without_enemies_or_coins():
+    state = make_state(enemy_count=0, platform_count=0)
+    state.removed_coins = array("I")
+    loaded = GameState.from_bytes(state.to_bytes())
+    assert loaded.enemies == state.enemies
+    assert len(loaded.removed_coins) == 0
+
+
+def test_other_data_is_rejected():
+    data = bytearray(make_state().to_bytes())
+    data[:4] = b"XXXX"
+    with pytest.raises(Exception):
+        GameState.from_bytes(bytes(data))
+
+
+def test_capture_and_apply_keep_attribute_types():
+    sprites = [arcade.Sprite(), arcade.Sprite()]
+    for index, sprite in enumerate(sprites):
+        sprite.position = (index * 5.0, 7.0)
+        sprite.change_x = index
+        sprite.cur_texture = index + 1
+    attributes = ("center_x", "center_y", "change_x", "cur_texture")
+    columns = capture(sprites, attributes)
+    for sprite in sprites:
+        sprite.position = (0, 0)
+        sprite.cur_texture = 0
+    apply(sprites, attributes, columns)
+    assert [sprite.position for sprite in sprites] == [(0.0, 7.0), (5.0, 7.0)]
+    assert [sprite.cur_texture for sprite in sprites] == [1, 2]
+    assert all(type(sprite.cur_texture) is int for sprite in sprites)
+
+
+def test_apply_checks_the_sprite_count():
+    columns = capture([arcade.Sprite()], ("center_x", "center_y"))
+    with pytest.raises(Exception):
+        apply([arcade.Sprite(), arcade.Sprite()], ("center_x", "center_y"), columns)
+
+
+class CountingGame:
+    def __init__(self):
+        self.saves = 0
+
+    def save_state(self):
+        self.saves += 1
+        return self.saves
+
+
+def test_rewind_buffer_keeps_the_last_states():
+    game = CountingGame()
+    rewind = RewindBuffer(capacity=3, interval=2)
+    for _ in range(10):
+        rewind.tick(game)
+    assert list(rewind.states) == [3, 4, 5]
+    assert rewind.pop() == 5
+    # Popping restarts the interval
+    rewind.tick(game)
+    assert list(rewind.states) == [3, 4]
+    rewind.tick(game)
+    assert rewind.pop() == 6
+    rewind.clear()
+    assert rewind.pop() is None
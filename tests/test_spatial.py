@@ -0,0 +1,66 @@
+import arcade
+
+from spatial import SpatialGrid, WorldQuery
+
+
+def box(x, y, size=20):
+    sprite = arcade.SpriteSolidColor(size, size, arcade.color.WHITE)
+    sprite.position = (x, y)
+    return sprite
+
+
+def test_query_finds_sprites_in_overlapping_cells():
+    grid = SpatialGrid(cell_size=100)
+    near = box(50, 50)
+    far = box(450, 450)
+    grid.insert(near)
+    grid.insert(far)
+    assert grid.query(0, 0, 99, 99) == {near}
+    assert grid.query(400, 400, 499, 499) == {far}
+    assert grid.query(0, 0, 500, 500) == {near, far}
+    assert grid.query(200, 200, 250, 250) == set()
+
+
+def test_sprite_on_a_cell_edge_is_in_every_cell_it_covers():
+    grid = SpatialGrid(cell_size=100)
+    sprite = box(100, 100)
+    grid.insert(sprite)
+    assert grid.cell_range(90, 90, 110, 110) == (0, 0, 1, 1)
+    assert len(grid.cells) == 4
+    for cell in grid.cells.values():
+        assert cell == {sprite}
+
+
+def test_move_and_remove_rebin_the_sprite():
+    grid = SpatialGrid(cell_size=100)
+    sprite = box(50, 50)
+    grid.insert(sprite)
+    sprite.center_x = 60
+    grid.move(sprite)
+    assert grid.query(0, 0, 99, 99) == {sprite}
+    sprite.center_x = 350
+    grid.sync([sprite])
+    assert grid.query(0, 0, 99, 99) == set()
+    assert grid.query(300, 0, 399, 99) == {sprite}
+    grid.remove(sprite)
+    assert sprite not in grid
+    assert not grid.cells
+
+
+def test_world_query_sorts_contacts_by_kind():
+    player = box(100, 100)
+    coins = arcade.SpriteList()
+    enemies = arcade.SpriteList()
+    coin = box(110, 100)
+    coins.extend([coin, box(1000, 100)])
+    enemy = box(400, 100)
+    enemies.append(enemy)
+    world = WorldQuery({"coins": coins, "enemies": enemies})
+
+    assert world.query(player) == {"coins": [coin], "enemies": []}
+    enemy.center_x = 105
+    world.move(enemies)
+    contacts = world.query(player)
+    assert contacts["enemies"] == [enemy]
+    world.remove(coin)
+    assert world.query(player)["coins"] == []
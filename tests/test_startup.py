@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+
+def test_import_reads_no_resources():
+    # Importing the game makes none of the caches, preloader or pools,
+    # registers no atlas or hit boxes and leaves the heavy modules for
+    # the views to import on first use. How long startup takes is checked
+    # by python startup_time.py check --headless, not here.
+    code = (
+        "import sys\n"
+        "import pyglet; pyglet.options['headless'] = True\n"
+        "import game_mymap\n"
+        "from hitboxes import hit_boxes\n"
+        "from textures import registry\n"
+        "assert game_mymap.level_cache is None\n"
+        "assert game_mymap.level_preloader is None\n"
+        "assert not hit_boxes.outlines and not registry.atlas_frames\n"
+        "loaded = {'numpy', 'levels', 'assets', 'pools', 'level_format'} & set(sys.modules)\n"
+        "assert not loaded, loaded\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
@@ -0,0 +1,116 @@
+import PIL.Image
+
+import textures
+from textures import TextureRegistry
+
+
+def save_image(path, color):
+    image = PIL.Image.new("RGBA", (4, 2), (0, 0, 0, 0))
+    image.putpixel((0, 0), color)
+    image.save(path)
+    return str(path)
+
+
+def test_textures_are_shared_and_counted(tmp_path):
+    registry = TextureRegistry()
+    filename = save_image(tmp_path / "frame.png", (255, 0, 0, 255))
+    normal, flipped = registry.pair(filename)
+    assert registry.get(filename) is normal
+    assert registry.get(filename, flipped=True) is flipped
+    assert flipped.image.getpixel((3, 0)) == (255, 0, 0, 255)
+    stats = registry.stats()
+    assert (stats["textures"], stats["hits"], stats["misses"]) == (2, 2, 2)
+
+
+def test_texture_sets_are_built_once():
+    registry = TextureRegistry()
+    built = []
+
+    def loader():
+        built.append(1)
+        return {"idle": len(built)}
+
+    first = registry.texture_set("enemy", loader)
+    assert registry.texture_set("enemy", loader) is first
+    assert built == [1]
+    stats = registry.stats()
+    assert (stats["texture_sets"], stats["set_hits"], stats["set_misses"]) == (1, 1, 1)
+
+
+def test_least_recently_used_textures_are_dropped(tmp_path):
+    registry = TextureRegistry(capacity=2)
+    first, second, third = (
+        save_image(tmp_path / f"frame{index}.png", (index, 0, 0, 255)) for index in range(3)
+    )
+    kept = registry.get(first)
+    registry.get(second)
+    assert registry.get(first) is kept
+    registry.get(third)
+    assert list(registry.textures) == [(first, False), (third, False)]
+    assert registry.stats()["evictions"] == 1
+    # A dropped texture is decoded again
+    registry.get(second)
+    assert registry.stats()["misses"] == 4
+
+
+def test_mirror_image_is_made_from_the_other_facing(tmp_path, monkeypatch):
+    registry = TextureRegistry()
+    filename = save_image(tmp_path / "frame.png", (0, 255, 0, 255))
+    normal = registry.get(filename)
+    opened = []
+    open_image = PIL.Image.open
+    monkeypatch.setattr(textures.PIL.Image, "open", lambda *args: opened.append(args) or open_image(*args))
+    flipped = registry.get(filename, flipped=True)
+    assert opened == []
+    assert flipped.image.tobytes() == normal.image.transpose(PIL.Image.Transpose.FLIP_LEFT_RIGHT).tobytes()
+
+
+def test_lazy_pairs_decode_on_first_use(tmp_path):
+    registry = TextureRegistry()
+    filename = save_image(tmp_path / "frame.png", (0, 0, 255, 255))
+    pair = registry.lazy_pair(filename)
+    assert registry.stats()["textures"] == 0
+    assert pair[1] is registry.get(filename, flipped=True)
+    assert list(registry.textures) == [(filename, True)]
+
+
+def build_atlases(tmp_path):
+    """Two one-character atlases of two frames each, like the game's."""
+    from build_atlas import build_atlas
+
+    atlases = {}
+    for name in ("enemy", "player"):
+        sources = [save_image(tmp_path / f"{name}{index}.png", (index, 9, 9, 255)) for index in range(2)]
+        build_atlas(name, sources, str(tmp_path))
+        atlases[name] = sources
+    registry = TextureRegistry(capacity=8)
+    registry.add_atlas_dir(str(tmp_path))
+    return registry, atlases
+
+
+def test_sheets_are_decoded_once_and_dropped_when_cut_out(tmp_path):
+    registry, atlases = build_atlases(tmp_path)
+    # Alternate between the atlases, as the preload does
+    for index in range(2):
+        for sources in atlases.values():
+            registry.get(sources[index])
+    assert registry.stats()["sheet_loads"] == 2
+    assert len(registry.sheets) == 2
+    for sources in atlases.values():
+        registry.get(sources[0], flipped=True)
+        registry.get(sources[1], flipped=True)
+    assert registry.sheets == {}
+    assert registry.stats()["sheet_loads"] == 2
+
+
+def test_a_source_of_another_size_is_loaded_on_its_own(tmp_path):
+    registry, atlases = build_atlases(tmp_path)
+    changed = atlases["enemy"][0]
+    PIL.Image.new("RGBA", (6, 2), (1, 2, 3, 255)).save(changed)
+    texture = registry.get(changed)
+    assert texture.name == changed
+    assert texture.image.size == (6, 2)
+    assert changed not in registry.atlas_frames
+    # The rest of the atlas still comes from the sheet
+    assert registry.get(atlases["enemy"][1]).name.startswith(str(tmp_path / "enemy.png"))
+    assert registry.stats()["sheet_loads"] == 1
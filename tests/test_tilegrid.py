@@ -0,0 +1,26 @@
+from tilegrid import HAZARD, LADDER, SOLID, TileGrid
+
+
+def test_rows_are_flipped_to_world_coordinates():
+    grid = TileGrid(3, 2, cell_size=10)
+    # Top row first, like Tiled
+    grid.add_layer([1, 0, 0, 0, 0, 2], SOLID)
+    grid.add_layer([0, 0, 0, 0, 3, 0], LADDER)
+    assert grid.is_solid(0, 1)
+    assert grid.is_solid(2, 0)
+    assert grid.is_ladder(1, 0)
+    assert not grid.is_solid(0, 0)
+    assert grid.at(-1, 0) == 0
+    assert grid.at(3, 0) == 0
+
+
+def test_box_flags_or_the_overlapped_cells():
+    grid = TileGrid(3, 2, cell_size=10)
+    grid.add_layer([0, 0, 0, 0, 0, 1], SOLID)
+    grid.add_layer([0, 0, 1, 0, 0, 0], HAZARD)
+    assert grid.cell(25, 5) == (2, 0)
+    assert grid.span(0, 20) == (0, 1)
+    assert grid.box_flags(0, 0, 20, 10) == 0
+    assert grid.box_flags(15, 5, 25, 15) == SOLID | HAZARD
+    assert grid.row_has(0, 0, 2, SOLID)
+    assert not grid.column_has(0, 0, 1, SOLID)
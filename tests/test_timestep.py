@@ -0,0 +1,43 @@
+import arcade
+import pytest
+
+from timestep import FixedTimestep, Interpolation
+
+
+def test_frame_time_is_handed_out_in_ticks():
+    timestep = FixedTimestep(tick_length=0.01, max_ticks=5)
+    assert timestep.advance(0.025) == 2
+    assert timestep.alpha == pytest.approx(0.5)
+    assert timestep.advance(0.005) == 1
+    assert timestep.alpha == pytest.approx(0.0, abs=1e-9)
+    assert timestep.advance(0.004) == 0
+
+
+def test_long_frames_drop_ticks_past_the_cap():
+    timestep = FixedTimestep(tick_length=0.01, max_ticks=3)
+    assert timestep.advance(0.1) == 3
+    assert timestep.dropped_ticks == 7
+    timestep.reset()
+    assert timestep.accumulator == 0.0
+
+
+def test_ticks_add_up_over_many_frames():
+    timestep = FixedTimestep(tick_length=1 / 60)
+    ticks = sum(timestep.advance(1 / 144) for _ in range(144))
+    assert ticks in (59, 60)
+
+
+def test_interpolation_draws_between_ticks_and_restores():
+    sprite = arcade.Sprite()
+    sprite_list = arcade.SpriteList()
+    sprite_list.append(sprite)
+    interpolation = Interpolation()
+    interpolation.record([sprite_list])
+    sprite.position = (10, 20)
+    interpolation.apply(0.25)
+    assert sprite.position == (2.5, 5.0)
+    interpolation.restore()
+    assert sprite.position == (10, 20)
+    interpolation.clear()
+    interpolation.apply(0.5)
+    assert sprite.position == (10, 20)
@@ -0,0 +1,309 @@
+"""
+Shared texture registry
+
+Every sprite class asks this module for its textures instead of calling
+arcade.load_texture itself, so a texture is decoded and flipped once per
+process no matter how many sprites use it.
+
+Frames that were packed by build_atlas.py are cut out of their atlas
+sheet instead of being loaded from their own file, unless the file's size
+no longer matches the atlas index. A sheet is kept decoded until every
+frame in it has been cut out.
+
+Animation frames are handed out as TexturePair and TextureList objects
+that only decode a frame the first time it is shown. The registry keeps
+at most `capacity` decoded textures and drops the least recently used
+one past that. A dropped frame that is shown again is decoded again,
+which the evictions counter makes visible. Textures are decoded here
+rather than with arcade.load_texture, whose own cache never lets go of
+an image.
+"""
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import arcade
+import PIL.Image
+from arcade.resources import resolve_resource_path
+
+
+class TexturePair:
+    """A texture and its mirror image, [0] and [1], decoded on first use."""
+
+    def __init__(self, registry, filename):
+        self.registry = registry
+        self.filename = filename
+
+    def __getitem__(self, direction):
+        if direction not in (0, 1):
+            raise IndexError(direction)
+        return self.registry.get(self.filename, flipped=direction == 1)
+
+    def __len__(self):
+        return 2
+
+
+class TextureList:
+    """A sequence of textures, each decoded on first use."""
+
+    def __init__(self, registry, filenames):
+        self.registry = registry
+        self.filenames = filenames
+
+    def __getitem__(self, index):
+        return self.registry.get(self.filenames[index])
+
+    def __len__(self):
+        return len(self.filenames)
+
+
+def preload(frames):
+    """Decode every texture of a TexturePair, a TextureList or a list of them."""
+    if isinstance(frames, (TexturePair, TextureList)):
+        for index in range(len(frames)):
+            frames[index]
+    else:
+        for item in frames:
+            preload(item)
+
+
+class TextureRegistry:
+    """
+    Process-wide least recently used store of textures keyed by
+    (path, flipped). capacity=None keeps every texture.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        self.textures = OrderedDict()
+        self.texture_sets = {}
+        # Source file -> (sheet file, {"normal": rect, "flipped": rect},
+        # size of the source when the atlas was built)
+        self.atlas_frames = {}
+        # Source files whose size matched their atlas
+        self.atlas_checked = set()
+        # Decoded atlas sheets, the rects of each that have not been cut
+        # out yet, and the textures cut out of them by (sheet, rect).
+        # Identical frames share one rect, and so one texture.
+        self.sheets = {}
+        self.uncut = {}
+        self.sheet_textures = weakref.WeakValueDictionary()
+        # get() and texture_set() also run on the loader threads
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.set_hits = 0
+        self.set_misses = 0
+        self.sheet_loads = 0
+
+    def get(self, filename, flipped=False):
+        """Return the texture for a file, loading it on first use."""
+        key = (filename, flipped)
+        with self.lock:
+            texture = self.textures.get(key)
+            if texture is not None:
+                self.hits += 1
+                self.textures.move_to_end(key)
+                return texture
+            self.misses += 1
+            # The mirror image is made from the other facing if it is loaded
+            other = self.textures.get((filename, not flipped))
+
+        if self._in_atlas(filename):
+            texture = self._load_from_atlas(filename, flipped)
+        else:
+            if other is not None:
+                image = other.image.transpose(PIL.Image.Transpose.FLIP_LEFT_RIGHT)
+            else:
+                image = PIL.Image.open(resolve_resource_path(filename)).convert("RGBA")
+                if flipped:
+                    image = image.transpose(PIL.Image.Transpose.FLIP_LEFT_RIGHT)
+            texture = arcade.Texture(f"{filename}-flipped" if flipped else filename, image)
+
+        with self.lock:
+            self.textures[key] = texture
+            self._evict()
+        return texture
+
+    def _in_atlas(self, filename):
+        """
+        True if filename is packed in an atlas that is up to date with it.
+        A stale frame is dropped from atlas_frames, the first time it is
+        asked for.
+        """
+        frame = self.atlas_frames.get(filename)
+        if frame is None:
+            return False
+        if filename in self.atlas_checked:
+            return True
+        # Only the size is compared, reading every source to hash it is
+        # what the atlas saves. build_atlas.stale_sources() compares the
+        # digests, see tests/test_atlas.py.
+        sheet, rects, size = frame
+        if size is not None and os.path.exists(filename) and os.path.getsize(filename) == size:
+            with self.lock:
+                self.atlas_checked.add(filename)
+            return True
+        print(f"Warning, {filename} changed since {sheet} was built, loading it on its own")
+        with self.lock:
+            self.atlas_frames.pop(filename, None)
+            # The rects no other frame shows will never be cut out
+            wanted = {
+                tuple(rect)
+                for other_sheet, other_rects, _ in self.atlas_frames.values()
+                if other_sheet == sheet
+                for rect in other_rects.values()
+            }
+            for rect in rects.values():
+                if tuple(rect) not in wanted:
+                    self._cut(sheet, tuple(rect))
+        return False
+
+    def _load_from_atlas(self, filename, flipped):
+        sheet, rects, _ = self.atlas_frames[filename]
+        rect = tuple(rects["flipped" if flipped else "normal"])
+        x, y, width, height = rect
+        key = (sheet, *rect)
+        texture = self.sheet_textures.get(key)
+        if texture is None:
+            with self.lock:
+                sheet_image = self.sheets.get(sheet)
+            if sheet_image is None:
+                sheet_image = PIL.Image.open(sheet).convert("RGBA")
+                with self.lock:
+                    self.sheets[sheet] = sheet_image
+                    self.sheet_loads += 1
+            image = sheet_image.crop((x, y, x + width, y + height))
+            texture = arcade.Texture(f"{sheet}-{x}-{y}-{width}-{height}", image)
+            self.sheet_textures[key] = texture
+            with self.lock:
+                self._cut(sheet, rect)
+        return texture
+
+    def _cut(self, sheet, rect):
+        """Mark a rect of a sheet as cut out, dropping the sheet after its last one."""
+        uncut = self.uncut.get(sheet)
+        if uncut is None:
+            return
+        uncut.discard(rect)
+        if not uncut:
+            self.sheets.pop(sheet, None)
+
+    def _evict(self):
+        if self.capacity is None:
+            return
+        while len(self.textures) > self.capacity:
+            self.textures.popitem(last=False)
+            self.evictions += 1
+
+    def set_capacity(self, capacity):
+        """Change how many textures are kept, dropping the oldest if needed."""
+        with self.lock:
+            self.capacity = capacity
+            self._evict()
+
+    def add_atlas(self, index_path):
+        """
+        Register the frames of an atlas index written by build_atlas.py.
+        Later requests for any of those source files use the sheet.
+        """
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+        sheet = os.path.join(os.path.dirname(index_path), index["image"])
+        sizes = index.get("sizes", {})
+        with self.lock:
+            for filename, rects in index["frames"].items():
+                self.atlas_frames[filename] = (sheet, rects, sizes.get(filename))
+                self.atlas_checked.discard(filename)
+                self.uncut.setdefault(sheet, set()).update(tuple(rect) for rect in rects.values())
+
+    def add_atlas_dir(self, atlas_dir):
+        """Register every atlas index found in atlas_dir, if it exists."""
+        if not os.path.isdir(atlas_dir):
+            return
+        for name in sorted(os.listdir(atlas_dir)):
+            if name.endswith(".json"):
+                self.add_atlas(os.path.join(atlas_dir, name))
+
+    def pair(self, filename):
+        """
+        Return a texture pair, with the second being a mirror image.
+        """
+        return [self.get(filename), self.get(filename, flipped=True)]
+
+    def lazy_pair(self, filename):
+        """Like pair(), decoding each facing the first time it is used."""
+        return TexturePair(self, filename)
+
+    def lazy_list(self, filenames):
+        """Textures for a list of files, each decoded the first time it is used."""
+        return TextureList(self, list(filenames))
+
+    def texture_set(self, key, loader):
+        """
+        Return the texture set stored under key, building it with loader()
+        the first time. Sprites of the same kind share one set.
+        """
+        with self.lock:
+            texture_set = self.texture_sets.get(key)
+            if texture_set is not None:
+                self.set_hits += 1
+                return texture_set
+            self.set_misses += 1
+        # loader() may ask the registry for textures, so it runs unlocked;
+        # if two threads build the same set, the first one stored wins
+        texture_set = loader()
+        with self.lock:
+            return self.texture_sets.setdefault(key, texture_set)
+
+    def resident_bytes(self):
+        """Bytes held by the decoded images of every registered texture."""
+        total = 0
+        seen = set()
+        with self.lock:
+            textures = list(self.textures.values())
+        for texture in textures:
+            image = texture.image
+            if image is None or id(image) in seen:
+                continue
+            seen.add(id(image))
+            total += image.width * image.height * len(image.getbands())
+        return total
+
+    def stats(self):
+        """Counters used to check that sprites really share textures."""
+        return {
+            "textures": len(self.textures),
+            "capacity": self.capacity,
+            "texture_sets": len(self.texture_sets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "set_hits": self.set_hits,
+            "set_misses": self.set_misses,
+            "sheets": len(self.sheets),
+            "sheet_loads": self.sheet_loads,
+            "resident_bytes": self.resident_bytes(),
+        }
+
+    def clear(self):
+        """Forget every texture and reset the counters."""
+        self.textures.clear()
+        self.texture_sets.clear()
+        self.sheets.clear()
+        self.sheet_textures.clear()
+        # Every frame has to be cut out again
+        for sheet, rects, _ in self.atlas_frames.values():
+            self.uncut.setdefault(sheet, set()).update(tuple(rect) for rect in rects.values())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.set_hits = 0
+        self.set_misses = 0
+        self.sheet_loads = 0
+
+
+registry = TextureRegistry()
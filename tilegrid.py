@@ -0,0 +1,356 @@
+"""
+Tile grid collisions
+
+The static layers of a level (platforms, ladders, hazards, the exit) are
+grid aligned, so instead of one sprite per tile they can be kept as one
+byte of flags per map cell, read straight from the layers' tile ids.
+"Is there a wall / ladder / hazard in this cell" is then an index into a
+bytearray, whatever the size of the level.
+
+GridPhysicsEngine moves the player against that grid with swept box
+collisions. It keeps the interface of arcade.PhysicsEnginePlatformer, so
+GameView can use either one.
+"""
+import math
+
+import arcade
+import pytiled_parser
+
+# Cell flags
+SOLID = 1
+LADDER = 2
+HAZARD = 4
+EXIT = 8
+
+
+def _tile_layers(layers):
+    for layer in layers:
+        if isinstance(layer, pytiled_parser.LayerGroup):
+            yield from _tile_layers(layer.layers)
+        elif isinstance(layer, pytiled_parser.TileLayer):
+            yield layer
+
+
+def layer_tile_ids(tile_map):
+    """
+    Layer name -> flat list of tile ids, row 0 at the top of the map, for
+    an arcade.TileMap or a compiled level.
+    """
+    tile_grids = getattr(tile_map, "tile_grids", None)
+    if tile_grids is not None:
+        return tile_grids
+    return {
+        layer.name: [tile_id for row in layer.data for tile_id in row]
+        for layer in _tile_layers(tile_map.tiled_map.layers)
+        if layer.data
+    }
+
+
+class TileGrid:
+    """
+    One byte of flags per map cell. Cell (0, 0) is the bottom left one,
+    like arcade's world coordinates.
+    """
+
+    def __init__(self, width, height, cell_size):
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.flags = bytearray(width * height)
+
+    @classmethod
+    def from_tile_map(cls, tile_map, layer_flags):
+        """
+        Build the grid of a level. layer_flags maps layer names to the flag
+        their tiles set, layers the map does not have are skipped.
+        """
+        grid = cls(tile_map.width, tile_map.height, tile_map.tile_width * tile_map.scaling)
+        tile_ids = layer_tile_ids(tile_map)
+        for name, flag in layer_flags.items():
+            if name in tile_ids:
+                grid.add_layer(tile_ids[name], flag)
+        return grid
+
+    def add_layer(self, tile_ids, flag):
+        """Set flag on every cell with a tile, tile_ids being top row first."""
+        width = self.width
+        flags = self.flags
+        for index, tile_id in enumerate(tile_ids):
+            if tile_id:
+                row, column = divmod(index, width)
+                flags[(self.height - 1 - row) * width + column] |= flag
+
+    def cell(self, x, y):
+        """Column and row of the cell holding a world point."""
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def at(self, column, row):
+        """Flags of one cell, 0 outside the map."""
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return self.flags[row * self.width + column]
+        return 0
+
+    def is_solid(self, column, row):
+        return self.at(column, row) & SOLID != 0
+
+    def is_ladder(self, column, row):
+        return self.at(column, row) & LADDER != 0
+
+    def is_hazard(self, column, row):
+        return self.at(column, row) & HAZARD != 0
+
+    def is_exit(self, column, row):
+        return self.at(column, row) & EXIT != 0
+
+    def span(self, low, high):
+        """First and last cell index overlapped by the half-open range [low, high)."""
+        return int(low // self.cell_size), int(math.ceil(high / self.cell_size)) - 1
+
+    def box_flags(self, left, bottom, right, top):
+        """All flags of the cells a box overlaps, or-ed together."""
+        first_column, last_column = self.span(left, right)
+        first_row, last_row = self.span(bottom, top)
+        found = 0
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                found |= self.at(column, row)
+        return found
+
+    def row_has(self, row, first_column, last_column, flag):
+        for column in range(first_column, last_column + 1):
+            if self.at(column, row) & flag:
+                return True
+        return False
+
+    def column_has(self, column, first_row, last_row, flag):
+        for row in range(first_row, last_row + 1):
+            if self.at(column, row) & flag:
+                return True
+        return False
+
+
+class Box:
+    """Axis aligned hit box of a sprite, as offsets from its center."""
+
+    def __init__(self, sprite):
+        x, y = sprite.position
+        self.left = sprite.left - x
+        self.bottom = sprite.bottom - y
+        self.right = sprite.right - x
+        self.top = sprite.top - y
+
+    def at(self, x, y):
+        return x + self.left, y + self.bottom, x + self.right, y + self.top
+
+
+def _overlaps(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _sprite_box(sprite):
+    return sprite.left, sprite.bottom, sprite.right, sprite.top
+
+
+class GridPhysicsEngine(arcade.PhysicsEnginePlatformer):
+    """
+    arcade.PhysicsEnginePlatformer with the static walls and ladders
+    replaced by a TileGrid. Every tile counts as a full cell. Moving
+    platforms are still sprites, checked by their bounding boxes.
+    Unlike arcade's engine the player does not walk up ramps.
+    """
+
+    def __init__(self, player_sprite, tile_grid, platforms=None, gravity_constant=0.5):
+        super().__init__(player_sprite, platforms=platforms, gravity_constant=gravity_constant)
+        self.tile_grid = tile_grid
+
+    def player_box(self):
+        return _sprite_box(self.player_sprite)
+
+    def platform_sprites(self):
+        for platform_list in self.platforms:
+            yield from platform_list
+
+    def is_on_ladder(self):
+        return self.tile_grid.box_flags(*self.player_box()) & LADDER != 0
+
+    def can_jump(self, y_distance=5):
+        left, bottom, right, top = self.player_box()
+        below = (left, bottom - y_distance, right, top - y_distance)
+        on_ground = self.tile_grid.box_flags(*below) & SOLID != 0 or any(
+            _overlaps(below, _sprite_box(platform)) for platform in self.platform_sprites()
+        )
+        if on_ground:
+            self.jumps_since_ground = 0
+        return on_ground or (self.allow_multi_jump and self.jumps_since_ground < self.allowed_jumps)
+
+    def update(self):
+        """Move the player and resolve collisions, then move the platforms."""
+        player = self.player_sprite
+        if not self.is_on_ladder():
+            player.change_y -= self.gravity_constant
+
+        box = Box(player)
+        x, y = player.position
+        x, y = self.depenetrate(box, x, y)
+        hit_list = []
+
+        # Move in the y direction
+        y, hit = self.sweep_y(box, x, y, player.change_y)
+        if hit is not None:
+            hit_list.append(hit)
+            if hit is not self.tile_grid and player.change_y < 0:
+                # Ride along with the platform we landed on
+                x += hit.change_x
+            player.change_y = min(0.0, getattr(hit, "change_y", 0.0))
+        y = round(y, 2)
+
+        # Move in the x direction
+        if player.change_x:
+            x, hit = self.sweep_x(box, x, y, player.change_x)
+            if hit is not None:
+                hit_list.append(hit)
+
+        player.position = (x, y)
+        self.move_platforms()
+        return [hit for hit in hit_list if hit is not self.tile_grid]
+
+    def depenetrate(self, box, x, y):
+        """
+        Push the player out of solid cells they ended up in (e.g. after
+        Sprite.update moved them, or when they start inside a wall), to
+        the nearest free spot straight up, down, left or right.
+        """
+        grid = self.tile_grid
+        left, bottom, right, top = box.at(x, y)
+        if grid.box_flags(left, bottom, right, top) & SOLID == 0:
+            return x, y
+        cell_size = grid.cell_size
+        # Moves that line an edge of the box up with a cell edge. The box
+        # may end up above the map, but not below it or off its sides.
+        moves = []
+        for edge in range(math.ceil(bottom / cell_size), grid.height + 1):
+            moves.append((0, edge * cell_size - bottom))
+        for edge in range(math.floor(top / cell_size), 0, -1):
+            if edge * cell_size - (top - bottom) >= 0:
+                moves.append((0, edge * cell_size - top))
+        for edge in range(math.ceil(left / cell_size), grid.width):
+            if edge * cell_size + (right - left) <= grid.width * cell_size:
+                moves.append((edge * cell_size - left, 0))
+        for edge in range(math.floor(right / cell_size), 0, -1):
+            if edge * cell_size - (right - left) >= 0:
+                moves.append((edge * cell_size - right, 0))
+        moves.sort(key=lambda move: abs(move[0]) + abs(move[1]))
+        for dx, dy in moves:
+            if grid.box_flags(left + dx, bottom + dy, right + dx, top + dy) & SOLID == 0:
+                return x + dx, y + dy
+        return x, y
+
+    def sweep_y(self, box, x, y, change_y):
+        """
+        Move by change_y, stopping at the first solid cell or platform in
+        the way. Returns the new y and what was hit (the grid, a platform
+        sprite or None).
+        """
+        if not change_y:
+            return y, None
+        grid = self.tile_grid
+        cell_size = grid.cell_size
+        left, bottom, right, top = box.at(x, y)
+        first_column, last_column = grid.span(left, right)
+        hit = None
+        new_y = y + change_y
+        if change_y < 0:
+            # Rows whose top the bottom edge crosses, nearest first
+            for edge in range(math.floor(bottom / cell_size), math.floor((bottom + change_y) / cell_size), -1):
+                if grid.row_has(edge - 1, first_column, last_column, SOLID):
+                    new_y = edge * cell_size - box.bottom
+                    hit = grid
+                    break
+        else:
+            # Rows whose bottom the top edge crosses, nearest first
+            for edge in range(math.ceil(top / cell_size), math.ceil((top + change_y) / cell_size)):
+                if grid.row_has(edge, first_column, last_column, SOLID):
+                    new_y = edge * cell_size - box.top
+                    hit = grid
+                    break
+
+        swept = (left, min(bottom, new_y + box.bottom), right, max(top, new_y + box.top))
+        for platform in self.platform_sprites():
+            platform_box = _sprite_box(platform)
+            if not _overlaps(swept, platform_box):
+                continue
+            if change_y < 0 and platform_box[3] <= bottom:
+                new_y = platform_box[3] - box.bottom
+            elif change_y > 0 and platform_box[1] >= top:
+                new_y = platform_box[1] - box.top
+            else:
+                continue
+            hit = platform
+            swept = (left, min(bottom, new_y + box.bottom), right, max(top, new_y + box.top))
+        return new_y, hit
+
+    def sweep_x(self, box, x, y, change_x):
+        """Like sweep_y, along x."""
+        grid = self.tile_grid
+        cell_size = grid.cell_size
+        left, bottom, right, top = box.at(x, y)
+        first_row, last_row = grid.span(bottom, top)
+        hit = None
+        new_x = x + change_x
+        if change_x < 0:
+            for edge in range(math.floor(left / cell_size), math.floor((left + change_x) / cell_size), -1):
+                if grid.column_has(edge - 1, first_row, last_row, SOLID):
+                    new_x = edge * cell_size - box.left
+                    hit = grid
+                    break
+        else:
+            for edge in range(math.ceil(right / cell_size), math.ceil((right + change_x) / cell_size)):
+                if grid.column_has(edge, first_row, last_row, SOLID):
+                    new_x = edge * cell_size - box.right
+                    hit = grid
+                    break
+
+        swept = (min(left, new_x + box.left), bottom, max(right, new_x + box.right), top)
+        for platform in self.platform_sprites():
+            platform_box = _sprite_box(platform)
+            if not _overlaps(swept, platform_box):
+                continue
+            if change_x < 0 and platform_box[2] <= left:
+                new_x = platform_box[2] - box.left
+            elif change_x > 0 and platform_box[0] >= right:
+                new_x = platform_box[0] - box.right
+            else:
+                continue
+            hit = platform
+            swept = (min(left, new_x + box.left), bottom, max(right, new_x + box.right), top)
+        return new_x, hit
+
+    def move_platforms(self):
+        """Move the moving platforms between their boundaries, as arcade's engine does."""
+        for platform in self.platform_sprites():
+            if platform.change_x == 0 and platform.change_y == 0:
+                continue
+
+            if platform.boundary_left and platform.left <= platform.boundary_left:
+                platform.left = platform.boundary_left
+                if platform.change_x < 0:
+                    platform.change_x *= -1
+
+            if platform.boundary_right and platform.right >= platform.boundary_right:
+                platform.right = platform.boundary_right
+                if platform.change_x > 0:
+                    platform.change_x *= -1
+
+            platform.center_x += platform.change_x
+
+            if platform.boundary_top is not None and platform.top >= platform.boundary_top:
+                platform.top = platform.boundary_top
+                if platform.change_y > 0:
+                    platform.change_y *= -1
+
+            if platform.boundary_bottom is not None and platform.bottom <= platform.boundary_bottom:
+                platform.bottom = platform.boundary_bottom
+                if platform.change_y < 0:
+                    platform.change_y *= -1
+
+            platform.center_y += platform.change_y
@@ -0,0 +1,89 @@
+"""
+Fixed timestep
+
+Everything in the game moves by per-tick amounts (PLAYER_MOVEMENT_SPEED,
+GRAVITY, enemy change_x), so it only plays the same if it ticks at a fixed
+rate, whatever the frame rate. FixedTimestep turns the frame times passed
+to on_update into a number of ticks to run, and Interpolation draws the
+moving sprites between where they were at the last two ticks, so motion
+stays smooth when frames and ticks do not line up.
+"""
+
+# Seconds of game time per tick
+TICK_LENGTH = 1 / 60
+
+# Most ticks run for one frame. After a longer stall the game slows down
+# instead of trying to catch up, which would make the next frame even
+# longer.
+MAX_TICKS_PER_FRAME = 5
+
+
+class FixedTimestep:
+    """Accumulates frame time and hands it out in fixed ticks."""
+
+    def __init__(self, tick_length=TICK_LENGTH, max_ticks=MAX_TICKS_PER_FRAME):
+        self.tick_length = tick_length
+        self.max_ticks = max_ticks
+        self.accumulator = 0.0
+        # Ticks skipped because of max_ticks, since the start
+        self.dropped_ticks = 0
+
+    def advance(self, delta_time):
+        """Add one frame's time. Returns how many ticks to run now."""
+        ticks, self.accumulator = divmod(self.accumulator + delta_time, self.tick_length)
+        ticks = int(ticks)
+        if ticks > self.max_ticks:
+            self.dropped_ticks += ticks - self.max_ticks
+            ticks = self.max_ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        """How far into the next tick we are, from 0 to 1."""
+        return self.accumulator / self.tick_length
+
+    def reset(self):
+        self.accumulator = 0.0
+
+
+class Interpolation:
+    """
+    Remembers sprite positions at the start of a tick, and moves the sprites
+    between those and their current positions while they are drawn.
+    """
+
+    def __init__(self):
+        # (sprite, position before the last tick)
+        self.previous = []
+        # (sprite, position after the last tick) of the sprites moved by apply()
+        self.moved = []
+
+    def record(self, sprite_lists):
+        """Call before each tick with the lists of the sprites that move."""
+        self.previous = [
+            (sprite, sprite.position) for sprite_list in sprite_lists for sprite in sprite_list
+        ]
+
+    def clear(self):
+        """Forget the last positions, e.g. when the level is set up again."""
+        self.previous = []
+
+    def apply(self, alpha):
+        """Move the sprites alpha of the way from their previous positions."""
+        moved = []
+        for sprite, (previous_x, previous_y) in self.previous:
+            x, y = sprite.position
+            if x == previous_x and y == previous_y:
+                continue
+            moved.append((sprite, (x, y)))
+            sprite.position = (
+                previous_x + (x - previous_x) * alpha,
+                previous_y + (y - previous_y) * alpha,
+            )
+        self.moved = moved
+
+    def restore(self):
+        """Put the sprites moved by apply() back where the game has them."""
+        for sprite, position in self.moved:
+            sprite.position = position
+        self.moved = []